@@ -0,0 +1,40 @@
+"""按商店日期失效的内存缓存。
+
+每日商店在固定时间轮换，缓存条目记录写入时所属的商店日，读取时日期不一致即视为过期，
+因此无需定时清理；超过容量时按最近最少使用淘汰。
+"""
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class DailyCache:
+    """商店日内有效的 LRU 缓存。"""
+
+    def __init__(self, max_entries: int = 200):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Hashable, Tuple[str, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, day: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] != day:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Hashable, day: str, value: Any):
+        self._entries[key] = (day, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,165 @@
+"""本地商品目录：从商店响应中收集的商品名与 goods_id，用于监控项输入时的纠错提示。
+
+商品名按 matcher.compact 归一化（NFKC、大小写折叠、去空白）后建两套索引：
+- 前缀树：输入是某个商品名的开头时直接给出候选；
+- 带首尾标记的二元组倒排索引："^侦察力量$" 拆为 ^侦、侦察、察力、力量、量$，按 Dice 系数
+  对候选打分，错一两个字（如 "侦查力量"）仍有较高的相似度。
+两者都只访问与输入相关的条目，目录有数千个商品时单次查询也在亚毫秒级。
+keyword_matches 按监控词规则统计命中的商品：词元通过二元组（单字词元通过单字索引）取候选再校验，
+"商品名包含在监控词中" 则枚举监控词的子串直接查表，都不遍历整个目录。
+本模块不依赖 AstrBot。
+"""
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .matcher import compact, tokenize
+
+# 前缀树中保存条目下标的键（不会与单个字符冲突）
+_ENTRIES = ""
+
+
+def _grams(key: str) -> Set[str]:
+    padded = f"^{key}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+class Catalog:
+    """商品名目录，支持精确、前缀与模糊查询。"""
+
+    def __init__(self):
+        self._names: List[str] = []
+        self._keys: List[str] = []
+        self._goods_ids: List[Optional[str]] = []
+        self._by_key: Dict[str, int] = {}
+        self._by_goods_id: Dict[str, int] = {}
+        self._trie: dict = {}
+        self._gram_index: Dict[str, List[int]] = {}
+        self._gram_counts: List[int] = []
+        self._char_index: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, name: str, goods_id: Optional[str] = None) -> Optional[int]:
+        """加入商品，已存在时补全 goods_id；返回条目下标，名称为空时返回 None。"""
+        key = compact(name)
+        if not key:
+            return None
+        goods_id = str(goods_id) if goods_id else None
+        idx = self._by_key.get(key)
+        if idx is not None:
+            if goods_id and not self._goods_ids[idx]:
+                self._goods_ids[idx] = goods_id
+                self._by_goods_id[goods_id] = idx
+            return idx
+
+        idx = len(self._names)
+        self._names.append(name)
+        self._keys.append(key)
+        self._goods_ids.append(goods_id)
+        self._by_key[key] = idx
+        if goods_id:
+            self._by_goods_id[goods_id] = idx
+
+        node = self._trie
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node.setdefault(_ENTRIES, []).append(idx)
+
+        grams = _grams(key)
+        for gram in grams:
+            self._gram_index.setdefault(gram, []).append(idx)
+        self._gram_counts.append(len(grams))
+        for ch in set(key):
+            self._char_index.setdefault(ch, []).append(idx)
+        return idx
+
+    def exact(self, text: str) -> Optional[Tuple[str, Optional[str]]]:
+        """归一化后完全一致的商品，返回 (商品名, goods_id)。"""
+        idx = self._by_key.get(compact(text))
+        return (self._names[idx], self._goods_ids[idx]) if idx is not None else None
+
+    def entries(self) -> Iterator[Tuple[str, Optional[str]]]:
+        """遍历全部 (商品名, goods_id)。"""
+        return zip(self._names, self._goods_ids)
+
+    def name_of(self, goods_id: str) -> Optional[str]:
+        idx = self._by_goods_id.get(str(goods_id))
+        return self._names[idx] if idx is not None else None
+
+    def _prefix(self, key: str, limit: int) -> List[int]:
+        node = self._trie
+        for ch in key:
+            node = node.get(ch)
+            if node is None:
+                return []
+        # 按层遍历，较短的商品名优先
+        found: List[int] = []
+        level = [node]
+        while level and len(found) < limit:
+            next_level = []
+            for current in level:
+                found.extend(current.get(_ENTRIES, ()))
+                next_level.extend(child for ch, child in current.items() if ch != _ENTRIES)
+            level = next_level
+        return found[:limit]
+
+    def _containing(self, token: str) -> Set[int]:
+        """商品名（归一化后）包含 token 的条目下标。"""
+        if len(token) == 1:
+            return set(self._char_index.get(token, ()))
+        candidates: Optional[List[int]] = None
+        for i in range(len(token) - 1):
+            postings = self._gram_index.get(token[i:i + 2])
+            if postings is None:
+                return set()
+            if candidates is None or len(postings) < len(candidates):
+                candidates = postings
+        return {idx for idx in candidates or () if token in self._keys[idx]}
+
+    def keyword_matches(self, text: str) -> List[str]:
+        """按监控词规则命中的商品名：监控词的词元全部出现在商品名中，或商品名整体包含在更长的监控词里。"""
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+        # 较长的词元候选更少，先求交集
+        found: Optional[Set[int]] = None
+        for token in sorted(tokens, key=len, reverse=True):
+            ids = self._containing(token)
+            found = ids if found is None else found & ids
+            if not found:
+                break
+        found = found or set()
+        term = "".join(tokens)
+        for start in range(len(term)):
+            for end in range(start + 1, len(term) + 1):
+                if end - start < len(term):
+                    idx = self._by_key.get(term[start:end])
+                    if idx is not None:
+                        found.add(idx)
+        return [self._names[idx] for idx in sorted(found)]
+
+    def suggest(self, text: str, limit: int = 5, min_score: float = 0.4) -> List[Tuple[str, Optional[str], float]]:
+        """返回最相近的商品 (商品名, goods_id, 相似度)，相似度 1.0 为完全一致。"""
+        key = compact(text)
+        if not key:
+            return []
+        scores: Dict[int, float] = {}
+        exact_idx = self._by_key.get(key)
+        if exact_idx is not None:
+            scores[exact_idx] = 1.0
+
+        for idx in self._prefix(key, limit * 2):
+            scores[idx] = max(scores.get(idx, 0.0), 0.9)
+
+        query_grams = _grams(key)
+        shared: Dict[int, int] = {}
+        for gram in query_grams:
+            for idx in self._gram_index.get(gram, ()):
+                shared[idx] = shared.get(idx, 0) + 1
+        for idx, count in shared.items():
+            dice = 2 * count / (len(query_grams) + self._gram_counts[idx])
+            if dice >= min_score and dice > scores.get(idx, 0.0):
+                scores[idx] = dice
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], len(self._names[item[0]])))
+        return [(self._names[idx], self._goods_ids[idx], round(score, 3)) for idx, score in ranked[:limit]]
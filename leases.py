@@ -0,0 +1,181 @@
+"""多实例共用同一数据库时的任务租约。
+
+每个租约是 valo_leases 表中的一行（name 唯一），状态为 running 或 done。实例通过一条带条件的
+UPDATE 抢占租约：未被持有、持有者是自己，或上一个持有者的租约已过期时才能成功，SQLite 的写锁
+保证同一时刻只有一个实例抢到。持有期间定期续租；正常完成后标记 done，其他实例不会再执行；
+异常退出时释放，崩溃的实例则等租约过期后由其他实例接管。
+
+用法：
+    leases = LeaseManager(context.get_db(), ttl=120)
+    async with leases.hold("daily:2024-01-01:3") as lease:
+        if lease.acquired:
+            ...
+
+本模块只依赖 SQLAlchemy，不依赖 AstrBot，可在 tools/lease_demo.py 中直接使用。
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+import zlib
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger("astrbot.val_shop")
+
+
+def default_node_id() -> str:
+    """主机名 + 进程号 + 随机后缀，重启后视为新的实例。"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def shard_of(key: str, shards: int) -> int:
+    """稳定的分片号（不同进程、不同 Python 版本结果一致）。"""
+    if shards <= 1:
+        return 0
+    return zlib.crc32(str(key).encode("utf-8")) % shards
+
+
+class Lease:
+    """hold() 返回的租约句柄。"""
+
+    __slots__ = ("name", "acquired", "lost")
+
+    def __init__(self, name: str, acquired: bool):
+        self.name = name
+        self.acquired = acquired
+        # 续租失败（被其他实例接管或数据库异常）时置为 True
+        self.lost = False
+
+
+class LeaseManager:
+    """基于 valo_leases 表的租约抢占、续租与释放。"""
+
+    def __init__(self, db, ttl: float = 120.0, node_id: Optional[str] = None):
+        self.db = db
+        self.ttl = max(5.0, float(ttl))
+        self.node_id = node_id or default_node_id()
+
+    async def ensure_table(self):
+        async with self.db.get_db() as session:
+            async with session.begin():
+                await session.execute(text("""
+                    CREATE TABLE IF NOT EXISTS valo_leases (
+                        name TEXT PRIMARY KEY,
+                        owner TEXT,
+                        status TEXT NOT NULL DEFAULT 'running',
+                        expires_at REAL NOT NULL DEFAULT 0,
+                        updated_at REAL NOT NULL DEFAULT 0
+                    )
+                """))
+
+    async def claim(self, name: str) -> bool:
+        """尝试抢占租约；已完成或被其他实例有效持有时返回 False。"""
+        now = time.time()
+        async with self.db.get_db() as session:
+            async with session.begin():
+                await session.execute(
+                    text("INSERT OR IGNORE INTO valo_leases (name, owner, status, expires_at, updated_at) "
+                         "VALUES (:name, NULL, 'running', 0, :now)"),
+                    {"name": name, "now": now},
+                )
+                result = await session.execute(
+                    text("""
+                        UPDATE valo_leases SET owner = :owner, expires_at = :expires_at, updated_at = :now
+                        WHERE name = :name AND status != 'done'
+                          AND (owner IS NULL OR owner = :owner OR expires_at < :now)
+                    """),
+                    {"name": name, "owner": self.node_id, "expires_at": now + self.ttl, "now": now},
+                )
+                return (result.rowcount or 0) > 0
+
+    async def renew(self, name: str) -> bool:
+        now = time.time()
+        async with self.db.get_db() as session:
+            async with session.begin():
+                result = await session.execute(
+                    text("""
+                        UPDATE valo_leases SET expires_at = :expires_at, updated_at = :now
+                        WHERE name = :name AND owner = :owner AND status = 'running'
+                    """),
+                    {"name": name, "owner": self.node_id, "expires_at": now + self.ttl, "now": now},
+                )
+                return (result.rowcount or 0) > 0
+
+    async def release(self, name: str, done: bool):
+        """done 为真时标记完成，否则放弃持有，其他实例可立即接管。"""
+        now = time.time()
+        async with self.db.get_db() as session:
+            async with session.begin():
+                if done:
+                    await session.execute(
+                        text("UPDATE valo_leases SET status = 'done', expires_at = :now, updated_at = :now "
+                             "WHERE name = :name AND owner = :owner"),
+                        {"name": name, "owner": self.node_id, "now": now},
+                    )
+                else:
+                    await session.execute(
+                        text("UPDATE valo_leases SET owner = NULL, expires_at = 0, updated_at = :now "
+                             "WHERE name = :name AND owner = :owner AND status = 'running'"),
+                        {"name": name, "owner": self.node_id, "now": now},
+                    )
+
+    async def is_done(self, name: str) -> bool:
+        async with self.db.get_db() as session:
+            result = await session.execute(
+                text("SELECT status FROM valo_leases WHERE name = :name"),
+                {"name": name},
+            )
+            row = result.fetchone()
+            return bool(row and row[0] == "done")
+
+    async def prune(self, older_than: float):
+        """删除 older_than 秒之前更新过的租约记录。"""
+        async with self.db.get_db() as session:
+            async with session.begin():
+                await session.execute(
+                    text("DELETE FROM valo_leases WHERE updated_at < :cutoff"),
+                    {"cutoff": time.time() - older_than},
+                )
+
+    @asynccontextmanager
+    async def hold(self, name: str):
+        """抢占租约并在持有期间每 ttl/3 秒续租；正常退出标记完成，异常退出释放。"""
+        lease = Lease(name, await self.claim(name))
+        if not lease.acquired:
+            yield lease
+            return
+
+        async def keepalive():
+            while True:
+                await asyncio.sleep(self.ttl / 3)
+                try:
+                    renewed = await self.renew(name)
+                except Exception as e:
+                    logger.warning(f"租约续期失败: {name} {e}")
+                    continue
+                if not renewed:
+                    lease.lost = True
+                    logger.warning(f"租约已被其他实例接管: {name}")
+                    return
+
+        renew_task = asyncio.create_task(keepalive())
+        done = False
+        try:
+            yield lease
+            done = True
+        finally:
+            renew_task.cancel()
+            try:
+                await renew_task
+            except asyncio.CancelledError:
+                pass
+            if not lease.lost:
+                try:
+                    await self.release(name, done=done)
+                except Exception as e:
+                    logger.warning(f"释放租约失败: {name} {e}")
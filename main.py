@@ -1,30 +1,73 @@
-﻿import base64
+﻿import io
 import json
 import logging
 import os
-import shutil
 import asyncio
 import aiohttp
 import time
 import random
 import hashlib
-from PIL import Image as PILImage, ImageDraw, ImageFont
-from typing import Dict, Any, Optional, Tuple
-from datetime import datetime
+from contextlib import AsyncExitStack
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 import urllib.parse
 import re
-from pathlib import Path
 
 from astrbot.api.event import filter, AstrMessageEvent, MessageEventResult
 from astrbot.api.star import Context, Star, register
 from astrbot.api import logger
 from astrbot.core.message.components import Plain, At
 from astrbot.core.message.components import Image
+from .cache import DailyCache
+from .catalog import Catalog
+from .leases import LeaseManager, shard_of
+from .matcher import WatchMatcher, index_key, tokenize
+from .metrics import MetricsRegistry, timed
+from .notifier import Notification, NotificationDispatcher
+from .tracing import RequestTrace, SlowTraceLog, span
+from .user_schedule import ScheduleHeap, next_run, parse_hhmm
+from .render import (
+    BOARD_TITLE_FONT_SIZE,
+    compose_grid,
+    encode_jpeg,
+    load_font,
+    merge_cards,
+    render_goods_card,
+    render_member_panel,
+)
+from .protocol import (
+    extract_auth_url_from_callback_body,
+    extract_jsver,
+    extract_login_data_from_success_url,
+    extract_login_sig,
+    extract_url_from_body,
+    normalize_escaped_url,
+    parse_ptui_callback,
+    parse_wx_poll_body,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
-
-# 配置日志
-logger = logging.getLogger("astrbot")
+from sqlalchemy import bindparam, text
+
+# 配置日志：使用 astrbot 的子 logger，级别可由插件配置单独调整，输出仍走 AstrBot 的 handler
+logger = logging.getLogger("astrbot.val_shop")
+
+# 上游接口根地址，endpoints 配置中的同名项会覆盖对应默认值
+DEFAULT_ENDPOINTS = {
+    "mval": "https://app.mval.qq.com",
+    "ptlogin": "https://xui.ptlogin2.qq.com",
+    "openmobile": "https://openmobile.qq.com",
+    "wechat_open": "https://open.weixin.qq.com",
+    "wechat_long_poll": "https://long.open.weixin.qq.com",
+    "kook": "https://www.kookapp.cn",
+}
+
+LOG_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
 
 @register("astrbot_plugin_val_shop", "GuJi08233", "无畏契约每日商店查询插件", "v3.2.6")
 class ValorantShopPlugin(Star):
@@ -37,28 +80,168 @@ class ValorantShopPlugin(Star):
         
         # 使用 AstrBot 自动注入的配置
         self.config = config if config is not None else {}
+
+        # 日志级别与按子系统的采样率
+        self._apply_log_settings()
         
+        # 上游接口根地址，可通过 endpoints 配置覆盖为镜像、缓存代理或本地压测服务
+        self.endpoints = self._load_endpoints()
+
         # QQ 登录配置
-        self.LOGIN_URL_TEMPLATE = "https://xui.ptlogin2.qq.com/cgi-bin/xlogin?pt_enable_pwd=1&appid=716027609&pt_3rd_aid=102061775&daid=381&pt_skey_valid=0&style=35&force_qr=1&autorefresh=1&s_url=http%3A%2F%2Fconnect.qq.com&refer_cgi=m_authorize&ucheck=1&fall_to_wv=1&status_os=12&redirect_uri=auth%3A%2F%2Ftauth.qq.com%2F&client_id=102061775&pf=openmobile_android&response_type=token&scope=all&sdkp=a&sdkv=3.5.17.lite&sign=a6479455d3e49b597350f13f776a6288&status_machine=MjMxMTdSSzY2Qw%3D%3D&switch=1&time=1763280194&show_download_ui=true&h5sig=trobryxo8IPM0GaSQH12mowKG-CY65brFzkK7_-9EW4&loginty=6"
+        self.LOGIN_URL_TEMPLATE = f"{self.endpoints['ptlogin']}/cgi-bin/xlogin?pt_enable_pwd=1&appid=716027609&pt_3rd_aid=102061775&daid=381&pt_skey_valid=0&style=35&force_qr=1&autorefresh=1&s_url=http%3A%2F%2Fconnect.qq.com&refer_cgi=m_authorize&ucheck=1&fall_to_wv=1&status_os=12&redirect_uri=auth%3A%2F%2Ftauth.qq.com%2F&client_id=102061775&pf=openmobile_android&response_type=token&scope=all&sdkp=a&sdkv=3.5.17.lite&sign=a6479455d3e49b597350f13f776a6288&status_machine=MjMxMTdSSzY2Qw%3D%3D&switch=1&time=1763280194&show_download_ui=true&h5sig=trobryxo8IPM0GaSQH12mowKG-CY65brFzkK7_-9EW4&loginty=6"
         # 按抓包链路固定为 xui 域名 + /ssl 路径，避免落入旧 check_sig 链路
-        self.PTQR_SHOW_URL = "https://xui.ptlogin2.qq.com/ssl/ptqrshow"
-        self.PTQR_LOGIN_URL = "https://xui.ptlogin2.qq.com/ssl/ptqrlogin"
-        self.OPENMOBILE_REDIRECT_URL = "https://openmobile.qq.com/oauth2.0/m_get_redirect_url"
+        self.PTQR_SHOW_URL = f"{self.endpoints['ptlogin']}/ssl/ptqrshow"
+        self.PTQR_LOGIN_URL = f"{self.endpoints['ptlogin']}/ssl/ptqrlogin"
+        self.OPENMOBILE_REDIRECT_URL = f"{self.endpoints['openmobile']}/oauth2.0/m_get_redirect_url"
         self.PTQR_AID = "716027609"
         self.PTQR_DAID = "381"
         self.PTQR_THIRD_AID = "102061775"
         # 从 HAR 成功链路看，xlogin/ptqrlogin 默认使用 connect.qq.com 更稳定
         self.DEFAULT_LOGIN_CALLBACK_URL = "http://connect.qq.com"
         self.DEFAULT_LOGIN_U1_URL = "http://connect.qq.com"
+        # ptqrlogin 轮询间隔（秒）：等待扫码时放慢，已扫码（code=67）后加快
+        self.PTQR_POLL_INTERVAL_WAITING = 2.0
+        self.PTQR_POLL_INTERVAL_SCANNED = 0.5
+        self.PTQR_POLL_INTERVAL_ERROR = 2.0
+        # m_get_redirect_url 候选并发数，以及各候选来源的命中次数（用于调整尝试顺序）
+        self.REDIRECT_KEY_FANOUT = 3
+        self._redirect_key_source_wins: Dict[str, int] = {}
         
+        # 掌上无畏契约业务接口
+        self.STORE_API_URL = f"{self.endpoints['mval']}/go/mlol_store/agame/user_store"
+        self.MVAL_QQ_LOGIN_URL = f"{self.endpoints['mval']}/go/auth/login_by_qq?source_game_zone=agame&game_zone=agame"
+        self.MVAL_WECHAT_LOGIN_URL = f"{self.endpoints['mval']}/go/auth/login_by_wechat"
+        self.MVAL_SDK_TICKET_URL = f"{self.endpoints['mval']}/go/auth/get_sdk_ticket"
+        # Kook 开放接口
+        self.KOOK_API_BASE = f"{self.endpoints['kook']}/api/v3"
+
         # 微信登录配置
-        self.WECHAT_QRCONNECT_URL = "https://open.weixin.qq.com/connect/sdk/qrconnect"
-        self.WECHAT_LONG_POLL_URL = "https://long.open.weixin.qq.com/connect/l/qrconnect"
+        self.WECHAT_QRCONNECT_URL = f"{self.endpoints['wechat_open']}/connect/sdk/qrconnect"
+        self.WECHAT_LONG_POLL_URL = f"{self.endpoints['wechat_long_poll']}/connect/l/qrconnect"
         self.WECHAT_APP_ID = "wxcbb49f1f39656c2a"  # 掌上无畏契约 appid
         self.WECHAT_APP_NAME = "掌上无畏契约"
+        # 微信长轮询由服务端挂起，客户端不再额外 sleep；整体超时与单次请求超时（秒）
+        self.WECHAT_LOGIN_TIMEOUT = 60
+        self.WECHAT_LONG_POLL_REQUEST_TIMEOUT = 35
+        # 服务端未挂起而立即返回时的最小间隔，避免空转
+        self.WECHAT_LONG_POLL_MIN_INTERVAL = 0.5
         
-        # Wechat internal state
-        self.wechat_login_tasks = {}
+        # 登录会话登记表（QQ/微信共用）：user_id -> {mode, token, task, started_at}
+        self.login_sessions: Dict[str, Dict[str, Any]] = {}
+        # 超过该时长（秒）仍未结束的登录会话视为残留，登记时自动清理
+        self.LOGIN_SESSION_MAX_AGE = 180
+
+        # 插件共享的 HTTP 会话（Kook 上传、图片下载等），首次使用时创建
+        self._http_session: Optional[aiohttp.ClientSession] = None
+
+        # QQ 登录 xlogin 预热池（session + login_sig + jsver）
+        self._xlogin_pool: list = []
+        self._xlogin_prewarm_task: Optional[asyncio.Task] = None
+
+        # 运行指标：外部调用耗时、通知数量、活跃登录等
+        self.metrics = MetricsRegistry(prefix="valshop")
+        self.metrics.histogram("store_api_seconds", "商店接口请求耗时")
+        self.metrics.histogram("image_download_seconds", "商品图片下载耗时")
+        self.metrics.histogram("shop_render_seconds", "商店图片生成耗时（含图片下载）")
+        self.metrics.histogram("kook_upload_seconds", "Kook 图片上传耗时")
+        self.metrics.histogram("qr_generate_seconds", "QQ 登录二维码生成耗时")
+        self.metrics.histogram("qq_login_wait_seconds", "QQ 扫码登录轮询总耗时")
+        self.metrics.histogram("daily_check_seconds", "每日自动监控任务耗时")
+        self.metrics.counter("notifications_total", "监控命中通知发送次数")
+        self.metrics.counter("daily_check_fetches_total", "每日监控按游戏账号拉取商店的次数")
+        self.metrics.gauge("active_logins", "进行中的扫码登录数", callback=lambda: len(self.login_sessions))
+        self.metrics.gauge("xlogin_pool_size", "可用的预热 xlogin 会话数", callback=lambda: len(self._xlogin_pool))
+
+        # 监控通知队列：按平台限速、失败重试；已入队未送达的 (user_id, 商店日, 商品名) 用于去重
+        notify_rates, notify_default_rate = self._get_notify_rate_limits()
+        self.notifier = NotificationDispatcher(
+            self._send_text_message,
+            rate_limits=notify_rates,
+            default_rate=notify_default_rate,
+            max_retries=self._get_notify_max_retries(),
+            on_delivered=self._on_notification_delivered,
+            on_failed=self._on_notification_failed,
+        )
+        self._notify_pending: Set[Tuple[str, str, str]] = set()
+        self.metrics.gauge("notify_queue_size", "待发送的监控通知数", callback=lambda: self.notifier.pending())
+
+        # 设置了个人监控时间/时区的用户：共用一个最小堆，由 _user_schedule_loop 驱动
+        self._user_schedule = ScheduleHeap()
+        self._user_schedule_settings: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self._user_schedule_wakeup = asyncio.Event()
+        # 定期从数据库同步个人定时（其他实例上修改的设置），单位秒
+        self.USER_SCHEDULE_SYNC_INTERVAL = 60.0
+        self._user_schedule_synced_at = 0.0
+        self._user_schedule_task: Optional[asyncio.Task] = None
+        # 后台执行中的个人定时监控批次
+        self._user_check_tasks: Set[asyncio.Task] = set()
+        self.metrics.gauge("user_schedule_size", "设置了个人监控时间的用户数", callback=lambda: len(self._user_schedule))
+
+        # 多实例共用数据库时通过 valo_leases 租约分担定时任务
+        self.leases = LeaseManager(self.context.get_db(), ttl=self._get_lease_ttl_seconds())
+        # 等待其他实例完成（或接管其崩溃后遗留的）每日监控分片的最长时间（秒）
+        self.LEASE_TAKEOVER_WAIT = 1800.0
+
+        # 定时配置热更新：当前生效的定时配置、上次报告的配置错误、配置文件修改时间
+        self.CONFIG_WATCH_INTERVAL = 30
+        self.SCHEDULE_CONFIG_KEYS = ("monitor_time", "timezone", "prefetch_enabled", "prefetch_time")
+        # 各项配置无效且此前没有生效值时使用的默认值
+        self.DEFAULT_SCHEDULE_SETTINGS = {
+            "monitor_time": "08:01",
+            "timezone": "Asia/Shanghai",
+            "prefetch_enabled": True,
+            "prefetch_time": "08:00",
+        }
+        self._applied_schedule: Optional[Dict[str, Any]] = None
+        self._schedule_config_error: Optional[str] = None
+        self._config_file_mtime: Optional[float] = None
+
+        # 本地商品目录（商品名与 goods_id），用于监控项纠错提示与规范化
+        self.catalog = Catalog()
+
+        # 商店历史归档：商品名 -> 字典表 id 的缓存，以及进行中的后台写入任务
+        self._goods_name_ids: Dict[str, int] = {}
+        self._history_tasks: Set[asyncio.Task] = set()
+
+        # 最近一次每日自动监控的运行摘要，供 /商店监控 状态 展示
+        self._last_daily_summary: Optional[str] = None
+
+        # /每日商店 慢请求追踪
+        self.slow_traces = SlowTraceLog(keep=self._get_slow_trace_keep())
+
+        # 当日商店缓存：商品列表与渲染好的图片均按游戏 userId 缓存，商店轮换后自动失效
+        self.SHOP_ROTATION_TIME = (8, 0)
+        self.SHOP_TIMEZONE = "Asia/Shanghai"
+        # 预取时每个用户之间的间隔（秒），避免与交互请求争抢上游与 CPU
+        self.PREFETCH_INTERVAL = 1.0
+        cache_size = self._get_shop_cache_max_entries()
+        self._goods_cache = DailyCache(max_entries=cache_size)
+        self._image_cache = DailyCache(max_entries=cache_size)
+        # 同一 userId 正在进行的商店请求，后来者直接等待其结果
+        self._goods_inflight: Dict[str, asyncio.Future] = {}
+        self.metrics.counter("shop_cache_requests_total", "当日商店缓存命中情况")
+        # 单个商品卡片缓存：同一皮肤在多个账号的商店、看板中重复出现时不再下载与合成
+        self._card_cache = DailyCache(max_entries=self._get_card_cache_max_entries())
+        # 商店看板同时拉取/渲染的成员数
+        self.BOARD_CONCURRENCY = 4
+        self.metrics.histogram("board_render_seconds", "商店看板生成耗时（含拉取商店）")
+        self.metrics.histogram("prefetch_seconds", "商店预取任务耗时")
+
+        # 监控词倒排索引（归一化监控词 -> 订阅用户），与 valo_watch_index 表同步
+        self._watch_index: Dict[str, Set[str]] = {}
+        # 归一化监控词 -> 展示用原文；用户 -> 其订阅的归一化监控词
+        self._watch_index_names: Dict[str, str] = {}
+        # 归一化监控词 -> {保持原词序的监控词 -> 订阅用户}。词元相同、词序不同的监控词共用一个键，
+        # 但 "商品名包含在监控词中" 的兼容规则依赖词序，需按各自的词序分别匹配
+        self._watch_index_texts: Dict[str, Dict[str, Set[str]]] = {}
+        self._user_watch_keys: Dict[str, Set[str]] = {}
+        # 由全部归一化监控词编译的匹配器，及商品名 -> 订阅用户的结果缓存；索引变化时失效
+        self._watch_index_matcher: Optional[WatchMatcher] = None
+        self._goods_subscribers_memo: Dict[str, Set[str]] = {}
+
+        # 凭证巡检：每批之间逐个检查，间隔（秒）控制对上游的请求速率
+        self.CREDENTIAL_CHECK_PAUSE = 2.0
+        self.metrics.counter("credential_checks_total", "后台凭证巡检结果")
         
     async def initialize(self):
         """??"""
@@ -79,6 +262,14 @@ class ValorantShopPlugin(Star):
                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 """))
+                # 旧版本建的表缺少的列
+                await self._ensure_column(session, "valo_users", "last_active_at", "TIMESTAMP")
+                await self._ensure_column(session, "valo_users", "credential_status", "TEXT DEFAULT 'ok'")
+                await self._ensure_column(session, "valo_users", "credential_checked_at", "TIMESTAMP")
+                await self._ensure_column(session, "valo_users", "expired_notified", "INTEGER DEFAULT 0")
+                # 个人监控时间（HH:MM）与时区，为空时使用 monitor_time / timezone
+                await self._ensure_column(session, "valo_users", "notify_time", "TEXT")
+                await self._ensure_column(session, "valo_users", "notify_tz", "TEXT")
         
         # 创建监控列表表
         async with db.get_db() as session:
@@ -94,11 +285,102 @@ class ValorantShopPlugin(Star):
                         UNIQUE(user_id, item_name)
                     )
                 """))
+                # 规范化到商品目录的监控项记录 goods_id，按 id 精确匹配
+                await self._ensure_column(session, "valo_watchlist", "goods_id", "TEXT")
+
+        # 创建监控词倒排索引表
+        async with db.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                await session.execute(text("""
+                    CREATE TABLE IF NOT EXISTS valo_watch_index (
+                        term_key TEXT NOT NULL,
+                        user_id TEXT NOT NULL,
+                        item_name TEXT NOT NULL,
+                        PRIMARY KEY (user_id, item_name)
+                    )
+                """))
+                await session.execute(text(
+                    "CREATE INDEX IF NOT EXISTS idx_valo_watch_index_term ON valo_watch_index(term_key)"
+                ))
+
+        # 创建商店历史归档表：商品名存字典表，历史表按 (游戏账号, 商店日, 位置) 存储
+        async with db.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                await session.execute(text("""
+                    CREATE TABLE IF NOT EXISTS valo_goods_names (
+                        id INTEGER PRIMARY KEY,
+                        name TEXT NOT NULL UNIQUE
+                    )
+                """))
+                await session.execute(text("""
+                    CREATE TABLE IF NOT EXISTS valo_shop_history (
+                        game_user_id TEXT NOT NULL,
+                        shop_day TEXT NOT NULL,
+                        slot INTEGER NOT NULL,
+                        goods_id TEXT,
+                        name_id INTEGER NOT NULL,
+                        price INTEGER,
+                        PRIMARY KEY (game_user_id, shop_day, slot)
+                    ) WITHOUT ROWID
+                """))
+                # 支持 "某商品最近一次出现" 与 "某商品 N 天内出现次数"
+                await session.execute(text(
+                    "CREATE INDEX IF NOT EXISTS idx_valo_shop_history_name "
+                    "ON valo_shop_history(name_id, game_user_id, shop_day)"
+                ))
+
+        await self._load_catalog()
+        await self._load_watch_index()
+
+        # 创建商店看板成员表（按群会话记录主动加入看板的用户）
+        async with db.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                await session.execute(text("""
+                    CREATE TABLE IF NOT EXISTS valo_board_members (
+                        group_id TEXT NOT NULL,
+                        user_id TEXT NOT NULL,
+                        joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (group_id, user_id)
+                    )
+                """))
+
+        await self.leases.ensure_table()
+        logger.info(f"任务租约实例 ID: {self.leases.node_id}")
+
+        # 创建通知记录表（按商店日去重）
+        async with db.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                await session.execute(text("""
+                    CREATE TABLE IF NOT EXISTS valo_notify_log (
+                        user_id TEXT NOT NULL,
+                        shop_day TEXT NOT NULL,
+                        item_name TEXT NOT NULL,
+                        sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (user_id, shop_day, item_name)
+                    )
+                """))
         
         # 初始化定时任务
         await self.setup_scheduler()
+        await self._load_user_schedules()
+        self._user_schedule_task = asyncio.create_task(self._user_schedule_loop())
+
+        # 二维码预热池
+        if self._get_qr_prewarm_pool_size() > 0:
+            self._xlogin_prewarm_task = asyncio.create_task(self._xlogin_prewarm_loop())
         logger.info("插件初始化完成")
     
+    async def _ensure_column(self, session: AsyncSession, table: str, column: str, ddl: str):
+        """表中缺少指定列时补充（SQLite 的 CREATE TABLE IF NOT EXISTS 不会更新已有表结构）。"""
+        result = await session.execute(text(f"PRAGMA table_info({table})"))
+        if column not in {row[1] for row in result.fetchall()}:
+            await session.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            logger.info(f"数据表 {table} 已新增列 {column}")
+
     def _is_kook_platform(self, event: AstrMessageEvent) -> bool:
         """??"""
         try:
@@ -128,54 +410,72 @@ class ValorantShopPlugin(Star):
             logger.error(f"获取Kook Token失败: {e}")
             return None
     
-    async def _upload_image_to_kook(self, image_path: str, token: str) -> Optional[str]:
-        """??"""
+    async def _get_http_session(self) -> aiohttp.ClientSession:
+        """获取插件共享的 HTTP 会话。
+
+        不保存 Cookie，避免不同用户的请求之间互相串用登录态。
+        """
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession(cookie_jar=aiohttp.DummyCookieJar())
+        return self._http_session
+
+    @timed("kook_upload_seconds")
+    async def _upload_image_to_kook(
+        self,
+        image_data: Union[bytes, io.BytesIO],
+        token: str,
+        filename: str = "image.jpg",
+    ) -> Optional[str]:
+        """将内存中的图片上传到 Kook，返回资源 URL。"""
         try:
-            if not os.path.exists(image_path):
-                logger.error(f"图片文件不存在: {image_path}")
+            if isinstance(image_data, io.BytesIO):
+                image_bytes = image_data.getvalue()
+            else:
+                image_bytes = bytes(image_data or b"")
+            if not image_bytes:
+                logger.error("待上传的图片内容为空")
                 return None
+
+            file_size = len(image_bytes)
+            self._log("kook", logging.INFO, "准备上传图片到Kook，文件大小: %d 字节", file_size)
             
-            file_size = os.path.getsize(image_path)
-            logger.info(f"准备上传图片到Kook，文件大小: {file_size} 字节 ({file_size / (1024 * 1024):.2f} MB)")
-            
-            upload_url = "https://www.kookapp.cn/api/v3/asset/create"
+            upload_url = f"{self.KOOK_API_BASE}/asset/create"
             headers = {'Authorization': f'Bot {token}'}
             
-            async with aiohttp.ClientSession() as session:
-                with open(image_path, 'rb') as f:
-                    data = aiohttp.FormData()
-                    data.add_field('file', f, filename=Path(image_path).name)
+            session = await self._get_http_session()
+            data = aiohttp.FormData()
+            data.add_field('file', io.BytesIO(image_bytes), filename=filename)
+            
+            async with session.post(upload_url, data=data, headers=headers) as response:
+                self._log("kook", logging.DEBUG, "Kook图片上传响应状态码: %s", response.status)
+                
+                if response.status == 200:
+                    result = await response.json()
+                    self._log("kook", logging.DEBUG, "Kook图片上传响应: %s", result)
                     
-                    async with session.post(upload_url, data=data, headers=headers) as response:
-                        logger.info(f"Kook图片上传响应状态码: {response.status}")
+                    if result.get('code') == 0 and 'data' in result:
+                        asset_data = result['data']
+                        # 尝试提取 URL，Kook 可能返回不同字段名
+                        asset_url = (asset_data.get('url') or
+                                   asset_data.get('file_url') or
+                                   asset_data.get('link') or
+                                   asset_data.get('asset_url'))
                         
-                        if response.status == 200:
-                            result = await response.json()
-                            logger.info(f"Kook图片上传响应: {result}")
-                            
-                            if result.get('code') == 0 and 'data' in result:
-                                asset_data = result['data']
-                                # 尝试提取 URL，Kook 可能返回不同字段名
-                                asset_url = (asset_data.get('url') or
-                                           asset_data.get('file_url') or
-                                           asset_data.get('link') or
-                                           asset_data.get('asset_url'))
-                                
-                                if asset_url:
-                                    logger.info(f"Kook图片上传成功，URL: {asset_url}")
-                                    return asset_url
-                                else:
-                                    logger.error(f"无法从Kook响应中提取图片URL: {asset_data}")
-                                    return None
-                            else:
-                                error_msg = result.get('message', '未知错误')
-                                error_code = result.get('code', 'N/A')
-                                logger.error(f"Kook图片上传失败 (代码: {error_code}): {error_msg}")
-                                return None
+                        if asset_url:
+                            logger.info(f"Kook图片上传成功，URL: {asset_url}")
+                            return asset_url
                         else:
-                            response_text = await response.text()
-                            logger.error(f"Kook图片上传HTTP错误: {response.status}, 详情: {response_text}")
+                            logger.error(f"无法从Kook响应中提取图片URL: {asset_data}")
                             return None
+                    else:
+                        error_msg = result.get('message', '未知错误')
+                        error_code = result.get('code', 'N/A')
+                        logger.error(f"Kook图片上传失败 (代码: {error_code}): {error_msg}")
+                        return None
+                else:
+                    response_text = await response.text()
+                    logger.error(f"Kook图片上传HTTP错误: {response.status}, 详情: {response_text}")
+                    return None
                             
         except Exception as e:
             logger.error(f"上传图片到Kook异常: {e}")
@@ -186,7 +486,7 @@ class ValorantShopPlugin(Star):
     async def _send_kook_image_message(self, channel_id: str, image_url: str, token: str) -> bool:
         """??"""
         try:
-            url = "https://www.kookapp.cn/api/v3/message/create"
+            url = f"{self.KOOK_API_BASE}/message/create"
             headers = {
                 "Authorization": f"Bot {token}",
                 "Content-Type": "application/json"
@@ -199,25 +499,25 @@ class ValorantShopPlugin(Star):
             
             logger.info(f"发送Kook图片消息到频道: {channel_id}")
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, headers=headers, json=payload) as resp:
-                    logger.info(f"Kook发送图片响应状态码: {resp.status}")
+            session = await self._get_http_session()
+            async with session.post(url, headers=headers, json=payload) as resp:
+                self._log("kook", logging.DEBUG, "Kook发送图片响应状态码: %s", resp.status)
+                
+                if resp.status == 200:
+                    result = await resp.json()
+                    self._log("kook", logging.DEBUG, "Kook发送图片响应: %s", result)
                     
-                    if resp.status == 200:
-                        result = await resp.json()
-                        logger.info(f"Kook发送图片响应: {result}")
-                        
-                        if result.get('code') == 0:
-                            logger.info("Kook图片消息发送成功")
-                            return True
-                        else:
-                            error_msg = result.get('message', '未知错误')
-                            logger.error(f"Kook图片消息发送失败: {error_msg}")
-                            return False
+                    if result.get('code') == 0:
+                        logger.info("Kook图片消息发送成功")
+                        return True
                     else:
-                        response_text = await resp.text()
-                        logger.error(f"Kook发送图片HTTP错误: {resp.status}, 详情: {response_text}")
+                        error_msg = result.get('message', '未知错误')
+                        logger.error(f"Kook图片消息发送失败: {error_msg}")
                         return False
+                else:
+                    response_text = await resp.text()
+                    logger.error(f"Kook发送图片HTTP错误: {resp.status}, 详情: {response_text}")
+                    return False
                         
         except Exception as e:
             logger.error(f"发送Kook图片消息异常: {e}")
@@ -225,8 +525,14 @@ class ValorantShopPlugin(Star):
             logger.error(traceback.format_exc())
             return False
     
-    async def _send_image_for_kook(self, event: AstrMessageEvent, image_path: str) -> Tuple[bool, Optional[str]]:
-        """??"""
+    async def _send_image_for_kook(
+        self,
+        event: AstrMessageEvent,
+        image_data: Union[bytes, io.BytesIO],
+        filename: str = "image.jpg",
+        trace: Optional[RequestTrace] = None,
+    ) -> Tuple[bool, Optional[str]]:
+        """上传内存图片到 Kook 并发送到当前频道。"""
         try:
             # 获取Kook Token
             token = await self._get_kook_token(event)
@@ -234,7 +540,8 @@ class ValorantShopPlugin(Star):
                 return False, "无法获取Kook认证信息"
             
             # 上传图片到Kook
-            image_url = await self._upload_image_to_kook(image_path, token)
+            with span(trace, "kook_upload"):
+                image_url = await self._upload_image_to_kook(image_data, token, filename)
             if not image_url:
                 return False, "图片上传到Kook失败"
             
@@ -244,7 +551,8 @@ class ValorantShopPlugin(Star):
                 return False, "无法获取目标频道ID"
             
             # 发送图片消息
-            success = await self._send_kook_image_message(channel_id, image_url, token)
+            with span(trace, "kook_send"):
+                success = await self._send_kook_image_message(channel_id, image_url, token)
             if success:
                 return True, None
             else:
@@ -263,10 +571,79 @@ class ValorantShopPlugin(Star):
             self._scheduler.shutdown()
             logger.info("定时任务调度器已关闭")
 
+        if self._user_schedule_task and not self._user_schedule_task.done():
+            self._user_schedule_task.cancel()
+            try:
+                await self._user_schedule_task
+            except asyncio.CancelledError:
+                pass
+            logger.info("个人监控定时循环已停止")
+        for task in list(self._user_check_tasks):
+            task.cancel()
+        if self._user_check_tasks:
+            await asyncio.gather(*list(self._user_check_tasks), return_exceptions=True)
+
+        # 取消所有进行中的登录
+        for user_id in list(self.login_sessions.keys()):
+            self._cancel_login_session(user_id)
+
+        if self._xlogin_prewarm_task and not self._xlogin_prewarm_task.done():
+            self._xlogin_prewarm_task.cancel()
+            try:
+                await self._xlogin_prewarm_task
+            except asyncio.CancelledError:
+                pass
+            logger.info("二维码预热任务已停止")
+
+        await self.notifier.close()
+
+        if self._history_tasks:
+            await asyncio.gather(*list(self._history_tasks), return_exceptions=True)
+
+        if self._http_session is not None and not self._http_session.closed:
+            await self._http_session.close()
+            logger.info("共享HTTP会话已关闭")
+
     def _get_config_value(self, key: str, default=None):
         """??"""
         return self.config.get(key, default)
 
+    def _apply_log_settings(self):
+        """应用 log_level 与 log_sample_rates 配置。"""
+        raw_level = str(self._get_config_value("log_level", "info") or "info").strip().lower()
+        level = LOG_LEVELS.get(raw_level)
+        if level is None:
+            logger.warning(f"log_level 配置无效: {raw_level}，将回退为 info")
+            level = logging.INFO
+        logger.setLevel(level)
+
+        # 格式：store=0.1,render=0.2；未列出的子系统不采样
+        self._log_sample_rates: Dict[str, float] = {}
+        raw_rates = str(self._get_config_value("log_sample_rates", "") or "")
+        for part in raw_rates.replace("，", ",").split(","):
+            if "=" not in part:
+                continue
+            name, _, value = part.partition("=")
+            try:
+                rate = float(value.strip())
+            except ValueError:
+                logger.warning(f"log_sample_rates 配置项无效: {part.strip()}")
+                continue
+            self._log_sample_rates[name.strip().lower()] = min(1.0, max(0.0, rate))
+
+    def _log(self, subsystem: str, level: int, msg: str, *args):
+        """按级别与子系统采样率输出高频日志，未命中时不做任何格式化。
+
+        子系统：store、render、login、watchlist、kook。仅用于 INFO/DEBUG 级别的过程日志，
+        警告与错误不采样。
+        """
+        if not logger.isEnabledFor(level):
+            return
+        rate = self._log_sample_rates.get(subsystem, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            return
+        logger.log(level, msg, *args)
+
     def _normalize_login_mode(self, mode: str) -> str:
         """将登录模式归一化为 qq/wx。"""
         value = str(mode or "").strip().lower()
@@ -296,6 +673,23 @@ class ValorantShopPlugin(Star):
             url = f"https://{url.lstrip('/')}"
         return url
 
+    def _load_endpoints(self) -> Dict[str, str]:
+        """合并默认上游根地址与 endpoints 配置中的覆盖项，返回不带末尾斜杠的根地址表。"""
+        endpoints = dict(DEFAULT_ENDPOINTS)
+        overrides = self._get_config_value("endpoints", {}) or {}
+        if not isinstance(overrides, dict):
+            logger.warning("endpoints 配置格式无效，将使用默认上游地址")
+            return endpoints
+        for name, value in overrides.items():
+            if name not in endpoints:
+                logger.warning(f"endpoints 配置包含未知项: {name}")
+                continue
+            url = self._normalize_url(str(value or ""))
+            if url:
+                endpoints[name] = url.rstrip("/")
+                logger.info(f"上游地址 {name} 已覆盖为 {endpoints[name]}")
+        return endpoints
+
     def _get_login_callback_url(self) -> str:
         """??"""
         value = str(
@@ -324,63 +718,159 @@ class ValorantShopPlugin(Star):
             count=1,
         )
 
-    def _get_safe_temp_user_dir(self, user_id: str) -> Path:
-        """构造安全的用户临时目录，避免路径穿越。"""
-        base_dir = Path("./temp/valo").resolve()
-        raw_user_id = str(user_id or "").strip()
-        if not raw_user_id:
-            raise ValueError("user_id 为空，无法创建临时目录")
-
-        normalized = re.sub(r"[^0-9A-Za-z_-]", "_", raw_user_id).strip("_")
-        digest = hashlib.sha256(raw_user_id.encode("utf-8")).hexdigest()[:10]
-        safe_segment = f"{(normalized[:32] or 'user')}_{digest}"
-
-        user_dir = (base_dir / safe_segment).resolve()
-        if user_dir != base_dir and base_dir not in user_dir.parents:
-            raise ValueError(f"检测到非法临时目录路径: {raw_user_id}")
-        return user_dir
-
-    def _build_safe_temp_file_path(self, user_id: str, filename: str) -> Path:
-        """构造安全的用户临时文件路径，避免目录逃逸。"""
-        safe_filename = Path(str(filename or "")).name
-        if not safe_filename:
-            raise ValueError("文件名为空，无法创建临时文件路径")
-
-        user_dir = self._get_safe_temp_user_dir(user_id)
-        user_dir.mkdir(parents=True, exist_ok=True)
-
-        file_path = (user_dir / safe_filename).resolve()
-        if file_path.parent != user_dir:
-            raise ValueError(f"检测到非法临时文件路径: {filename}")
-        return file_path
-
     async def setup_scheduler(self):
         """初始化每日自动监控定时任务。"""
         try:
             from apscheduler.schedulers.asyncio import AsyncIOScheduler
-            from apscheduler.triggers.cron import CronTrigger
-
-            timezone = self._get_config_value('timezone', 'Asia/Shanghai')
+            from apscheduler.triggers.interval import IntervalTrigger
+
+            settings, errors = self._read_schedule_settings()
+            if errors:
+                # 只有无效的配置项使用默认值，其余配置照常生效
+                logger.error(f"定时配置部分无效，已改用默认值: {'；'.join(errors)}")
+                self._schedule_config_error = "；".join(errors)
+            timezone = settings["timezone"]
             self._scheduler = AsyncIOScheduler(timezone=timezone)
+            self._apply_schedule_settings(settings)
+
+            credential_interval = self._get_credential_check_interval_hours()
+            if credential_interval > 0:
+                self._scheduler.add_job(
+                    self.revalidate_credentials,
+                    IntervalTrigger(hours=credential_interval, timezone=timezone),
+                    id='credential_revalidate',
+                    replace_existing=True
+                )
+                logger.info(f"凭证巡检任务已启动：每 {credential_interval} 小时一批")
 
-            monitor_time = self._get_config_value('monitor_time', '08:01')
-            hour, minute = map(int, monitor_time.split(':'))
-
+            # 定期检查 monitor_time / timezone / 预取配置，变化时原地改期，无需重启插件
             self._scheduler.add_job(
-                self.daily_auto_check,
-                CronTrigger(hour=hour, minute=minute, timezone=timezone),
-                id='daily_shop_check',
+                self.reload_schedule_config,
+                IntervalTrigger(seconds=self.CONFIG_WATCH_INTERVAL, timezone=timezone),
+                id='schedule_config_watch',
                 replace_existing=True
             )
 
             self._scheduler.start()
-            logger.info(f"自动监控定时任务已启动：每天 {monitor_time} ({timezone})")
+            logger.info(f"自动监控定时任务已启动：每天 {settings['monitor_time']} ({timezone})")
 
         except Exception as e:
             logger.error(f"定时任务调度器启动失败: {e}")
 
+    def _global_schedule(self) -> Dict[str, Any]:
+        """当前生效的定时配置，调度器启动前为默认值。"""
+        return self._applied_schedule or self.DEFAULT_SCHEDULE_SETTINGS
+
+    def _read_schedule_settings(self) -> Tuple[Dict[str, Any], List[str]]:
+        """逐项读取并校验定时相关配置，返回 (配置, 错误信息列表)。
+
+        每项单独校验：无效的项沿用上次生效的值（尚未生效过时用默认值），不影响其他项，
+        因此只有对应的任务保持原计划。
+        """
+        previous = self._global_schedule()
+        settings = dict(previous)
+        errors: List[str] = []
+
+        monitor_time = parse_hhmm(self._get_config_value('monitor_time', '08:01'))
+        if monitor_time is None:
+            errors.append(f"monitor_time 格式应为 HH:MM：{self._get_config_value('monitor_time')}")
+        else:
+            settings["monitor_time"] = f"{monitor_time[0]:02d}:{monitor_time[1]:02d}"
+
+        timezone = str(self._get_config_value('timezone', 'Asia/Shanghai') or 'Asia/Shanghai').strip()
+        try:
+            ZoneInfo(timezone)
+            settings["timezone"] = timezone
+        except Exception:
+            errors.append(f"timezone 无效：{timezone}")
+
+        settings["prefetch_enabled"] = bool(self._get_config_value('prefetch_enabled', True))
+        prefetch_time = parse_hhmm(self._get_config_value('prefetch_time', '08:00'))
+        if prefetch_time is not None:
+            settings["prefetch_time"] = f"{prefetch_time[0]:02d}:{prefetch_time[1]:02d}"
+        elif settings["prefetch_enabled"]:
+            errors.append(f"prefetch_time 格式应为 HH:MM：{self._get_config_value('prefetch_time')}")
+        return settings, errors
+
+    def _apply_schedule_settings(self, settings: Dict[str, Any]):
+        """按配置添加或原地改期每日监控与预取任务，已有任务只替换触发器。"""
+        from apscheduler.triggers.cron import CronTrigger
+
+        timezone = settings["timezone"]
+        hour, minute = parse_hhmm(settings["monitor_time"])
+        trigger = CronTrigger(hour=hour, minute=minute, timezone=timezone)
+        if self._scheduler.get_job('daily_shop_check'):
+            self._scheduler.reschedule_job('daily_shop_check', trigger=trigger)
+        else:
+            self._scheduler.add_job(self.daily_auto_check, trigger, id='daily_shop_check', replace_existing=True)
+
+        if settings["prefetch_enabled"]:
+            prefetch_hour, prefetch_minute = parse_hhmm(settings["prefetch_time"])
+            # 错开整点几秒，等待上游完成轮换
+            trigger = CronTrigger(hour=prefetch_hour, minute=prefetch_minute, second=15, timezone=timezone)
+            if self._scheduler.get_job('shop_prefetch'):
+                self._scheduler.reschedule_job('shop_prefetch', trigger=trigger)
+            else:
+                self._scheduler.add_job(self.prefetch_shops, trigger, id='shop_prefetch', replace_existing=True)
+            logger.info(f"商店预取任务：每天 {settings['prefetch_time']} ({timezone})")
+        elif self._scheduler.get_job('shop_prefetch'):
+            self._scheduler.remove_job('shop_prefetch')
+            logger.info("商店预取任务已关闭")
+
+        self._applied_schedule = settings
+
+    def _sync_config_file(self):
+        """配置文件被直接修改时，把定时相关的配置项同步到内存中的配置。"""
+        config_path = getattr(self.config, "config_path", None)
+        if not config_path or not os.path.exists(config_path):
+            return
+        mtime = os.path.getmtime(config_path)
+        if mtime == self._config_file_mtime:
+            return
+        first_check = self._config_file_mtime is None
+        self._config_file_mtime = mtime
+        if first_check:
+            return
+        try:
+            with open(config_path, "r", encoding="utf-8-sig") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"读取插件配置文件失败: {e}")
+            return
+        for key in self.SCHEDULE_CONFIG_KEYS:
+            if key in data:
+                self.config[key] = data[key]
+
+    async def reload_schedule_config(self) -> str:
+        """重新读取定时配置，变化时原地改期已有任务；配置无效时保持原计划。返回结果说明。"""
+        if not getattr(self, "_scheduler", None):
+            return "定时任务调度器未启动"
+        self._sync_config_file()
+        settings, errors = self._read_schedule_settings()
+        error = "；".join(errors) or None
+        if error and error != self._schedule_config_error:
+            logger.warning(f"定时配置部分无效，对应项保持原值: {error}")
+        self._schedule_config_error = error
+        error_note = f"\n以下配置无效，对应项保持原值：{error}" if error else ""
+        applied = self._applied_schedule or {}
+        if settings == applied:
+            return f"定时配置未变化：每天 {settings['monitor_time']} ({settings['timezone']}){error_note}"
+
+        self._apply_schedule_settings(settings)
+        # 个人定时中未设置时间或时区的部分回退到全局配置，需要重新计算
+        if settings["monitor_time"] != applied.get("monitor_time") or settings["timezone"] != applied.get("timezone"):
+            for user_id, (notify_time, notify_tz) in list(self._user_schedule_settings.items()):
+                if notify_time is None or notify_tz is None:
+                    self._schedule_user(user_id, notify_time, notify_tz)
+        logger.info(
+            f"定时配置已热更新：每日监控 {applied.get('monitor_time')} ({applied.get('timezone')}) -> "
+            f"{settings['monitor_time']} ({settings['timezone']})"
+        )
+        return f"定时配置已更新：每天 {settings['monitor_time']} ({settings['timezone']}){error_note}"
+
+    @timed("daily_check_seconds", is_ok=lambda _: True)
     async def daily_auto_check(self):
-        """执行每日自动监控。"""
+        """执行每日自动监控（未设置个人监控时间的用户）。"""
         logger.info("开始执行每日自动监控任务")
 
         try:
@@ -388,113 +878,559 @@ class ValorantShopPlugin(Star):
             async with db.get_db() as session:
                 session: AsyncSession
                 result = await session.execute(
-                    text("SELECT user_id FROM valo_users WHERE auto_check = 1")
+                    text("""
+                        SELECT user_id, userId, tid, nickname, credential_status FROM valo_users
+                        WHERE auto_check = 1 AND COALESCE(credential_status, 'ok') != 'expired'
+                          AND notify_time IS NULL AND notify_tz IS NULL
+                        ORDER BY user_id
+                    """)
                 )
                 users = result.fetchall()
 
-                if not users:
-                    logger.info("当前没有开启自动监控的用户")
-                    return
+            if not users:
+                logger.info("当前没有开启自动监控的用户")
+                return
 
-                logger.info(f"自动监控用户数量: {len(users)}")
+            await self._prune_notify_log()
+            await self._prune_shop_history()
+            stats = await self._run_sharded_watch_checks(users)
+            self._last_daily_summary = self._format_watch_summary(stats)
+            logger.info(f"每日自动监控完成 - {self._last_daily_summary}")
 
-                for row in users:
-                    user_id = row[0]
+        except Exception as e:
+            logger.error(f"每日自动监控任务执行失败: {e}")
+
+    async def _run_sharded_watch_checks(self, users: list) -> Dict[str, int]:
+        """按游戏账号把用户拆成 daily_shards 个分片，逐个抢占分片租约后执行。
+
+        多个实例同时运行时各自抢占不同分片；本实例抢到的分片在通知队列清空后才标记完成，
+        未完成的分片若持有者崩溃，租约过期后由仍在等待的实例接管。
+        """
+        shards = self._get_daily_shards()
+        shop_day = self._current_shop_day()
+        by_shard: Dict[int, list] = {}
+        for row in users:
+            by_shard.setdefault(shard_of(row[1] or row[0], shards), []).append(row)
+
+        # 各实例从不同分片开始，减少抢占冲突
+        offset = shard_of(self.leases.node_id, shards)
+        jobs = {
+            f"daily:{shop_day}:{shard}": (lambda rows=by_shard[shard]: self._run_watch_checks(rows))
+            for shard in sorted(by_shard, key=lambda shard: (shard - offset) % shards)
+        }
+
+        try:
+            await self.leases.prune(older_than=7 * 86400)
+        except Exception as e:
+            logger.warning(f"清理任务租约失败: {e}")
+
+        stats = await self._run_leased_jobs(jobs, "每日监控分片")
+        stats["shards"] = len(by_shard)
+        return stats
+
+    async def _run_leased_jobs(
+        self,
+        jobs: Dict[str, Callable[[], Awaitable[Dict[str, int]]]],
+        label: str,
+    ) -> Dict[str, int]:
+        """按顺序抢占 jobs 中每个租约并执行对应任务，返回合并后的统计（含本实例执行数 shards_local）。
+
+        抢不到且尚未完成的租约稍后重试，持有者崩溃时租约过期即由本实例接管，
+        直到全部完成或超过 LEASE_TAKEOVER_WAIT。本实例执行的租约在通知队列清空后才标记完成，
+        避免实例在发送前崩溃导致通知丢失。
+        """
+        stats: Dict[str, int] = {"shards_local": 0}
+        pending = list(jobs)
+        deadline = time.monotonic() + self.LEASE_TAKEOVER_WAIT
+        async with AsyncExitStack() as held:
+            while pending:
+                remaining = []
+                for name in pending:
+                    lease = await held.enter_async_context(self.leases.hold(name))
+                    if lease.acquired:
+                        try:
+                            job_stats = await jobs[name]()
+                        except Exception as e:
+                            logger.error(f"{label} {name} 执行失败: {e}")
+                            job_stats = {}
+                        for key, value in job_stats.items():
+                            stats[key] = stats.get(key, 0) + value
+                        stats["shards_local"] += 1
+                    elif not await self.leases.is_done(name):
+                        remaining.append(name)
+                pending = remaining
+                if pending:
+                    if time.monotonic() >= deadline:
+                        logger.warning(f"等待其他实例完成{label}超时，未完成: {pending}")
+                        break
+                    await asyncio.sleep(self.leases.ttl / 2)
+            await self.notifier.drain(timeout=self.LEASE_TAKEOVER_WAIT)
+        return stats
+
+    def _format_watch_summary(self, stats: Dict[str, int]) -> str:
+        summary = (
+            f"{datetime.now().strftime('%Y-%m-%d %H:%M')}：用户 {stats.get('users', 0)}，"
+            f"游戏账号 {stats.get('accounts', 0)}（多账号绑定 {stats.get('shared', 0)}），"
+            f"拉取成功 {stats.get('fetched', 0)}，失败 {stats.get('failed', 0)}，"
+            f"通知入队 {stats.get('notified', 0)}，监控列表为空 {stats.get('empty', 0)}"
+        )
+        if "shards" in stats:
+            summary += f"，本实例处理分片 {stats['shards_local']}/{stats['shards']}"
+        return summary
+
+    async def _run_watch_checks(self, users: list) -> Dict[str, int]:
+        """对一批用户执行监控匹配并通知入队，返回计数。
+
+        users 为 (user_id, userId, tid, nickname, credential_status) 行。同一游戏账号可能被多个聊天账号
+        （QQ、Kook 等）绑定，按游戏 userId 分组后每组只拉取一次商店，再把匹配与通知分发给组内每个聊天账号；
+        组内某个凭证失效时依次换用下一个成员的凭证。
+        """
+        # 租约可能由任意实例领取，以数据库中的监控项为准
+        await self._reload_watch_index()
+
+        # 游戏 userId -> [(聊天 user_id, 配置)]；没有监控项的用户不参与拉取
+        groups: Dict[str, list] = {}
+        skipped_empty = 0
+        for user_id, game_user_id, tid, nickname, credential_status in users:
+            if not self._user_watch_keys.get(user_id):
+                skipped_empty += 1
+                continue
+            user_config = {
+                'userId': game_user_id,
+                'tid': tid,
+                'nickname': nickname,
+                'auto_check': 1,
+                'credential_status': credential_status or 'ok',
+            }
+            groups.setdefault(str(game_user_id or user_id), []).append((user_id, user_config))
+
+        shared_groups = sum(1 for members in groups.values() if len(members) > 1)
+        logger.info(
+            f"自动监控用户数量: {len(users)}，游戏账号 {len(groups)} 个"
+            f"（多账号绑定 {shared_groups} 个），监控列表为空 {skipped_empty} 个"
+        )
+
+        bot_id = self._get_config_value('bot_id', 'default')
+        fetched = failed = notified = 0
+        for game_user_id, members in groups.items():
+            goods_list = None
+            for user_id, user_config in members:
+                goods_list = await self.get_shop_items_raw(user_id, user_config)
+                if goods_list:
+                    break
+            if not goods_list:
+                failed += 1
+                self.metrics.inc("daily_check_fetches_total", status="error")
+                logger.info(f"游戏账号 {game_user_id} 商店数据为空或获取失败（绑定 {len(members)} 个聊天账号）")
+                continue
+            fetched += 1
+            self.metrics.inc("daily_check_fetches_total", status="ok")
+
+            for user_id, _ in members:
+                try:
+                    unified_msg_origin = f"{bot_id}:FriendMessage:{user_id}"
+                    logger.debug("定时任务会话ID: %s", unified_msg_origin)
+                    if await self._notify_watch_matches(user_id, goods_list, unified_msg_origin):
+                        notified += 1
+                except Exception as e:
+                    logger.error(f"检查用户 {user_id} 监控列表时出错: {e}")
+                    continue
+
+        return {
+            "users": len(users),
+            "accounts": len(groups),
+            "shared": shared_groups,
+            "fetched": fetched,
+            "failed": failed,
+            "notified": notified,
+            "empty": skipped_empty,
+        }
+
+    def _effective_user_schedule(self, notify_time: Optional[str], notify_tz: Optional[str]) -> Tuple[int, int, ZoneInfo]:
+        """个人设置为空的部分回退到 monitor_time / timezone。"""
+        schedule = self._global_schedule()
+        hour, minute = parse_hhmm(notify_time or "") or parse_hhmm(schedule["monitor_time"])
+        try:
+            tz = ZoneInfo(notify_tz or schedule["timezone"])
+        except Exception:
+            tz = ZoneInfo(schedule["timezone"])
+        return hour, minute, tz
+
+    def _schedule_user(self, user_id: str, notify_time: Optional[str], notify_tz: Optional[str]):
+        hour, minute, tz = self._effective_user_schedule(notify_time, notify_tz)
+        self._user_schedule_settings[user_id] = (notify_time, notify_tz)
+        self._user_schedule.schedule(user_id, next_run(hour, minute, tz))
+        self._user_schedule_wakeup.set()
+
+    def _unschedule_user(self, user_id: str):
+        self._user_schedule_settings.pop(user_id, None)
+        self._user_schedule.remove(user_id)
+
+    async def _load_user_schedules(self):
+        """启动时把开启监控且设置了个人时间/时区的用户放入堆。"""
+        try:
+            count = await self._sync_user_schedules()
+            logger.info(f"个人监控定时已加载：{count} 个用户")
+        except Exception as e:
+            logger.error(f"加载个人监控定时失败: {e}")
+
+    async def _sync_user_schedules(self) -> int:
+        """按数据库同步堆中的个人定时，返回设置了个人定时的用户数。
+
+        只改动设置发生变化、新增或已取消的用户；设置未变的用户保留原有的下次运行时间，
+        避免在到期但尚未取出时被重算到第二天。
+        """
+        db = self.context.get_db()
+        async with db.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(text("""
+                SELECT user_id, notify_time, notify_tz FROM valo_users
+                WHERE auto_check = 1 AND (notify_time IS NOT NULL OR notify_tz IS NOT NULL)
+            """))
+            desired = {user_id: (notify_time, notify_tz) for user_id, notify_time, notify_tz in result.fetchall()}
+        self._user_schedule_synced_at = time.monotonic()
+        for user_id in list(self._user_schedule_settings):
+            if user_id not in desired:
+                self._unschedule_user(user_id)
+        for user_id, settings in desired.items():
+            if self._user_schedule_settings.get(user_id) != settings or user_id not in self._user_schedule:
+                self._schedule_user(user_id, *settings)
+        return len(desired)
+
+    async def _refresh_user_schedule(self, user_id: str):
+        """按数据库中的开关与个人设置更新该用户在堆中的位置。"""
+        db = self.context.get_db()
+        async with db.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(
+                text("SELECT auto_check, notify_time, notify_tz FROM valo_users WHERE user_id = :user_id"),
+                {"user_id": user_id}
+            )
+            row = result.fetchone()
+        if row and row[0] == 1 and (row[1] is not None or row[2] is not None):
+            self._schedule_user(user_id, row[1], row[2])
+        else:
+            self._unschedule_user(user_id)
+
+    async def _user_schedule_loop(self):
+        """单个循环驱动所有个人监控定时：睡到堆顶时间（最多 60 秒，避免时钟跳变），取出到期用户执行。"""
+        while True:
+            try:
+                if time.monotonic() - self._user_schedule_synced_at >= self.USER_SCHEDULE_SYNC_INTERVAL:
                     try:
-                        bot_id = self._get_config_value('bot_id', 'default')
-                        unified_msg_origin = f"{bot_id}:FriendMessage:{user_id}"
-                        logger.info(f"定时任务会话ID: {unified_msg_origin}")
-                        await self.check_user_watchlist(user_id, unified_msg_origin)
+                        await self._sync_user_schedules()
                     except Exception as e:
-                        logger.error(f"检查用户 {user_id} 监控列表时出错: {e}")
-                        continue
+                        logger.warning(f"同步个人监控定时失败: {e}")
+                        self._user_schedule_synced_at = time.monotonic()
+                next_at = self._user_schedule.peek_time()
+                delay = 60.0 if next_at is None else min(60.0, max(0.0, next_at - time.time()))
+                self._user_schedule_wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._user_schedule_wakeup.wait(), timeout=delay)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
 
+                due = self._user_schedule.pop_due(time.time())
+                if not due:
+                    continue
+                for user_id, _ in due:
+                    notify_time, notify_tz = self._user_schedule_settings.get(user_id, (None, None))
+                    hour, minute, tz = self._effective_user_schedule(notify_time, notify_tz)
+                    self._user_schedule.schedule(user_id, next_run(hour, minute, tz))
+                # 在后台执行：等待其他实例的分片（或接管崩溃实例的分片）时不阻塞后续到期的用户
+                task = asyncio.create_task(self._run_scheduled_user_checks(due))
+                self._user_check_tasks.add(task)
+                task.add_done_callback(self._user_check_tasks.discard)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"个人监控定时循环出错: {e}")
+                await asyncio.sleep(5)
+
+    async def _run_scheduled_user_checks(self, due: list):
+        """对到期的个人定时用户执行监控。
+
+        due 为 (user_id, 计划时间戳)；按计划时间与分片抢占租约，多实例时同一时刻的同一分片只由一个实例执行，
+        与每日监控相同，持有者崩溃的分片在租约过期后由其他实例接管。
+        本实例的堆只决定何时、执行哪些 (时间, 分片)；分片内的用户在执行时按数据库中当前的个人设置重新查询，
+        因此在其他实例上新设置、修改或恢复默认的用户也能正确归属。
+        """
+        logger.info(f"个人定时监控：{len(due)} 个用户到期")
+        shards = self._get_daily_shards()
+        slots = {(int(when), shard_of(user_id, shards)) for user_id, when in due}
+
+        offset = shard_of(self.leases.node_id, shards)
+        jobs = {
+            f"personal:{when}:{shard}": (lambda when=when, shard=shard: self._run_personal_slot(when, shard, shards))
+            for when, shard in sorted(slots, key=lambda slot: (slot[0], (slot[1] - offset) % shards))
+        }
+        stats = await self._run_leased_jobs(jobs, "个人定时监控分片")
+        stats["shards"] = len(jobs)
+        logger.info(f"个人定时监控完成 - {self._format_watch_summary(stats)}")
+
+    def _schedule_slot_matches(self, notify_time: Optional[str], notify_tz: Optional[str], when: int) -> bool:
+        """个人设置（空值回退到全局配置）是否在 when 这一时刻触发。"""
+        hour, minute, tz = self._effective_user_schedule(notify_time, notify_tz)
+        local = datetime.fromtimestamp(when, tz)
+        return (local.hour, local.minute, local.second) == (hour, minute, 0)
+
+    async def _run_personal_slot(self, when: int, shard: int, shards: int) -> Dict[str, int]:
+        """执行一个个人定时分片：按数据库中当前的 notify_time/notify_tz 找出在 when 触发、属于该分片的用户。"""
+        db = self.context.get_db()
+        async with db.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(text("""
+                SELECT DISTINCT notify_time, notify_tz FROM valo_users
+                WHERE auto_check = 1 AND (notify_time IS NOT NULL OR notify_tz IS NOT NULL)
+            """))
+            slot_settings = [
+                (notify_time, notify_tz) for notify_time, notify_tz in result.fetchall()
+                if self._schedule_slot_matches(notify_time, notify_tz, when)
+            ]
+            if not slot_settings:
+                return {}
+            conditions = " OR ".join(
+                f"(notify_time IS :time_{i} AND notify_tz IS :tz_{i})" for i in range(len(slot_settings))
+            )
+            params: Dict[str, Any] = {}
+            for i, (notify_time, notify_tz) in enumerate(slot_settings):
+                params[f"time_{i}"] = notify_time
+                params[f"tz_{i}"] = notify_tz
+            result = await session.execute(
+                text(f"""
+                    SELECT user_id, userId, tid, nickname, credential_status FROM valo_users
+                    WHERE auto_check = 1 AND COALESCE(credential_status, 'ok') != 'expired'
+                      AND ({conditions})
+                """),
+                params,
+            )
+            users = [row for row in result.fetchall() if shard_of(row[0], shards) == shard]
+        if not users:
+            return {}
+        return await self._run_watch_checks(users)
+
+    def _describe_user_schedule(self, user_config: Optional[Dict[str, Any]]) -> Tuple[str, str]:
+        """返回用户实际生效的 (监控时间, 时区) 文本。"""
+        user_config = user_config or {}
+        schedule = self._global_schedule()
+        notify_time = user_config.get('notify_time') or schedule["monitor_time"]
+        notify_tz = user_config.get('notify_tz') or schedule["timezone"]
+        return notify_time, notify_tz
+
+    async def set_user_notify_schedule(self, user_id: str, notify_time: Optional[str], notify_tz: Optional[str]) -> bool:
+        """保存个人监控时间与时区（None 表示使用全局配置）。"""
+        try:
+            db = self.context.get_db()
+            async with db.get_db() as session:
+                session: AsyncSession
+                async with session.begin():
+                    result = await session.execute(
+                        text("""
+                            UPDATE valo_users SET notify_time = :notify_time, notify_tz = :notify_tz,
+                                updated_at = CURRENT_TIMESTAMP
+                            WHERE user_id = :user_id
+                        """),
+                        {"notify_time": notify_time, "notify_tz": notify_tz, "user_id": user_id}
+                    )
+                    if not result.rowcount:
+                        return False
+            await self._refresh_user_schedule(user_id)
+            logger.info(f"用户 {user_id} 个人监控时间更新为: {notify_time or '默认'} ({notify_tz or '默认'})")
+            return True
         except Exception as e:
-            logger.error(f"每日自动监控任务执行失败: {e}")
+            logger.error(f"更新个人监控时间失败: {e}")
+            return False
 
-    async def check_user_watchlist(self, user_id: str, unified_msg_origin: str = None):
-        """检查用户监控列表并匹配今日商店。"""
-        logger.info(f"开始检查用户 {user_id} 的监控列表")
+    async def check_user_watchlist(self, user_id: str) -> str:
+        """手动查询：按数据库中的监控列表匹配今日商店，返回直接回复给用户的文本。
+
+        不经过通知队列（队列按平台限速，每日监控后可能积压大量通知），也不受当日通知去重影响。
+        """
+        self._log("watchlist", logging.INFO, "开始检查用户 %s 的监控列表", user_id)
 
         user_config = await self.get_user_config(user_id)
         if not user_config:
-            logger.warning(f"用户 {user_id} 未绑定配置，跳过监控")
-            return
+            return "请先使用 /瓦 绑定账号"
 
         watchlist = await self.get_watchlist(user_id)
         if not watchlist:
-            logger.info(f"用户 {user_id} 监控列表为空")
-            return
+            return "您的监控列表为空\n使用 /商店监控 添加 \"商品名称\" 来添加监控项"
 
         goods_list = await self.get_shop_items_raw(user_id, user_config)
         if not goods_list:
             logger.info(f"用户 {user_id} 商店数据为空或获取失败")
-            return
+            return "获取今日商店失败，请稍后重试"
 
+        matched_items = self._match_watchlist(watchlist, goods_list)
+        if not matched_items:
+            return "今日商店中没有你监控的商品"
+        return self._format_watch_notification(self._current_shop_day(), matched_items)
+
+    def _match_watchlist(self, watchlist: list, goods_list: list) -> list:
+        """用单个用户的监控列表匹配商品列表（规则与共用索引一致）。"""
+        linked_ids = {str(item['goods_id']) for item in watchlist if item.get('goods_id')}
+        matcher = WatchMatcher((item['item_name'], None) for item in watchlist if not item.get('goods_id'))
         matched_items = []
-        watchlist_names = [item['item_name'] for item in watchlist]
+        for goods in goods_list:
+            goods_name = goods.get('goods_name', '')
+            goods_id = str(goods.get('goods_id') or '') or None
+            if not goods_id:
+                hit = self.catalog.exact(goods_name)
+                goods_id = hit[1] if hit else None
+            if (goods_id and goods_id in linked_ids) or matcher.first_match(goods_name):
+                matched_items.append({'name': goods_name, 'price': goods.get('rmb_price', '0')})
+        return matched_items
+
+    @staticmethod
+    def _format_watch_notification(shop_day: str, matched_items: list) -> str:
+        items_text = "\n".join([f"  - {item['name']} ({item['price']})" for item in matched_items])
+        matched_names = [item['name'] for item in matched_items]
+        return (
+            f"{shop_day} 商店监控通知\n\n"
+            f"以下监控商品已上架：\n"
+            f"{items_text}\n\n"
+            f"请使用 /每日商店 查看详情\n\n"
+            f"匹配商品：{', '.join(matched_names)}"
+        )
 
-        logger.info(f"监控列表: {watchlist_names}")
-        logger.info(f"商店商品: {[goods.get('goods_name', '') for goods in goods_list]}")
+    async def _notify_watch_matches(
+        self,
+        user_id: str,
+        goods_list: list,
+        unified_msg_origin: str = None,
+    ) -> bool:
+        """将商品列表与用户的监控项匹配，有命中时通知入队；返回是否入队。"""
+        matched_items = []
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("商店商品: %s", [goods.get('goods_name', '') for goods in goods_list])
 
         for goods in goods_list:
             goods_name = goods.get('goods_name', '')
-            for watch_name in watchlist_names:
-                if watch_name in goods_name or goods_name in watch_name:
-                    matched_items.append({
-                        'name': goods_name,
-                        'price': goods.get('rmb_price', '0')
-                    })
-                    logger.info(f"匹配成功: {goods_name}")
-                    break
+            goods_id = str(goods.get('goods_id') or '') or None
+            if user_id in self._goods_subscribers(goods_name, goods_id):
+                matched_items.append({
+                    'name': goods_name,
+                    'price': goods.get('rmb_price', '0')
+                })
+                self._log("watchlist", logging.DEBUG, "匹配成功: %s", goods_name)
 
         if matched_items:
             logger.info(f"用户 {user_id} 命中 {len(matched_items)} 个监控商品")
-            await self.send_notification(user_id, matched_items, unified_msg_origin)
-        else:
-            logger.info(f"用户 {user_id} 今日无监控商品上架")
+            return await self.send_notification(user_id, matched_items, unified_msg_origin)
+        self._log("watchlist", logging.INFO, "用户 %s 今日无监控商品上架", user_id)
+        return False
 
-    async def send_notification(self, user_id: str, matched_items: list, unified_msg_origin: str = None):
-        """发送监控命中通知。"""
+    async def send_notification(
+        self,
+        user_id: str,
+        matched_items: list,
+        unified_msg_origin: str = None,
+    ) -> bool:
+        """将定时监控的命中通知放入发送队列，返回是否入队；跳过当日已通知或已在队列中的商品。"""
         try:
-            from datetime import datetime
-            current_date = datetime.now().strftime("%Y-%m-%d")
+            shop_day = self._current_shop_day()
+            notified = await self._get_notified_items(user_id, shop_day)
+            fresh_items = [
+                item for item in matched_items
+                if item['name'] not in notified and (user_id, shop_day, item['name']) not in self._notify_pending
+            ]
+            if len(fresh_items) < len(matched_items):
+                self.metrics.inc("notifications_total", status="deduped")
+                self._log("watchlist", logging.INFO, "用户 %s 有 %d 个商品今日已通知，跳过", user_id, len(matched_items) - len(fresh_items))
+            matched_items = fresh_items
+            if not matched_items:
+                return False
 
-            items_text = "\n".join([f"  - {item['name']} ({item['price']})" for item in matched_items])
             matched_names = [item['name'] for item in matched_items]
-
-            notification_text = (
-                f"{current_date} 商店监控通知\n\n"
-                f"以下监控商品已上架：\n"
-                f"{items_text}\n\n"
-                f"请使用 /每日商店 查看详情\n\n"
-                f"匹配商品：{', '.join(matched_names)}"
-            )
-
-            from astrbot.api.event import MessageChain
+            notification_text = self._format_watch_notification(shop_day, matched_items)
 
             if unified_msg_origin:
                 session_id = unified_msg_origin
             else:
                 session_id = f"qq/{user_id}"
 
-            message_chain = MessageChain().message(notification_text)
-            await self.context.send_message(session_id, message_chain)
-            logger.info(f"已发送通知给用户 {user_id}, 会话ID: {session_id}")
+            pending_keys = [(user_id, shop_day, name) for name in matched_names]
+            self._notify_pending.update(pending_keys)
+            self.notifier.submit(Notification(session_id, notification_text, payload=pending_keys))
+            self._log("watchlist", logging.INFO, "用户 %s 的通知已入队，会话ID: %s", user_id, session_id)
+            return True
+
+        except Exception as e:
+            self.metrics.inc("notifications_total", status="error")
+            logger.error(f"通知入队失败: {e}")
+            return False
+
+    async def _send_text_message(self, session_id: str, message: str):
+        from astrbot.api.event import MessageChain
+
+        return await self.context.send_message(session_id, MessageChain().message(message))
+
+    async def _get_notified_items(self, user_id: str, shop_day: str) -> Set[str]:
+        db = self.context.get_db()
+        async with db.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(
+                text("SELECT item_name FROM valo_notify_log WHERE user_id = :user_id AND shop_day = :shop_day"),
+                {"user_id": user_id, "shop_day": shop_day}
+            )
+            return {row[0] for row in result.fetchall()}
+
+    async def _on_notification_delivered(self, notification: Notification):
+        """通知送达后写入 valo_notify_log，供当日去重。"""
+        pending_keys = notification.payload or []
+        self._notify_pending.difference_update(pending_keys)
+        self.metrics.inc("notifications_total", status="ok")
+        if notification.attempts > 1:
+            logger.info(f"通知第 {notification.attempts} 次发送成功: {notification.session_id}")
+        try:
+            db = self.context.get_db()
+            async with db.get_db() as session:
+                session: AsyncSession
+                async with session.begin():
+                    for user_id, shop_day, item_name in pending_keys:
+                        await session.execute(
+                            text("""
+                                INSERT OR IGNORE INTO valo_notify_log (user_id, shop_day, item_name)
+                                VALUES (:user_id, :shop_day, :item_name)
+                            """),
+                            {"user_id": user_id, "shop_day": shop_day, "item_name": item_name}
+                        )
+        except Exception as e:
+            logger.error(f"记录通知日志失败: {e}")
+
+    async def _on_notification_failed(self, notification: Notification):
+        self._notify_pending.difference_update(notification.payload or [])
+        self.metrics.inc("notifications_total", status="error")
 
+    async def _prune_notify_log(self, keep_days: int = 7):
+        """删除 keep_days 天之前的通知记录。"""
+        cutoff = (datetime.now(ZoneInfo(self.SHOP_TIMEZONE)) - timedelta(days=keep_days)).strftime("%Y-%m-%d")
+        try:
+            db = self.context.get_db()
+            async with db.get_db() as session:
+                session: AsyncSession
+                async with session.begin():
+                    await session.execute(
+                        text("DELETE FROM valo_notify_log WHERE shop_day < :cutoff"),
+                        {"cutoff": cutoff}
+                    )
         except Exception as e:
-            logger.error(f"发送通知失败: {e}")
+            logger.warning(f"清理通知记录失败: {e}")
 
-    async def add_watch_item(self, user_id: str, item_name: str) -> bool:
-        """添加监控项。"""
+    async def add_watch_item(self, user_id: str, item_name: str, goods_id: Optional[str] = None) -> bool:
+        """添加监控项；goods_id 不为空时按商品 ID 精确匹配。"""
         try:
             db = self.context.get_db()
             async with db.get_db() as session:
                 session: AsyncSession
                 async with session.begin():
                     result = await session.execute(
-                        text("SELECT COUNT(*) FROM valo_watchlist WHERE user_id = :user_id AND item_name = :item_name"),
-                        {"user_id": user_id, "item_name": item_name}
+                        text("""
+                            SELECT COUNT(*) FROM valo_watchlist WHERE user_id = :user_id
+                            AND (item_name = :item_name OR (:goods_id IS NOT NULL AND goods_id = :goods_id))
+                        """),
+                        {"user_id": user_id, "item_name": item_name, "goods_id": goods_id}
                     )
                     count = result.scalar()
                     
@@ -502,11 +1438,22 @@ class ValorantShopPlugin(Star):
                         return False  # 已存在
                     
                     await session.execute(
-                        text("INSERT INTO valo_watchlist (user_id, item_name) VALUES (:user_id, :item_name)"),
-                        {"user_id": user_id, "item_name": item_name}
+                        text("INSERT INTO valo_watchlist (user_id, item_name, goods_id) VALUES (:user_id, :item_name, :goods_id)"),
+                        {"user_id": user_id, "item_name": item_name, "goods_id": goods_id}
                     )
+                    term_key = self._watch_term_key(item_name, goods_id)
+                    if term_key:
+                        await session.execute(
+                            text("""
+                                INSERT OR REPLACE INTO valo_watch_index (term_key, user_id, item_name)
+                                VALUES (:term_key, :user_id, :item_name)
+                            """),
+                            {"term_key": term_key, "user_id": user_id, "item_name": item_name}
+                        )
                     logger.info(f"用户 {user_id} 添加监控项: {item_name}")
-                    return True
+                if term_key:
+                    self._index_watch_term(term_key, user_id, item_name)
+                return True
 
         except Exception as e:
             logger.error(f"添加监控项失败: {e}")
@@ -519,17 +1466,36 @@ class ValorantShopPlugin(Star):
             async with db.get_db() as session:
                 session: AsyncSession
                 async with session.begin():
+                    result = await session.execute(
+                        text("SELECT term_key FROM valo_watch_index WHERE user_id = :user_id AND item_name = :item_name"),
+                        {"user_id": user_id, "item_name": item_name}
+                    )
+                    term_key = result.scalar() or index_key(item_name)
                     result = await session.execute(
                         text("DELETE FROM valo_watchlist WHERE user_id = :user_id AND item_name = :item_name"),
                         {"user_id": user_id, "item_name": item_name}
                     )
                     
-                    if result.rowcount > 0:
-                        logger.info(f"用户 {user_id} 删除监控项: {item_name}")
-                        return True
-                    else:
-                        logger.warning(f"用户 {user_id} 尝试删除不存在的监控项: {item_name}")
-                        return False
+                    deleted = result.rowcount > 0
+                    remaining_names: list = []
+                    if deleted and term_key:
+                        await session.execute(
+                            text("DELETE FROM valo_watch_index WHERE user_id = :user_id AND item_name = :item_name"),
+                            {"user_id": user_id, "item_name": item_name}
+                        )
+                        # 同一用户可能有词序不同但归一化相同的其他监控项
+                        remaining = await session.execute(
+                            text("SELECT item_name FROM valo_watch_index WHERE user_id = :user_id AND term_key = :term_key"),
+                            {"user_id": user_id, "term_key": term_key}
+                        )
+                        remaining_names = [row[0] for row in remaining.fetchall()]
+                if deleted:
+                    logger.info(f"用户 {user_id} 删除监控项: {item_name}")
+                    if term_key:
+                        self._unindex_watch_term(term_key, user_id, item_name, remaining_names)
+                else:
+                    logger.warning(f"用户 {user_id} 尝试删除不存在的监控项: {item_name}")
+                return deleted
 
         except Exception as e:
             logger.error(f"删除监控项失败: {e}")
@@ -542,7 +1508,7 @@ class ValorantShopPlugin(Star):
             async with db.get_db() as session:
                 session: AsyncSession
                 result = await session.execute(
-                    text("SELECT item_name, created_at FROM valo_watchlist WHERE user_id = :user_id ORDER BY created_at"),
+                    text("SELECT item_name, created_at, goods_id FROM valo_watchlist WHERE user_id = :user_id ORDER BY created_at"),
                     {"user_id": user_id}
                 )
                 rows = result.fetchall()
@@ -551,15 +1517,204 @@ class ValorantShopPlugin(Star):
                 for row in rows:
                     watchlist.append({
                         'item_name': row[0],
-                        'created_at': row[1]
+                        'created_at': row[1],
+                        'goods_id': row[2],
                     })
 
-                logger.info(f"用户 {user_id} 监控项数量: {len(watchlist)}")
+                logger.debug("用户 %s 监控项数量: %d", user_id, len(watchlist))
                 return watchlist
 
-        except Exception as e:
-            logger.error(f"获取监控列表失败: {e}")
-            return []
+        except Exception as e:
+            logger.error(f"获取监控列表失败: {e}")
+            return []
+
+    async def _load_catalog(self):
+        """从商店历史归档加载商品目录。"""
+        try:
+            db = self.context.get_db()
+            async with db.get_db() as session:
+                session: AsyncSession
+                result = await session.execute(text("""
+                    SELECT n.name, MAX(h.goods_id) FROM valo_goods_names n
+                    LEFT JOIN valo_shop_history h ON h.name_id = n.id
+                    GROUP BY n.id
+                """))
+                for name, goods_id in result.fetchall():
+                    self.catalog.add(name, goods_id)
+            logger.info(f"商品目录已加载：{len(self.catalog)} 个商品")
+        except Exception as e:
+            logger.error(f"加载商品目录失败: {e}")
+
+    @staticmethod
+    def _watch_term_key(item_name: str, goods_id: Optional[str]) -> str:
+        """倒排索引键：关联了商品 ID 的监控项用 "id:<goods_id>"，其余用归一化监控词。"""
+        return f"id:{goods_id}" if goods_id else index_key(item_name)
+
+    def _canonical_watch_target(self, item_name: str) -> Tuple[Optional[Tuple[str, str]], int]:
+        """返回 (可规范化的 (商品名, goods_id), 按监控词规则命中的目录商品数)。
+
+        只有输入与某个商品名完全一致、且不会作为关键词命中其他商品时才规范化，
+        像 "幻影" 这样覆盖多个皮肤的关键词保留原文匹配。
+        """
+        matched = len(self.catalog.keyword_matches(item_name))
+        hit = self.catalog.exact(item_name)
+        if hit and hit[1] and matched <= 1:
+            return (hit[0], hit[1]), matched
+        return None, matched
+
+    async def _load_watch_index(self):
+        """从 valo_watch_index 重建内存倒排索引。
+
+        同时补齐旧版本监控项缺失的索引行，并把与目录商品名完全一致的旧监控项关联到 goods_id。
+        """
+        db = self.context.get_db()
+        async with db.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                result = await session.execute(text("""
+                    SELECT w.user_id, w.item_name, w.goods_id, i.term_key FROM valo_watchlist w
+                    LEFT JOIN valo_watch_index i ON i.user_id = w.user_id AND i.item_name = w.item_name
+                """))
+                rows = result.fetchall()
+
+                linked = repaired = 0
+                for user_id, item_name, goods_id, term_key in rows:
+                    if not goods_id:
+                        # 只有与目录商品名完全一致的监控项才需要统计关键词命中数，
+                        # 统计走目录索引，不随目录大小线性增长
+                        hit = self.catalog.exact(item_name)
+                        if hit and hit[1] and len(self.catalog.keyword_matches(item_name)) <= 1:
+                            goods_id = hit[1]
+                            await session.execute(
+                                text("UPDATE valo_watchlist SET goods_id = :goods_id WHERE user_id = :user_id AND item_name = :item_name"),
+                                {"goods_id": goods_id, "user_id": user_id, "item_name": item_name}
+                            )
+                            linked += 1
+                    expected_key = self._watch_term_key(item_name, goods_id)
+                    if expected_key and expected_key != term_key:
+                        await session.execute(
+                            text("""
+                                INSERT OR REPLACE INTO valo_watch_index (term_key, user_id, item_name)
+                                VALUES (:term_key, :user_id, :item_name)
+                            """),
+                            {"term_key": expected_key, "user_id": user_id, "item_name": item_name}
+                        )
+                        repaired += 1
+                if linked or repaired:
+                    logger.info(f"监控项索引修复 {repaired} 个，其中关联到商品 ID {linked} 个")
+                result = await session.execute(text("SELECT term_key, user_id, item_name FROM valo_watch_index"))
+                rows = result.fetchall()
+
+        self._rebuild_watch_index(rows)
+        logger.info(f"监控词倒排索引已加载：{len(self._watch_index)} 个监控词，{len(self._user_watch_keys)} 个用户")
+
+    async def _reload_watch_index(self):
+        """从 valo_watch_index 重新读取倒排索引。
+
+        多实例共用数据库时，用户可能通过其他实例增删监控项，执行监控分片前先与数据库同步。
+        """
+        db = self.context.get_db()
+        async with db.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(text("SELECT term_key, user_id, item_name FROM valo_watch_index"))
+            rows = result.fetchall()
+        self._rebuild_watch_index(rows)
+        self._log("watchlist", logging.DEBUG, "监控词倒排索引已同步：%d 个监控词", len(self._watch_index))
+
+    def _rebuild_watch_index(self, rows):
+        # 读取数据库后同步重建（中间没有 await），其他协程不会看到重建到一半的索引
+        self._watch_index.clear()
+        self._watch_index_names.clear()
+        self._watch_index_texts.clear()
+        self._user_watch_keys.clear()
+        for term_key, user_id, item_name in rows:
+            self._index_watch_term(term_key, user_id, item_name)
+
+    @staticmethod
+    def _watch_order_text(item_name: str) -> str:
+        """归一化但保持词序的监控词，词序相同的监控词在匹配上完全等价。"""
+        return " ".join(tokenize(item_name))
+
+    def _index_watch_term(self, term_key: str, user_id: str, item_name: str):
+        self._watch_index.setdefault(term_key, set()).add(user_id)
+        self._watch_index_names.setdefault(term_key, item_name)
+        if not term_key.startswith("id:"):
+            texts = self._watch_index_texts.setdefault(term_key, {})
+            texts.setdefault(self._watch_order_text(item_name), set()).add(user_id)
+        self._user_watch_keys.setdefault(user_id, set()).add(term_key)
+        self._invalidate_watch_index_caches()
+
+    def _unindex_watch_term(self, term_key: str, user_id: str, item_name: str, remaining_names: Iterable[str] = ()):
+        """移除用户的一个监控项；remaining_names 为该用户仍保留的、同一归一化键下的其他监控项。"""
+        remaining_orders = {self._watch_order_text(name) for name in remaining_names}
+        texts = self._watch_index_texts.get(term_key)
+        if texts is not None:
+            order_text = self._watch_order_text(item_name)
+            if order_text not in remaining_orders and order_text in texts:
+                texts[order_text].discard(user_id)
+                if not texts[order_text]:
+                    del texts[order_text]
+            if not texts:
+                del self._watch_index_texts[term_key]
+            elif self._watch_order_text(self._watch_index_names.get(term_key, "")) not in texts:
+                # 展示用原文对应的监控项已无人订阅时换成仍在使用的写法
+                self._watch_index_names[term_key] = next(iter(texts))
+
+        if not remaining_orders:
+            subscribers = self._watch_index.get(term_key)
+            if subscribers is not None:
+                subscribers.discard(user_id)
+                if not subscribers:
+                    del self._watch_index[term_key]
+                    self._watch_index_names.pop(term_key, None)
+            user_keys = self._user_watch_keys.get(user_id)
+            if user_keys is not None:
+                user_keys.discard(term_key)
+                if not user_keys:
+                    del self._user_watch_keys[user_id]
+        self._invalidate_watch_index_caches()
+
+    def _invalidate_watch_index_caches(self):
+        self._watch_index_matcher = None
+        self._goods_subscribers_memo.clear()
+
+    def _goods_subscribers(self, goods_name: str, goods_id: Optional[str] = None) -> Set[str]:
+        """返回监控了该商品的全部用户。
+
+        关联了 goods_id 的监控项按 id 直接查找，其余监控项由共用的匹配器按商品名匹配；
+        结果缓存到索引下次变化，每日任务中对每个用户只需做集合查询。
+        """
+        memo_key = (goods_name, goods_id)
+        subscribers = self._goods_subscribers_memo.get(memo_key)
+        if subscribers is not None:
+            return subscribers
+        if self._watch_index_matcher is None:
+            # 同一归一化键下每种词序各编译一条：词元规则对它们同时命中（即该键的全部订阅者），
+            # 依赖词序的 "商品名包含在监控词中" 规则只命中对应写法的订阅者
+            self._watch_index_matcher = WatchMatcher(
+                (order_text, (key, order_text))
+                for key, texts in self._watch_index_texts.items()
+                for order_text in texts
+            )
+        subscribers = set()
+        for _, (term_key, order_text) in self._watch_index_matcher.match(goods_name):
+            subscribers |= self._watch_index_texts.get(term_key, {}).get(order_text, set())
+        if not goods_id:
+            # 个别响应缺少 goods_id 时按目录中的同名商品补全
+            hit = self.catalog.exact(goods_name)
+            goods_id = hit[1] if hit else None
+        if goods_id:
+            subscribers |= self._watch_index.get(f"id:{goods_id}", set())
+        self._goods_subscribers_memo[memo_key] = subscribers
+        return subscribers
+
+    def get_watch_term_popularity(self, item_name: str) -> int:
+        """监控某个商品（按归一化名称或关联的商品 ID）的用户数。"""
+        subscribers = set(self._watch_index.get(index_key(item_name), ()))
+        hit = self.catalog.exact(item_name)
+        if hit and hit[1]:
+            subscribers |= self._watch_index.get(f"id:{hit[1]}", set())
+        return len(subscribers)
 
     async def update_auto_check(self, user_id: str, status: int):
         """更新自动监控开关状态。"""
@@ -573,6 +1728,7 @@ class ValorantShopPlugin(Star):
                         {"status": status, "user_id": user_id}
                     )
                     logger.info(f"用户 {user_id} 自动查询状态更新为: {status}")
+            await self._refresh_user_schedule(user_id)
 
         except Exception as e:
             logger.error(f"更新自动查询状态失败: {e}")
@@ -595,108 +1751,6 @@ class ValorantShopPlugin(Star):
             token += (token << 5) + ord(ch)
         return token & 2147483647
 
-    def _parse_ptui_callback(self, text: str) -> Optional[Dict[str, str]]:
-        """??"""
-        match = re.search(r"ptuiCB\('([^']*)','([^']*)','([^']*)','([^']*)','([^']*)'", text)
-        if not match:
-            return None
-
-        redirect_url = match.group(3).replace("\\/", "/").replace("\\x26", "&")
-        return {
-            "code": match.group(1),
-            "redirect_url": redirect_url,
-            "message": match.group(5),
-        }
-
-    def _extract_login_data_from_success_url(self, success_url: str) -> Dict[str, Any]:
-        """??"""
-        def normalize_url(url: str) -> str:
-            return (url or "").replace("\\/", "/").replace("\\x26", "&").strip()
-
-        def parse_param_str(raw: str) -> Dict[str, str]:
-            parsed: Dict[str, str] = {}
-            if not raw:
-                return parsed
-            part = raw.replace("#&", "&").lstrip("&")
-            for key, value in urllib.parse.parse_qs(part, keep_blank_values=True).items():
-                if value:
-                    parsed[key] = value[0]
-            return parsed
-
-        nested_keys = {
-            "u1",
-            "url",
-            "jump_url",
-            "redirect_uri",
-            "redirect_url",
-            "target_url",
-            "s_url",
-            "f_url",
-            "qtarget",
-            "jump",
-            "ru",
-        }
-
-        merged_params: Dict[str, str] = {}
-        queue = [normalize_url(success_url)]
-        visited = set()
-
-        while queue:
-            candidate = queue.pop(0)
-            if not candidate or candidate in visited:
-                continue
-            visited.add(candidate)
-
-            decoded = candidate
-            for _ in range(3):
-                next_decoded = urllib.parse.unquote(decoded)
-                if next_decoded == decoded:
-                    break
-                decoded = next_decoded
-
-            parsed_url = urllib.parse.urlparse(decoded)
-            candidate_params: Dict[str, str] = {}
-            for raw_part in (parsed_url.query, parsed_url.fragment):
-                candidate_params.update(parse_param_str(raw_part))
-
-            if not candidate_params and ("openid=" in decoded or "access_token=" in decoded):
-                candidate_params.update(parse_param_str(decoded))
-
-            if candidate_params:
-                logger.info(
-                    f"[HTTP登录] 参数提取：来源={decoded[:180]}，命中键={sorted(candidate_params.keys())}"
-                )
-            for key, value in candidate_params.items():
-                if key not in merged_params:
-                    merged_params[key] = value
-
-            for nested_key in nested_keys:
-                nested_value = candidate_params.get(nested_key, "")
-                if nested_value and nested_value not in visited:
-                    logger.info(
-                        f"[HTTP登录] 发现嵌套跳转参数 {nested_key}={str(nested_value)[:220]}"
-                    )
-                    queue.append(normalize_url(nested_value))
-
-        logger.info(
-            f"[HTTP登录] 汇总参数键={sorted(merged_params.keys())}, "
-            f"openid={bool(merged_params.get('openid'))}, "
-            f"access_token={bool(merged_params.get('access_token'))}"
-        )
-        return {
-            "openid": merged_params.get("openid", ""),
-            "appid": merged_params.get("appid", ""),
-            "access_token": merged_params.get("access_token", ""),
-            "pay_token": merged_params.get("pay_token", ""),
-            "key": merged_params.get("key", ""),
-            "redirect_uri_key": merged_params.get("redirect_uri_key", ""),
-            "expires_in": merged_params.get("expires_in", "7776000"),
-            "pf": merged_params.get("pf", "openmobile_android"),
-            "status_os": merged_params.get("status_os", "12"),
-            "status_machine": merged_params.get("status_machine", ""),
-            "full_params": merged_params,
-        }
-
     def _build_pt_openlogin_data(self, login_url: str, session: aiohttp.ClientSession) -> str:
         """构造 ptqrlogin 请求里的 pt_openlogin_data。"""
         parsed = urllib.parse.urlparse(login_url)
@@ -706,7 +1760,7 @@ class ValorantShopPlugin(Star):
             values = query_map.get(name, [])
             return values[0] if values else default
 
-        tid = self._get_cookie_value(session, "https://xui.ptlogin2.qq.com", "idt") or str(int(time.time()))
+        tid = self._get_cookie_value(session, self.endpoints["ptlogin"], "idt") or str(int(time.time()))
         auth_time = str(int(time.time() * 1000))
         items = [
             ("which", ""),
@@ -742,60 +1796,23 @@ class ValorantShopPlugin(Star):
             ("loginty", q("loginty", "6")),
         ]
         pt_openlogin_data = urllib.parse.urlencode(items)
-        logger.info(
-            f"[HTTP登录] 生成pt_openlogin_data: len={len(pt_openlogin_data)}, "
-            f"tid={tid}, auth_time={auth_time}, sign_prefix={q('sign', '')[:8]}, "
-            f"h5sig_prefix={q('h5sig', '')[:8]}"
+        logger.debug(
+            "[HTTP登录] 生成pt_openlogin_data: len=%d, tid=%s, auth_time=%s, sign_prefix=%s, h5sig_prefix=%s",
+            len(pt_openlogin_data), tid, auth_time, q('sign', '')[:8], q('h5sig', '')[:8],
         )
         return pt_openlogin_data
 
-    def _extract_jsver_from_login_page(self, login_page: str) -> str:
-        """从 xlogin HTML 中提取 jsver（monorepo 版本号）。"""
-        text = login_page or ""
-        patterns = [
-            r"/monorepo/([0-9A-Za-z]+)/ptlogin/js/login_10\.js",
-            r"/monorepo/([0-9A-Za-z]+)/ptlogin/js/",
-            r"https://qq-web\.cdn-go\.cn/monorepo/([0-9A-Za-z]+)",
-        ]
-        for pattern in patterns:
-            m = re.search(pattern, text)
-            if m:
-                return m.group(1)
-        return "28d22679"
-
     def _build_aegis_uid(self, session: aiohttp.ClientSession) -> str:
         """构造 ptqrlogin 的 aegis_uid。"""
-        aegis_uid = self._get_cookie_value(session, "https://xui.ptlogin2.qq.com", "__aegis_uid")
+        aegis_uid = self._get_cookie_value(session, self.endpoints["ptlogin"], "__aegis_uid")
         if aegis_uid:
             return aegis_uid
-        server_ip = self._get_cookie_value(session, "https://xui.ptlogin2.qq.com", "pt_serverip")
-        client_ip = self._get_cookie_value(session, "https://xui.ptlogin2.qq.com", "pt_clientip")
+        server_ip = self._get_cookie_value(session, self.endpoints["ptlogin"], "pt_serverip")
+        client_ip = self._get_cookie_value(session, self.endpoints["ptlogin"], "pt_clientip")
         if server_ip and client_ip:
             return f"{server_ip}-{client_ip}-4458"
         return ""
 
-    def _extract_auth_url_from_callback_body(self, text: str) -> str:
-        """从 _Callback({...}) 文本里提取 auth:// URL。"""
-        if not text:
-            return ""
-        callback_match = re.search(r"_Callback\s*\(\s*(\{.*?\})\s*\)\s*;?\s*$", text, re.DOTALL)
-        if callback_match:
-            payload_text = callback_match.group(1)
-            try:
-                payload = json.loads(payload_text)
-                callback_url = str(payload.get("url", "") or "").strip()
-                if callback_url.startswith("auth://"):
-                    return callback_url
-            except Exception as e:
-                logger.warning(
-                    f"[HTTP登录] 解析_Callback JSON失败: type={type(e).__name__}, repr={repr(e)}"
-                )
-
-        auth_match = re.search(r"(auth://tauth\.qq\.com/[^\s\"'<>]+)", text)
-        if auth_match:
-            return auth_match.group(1)
-        return ""
-
     def _merge_login_data(self, base_data: Dict[str, Any], extra_data: Dict[str, Any]) -> Dict[str, Any]:
         """合并两份登录参数，优先保留已有值。"""
         base = dict(base_data or {})
@@ -841,7 +1858,7 @@ class ValorantShopPlugin(Star):
         for key_name in ("redirect_uri_key", "keystr", "key", "uikey", "superkey", "supertoken"):
             add_key(str(full_params.get(key_name, "")), f"param:{key_name}")
 
-        normalized_url = (success_url or "").replace("\\/", "/").replace("\\x26", "&")
+        normalized_url = normalize_escaped_url(success_url)
         parsed = urllib.parse.urlparse(normalized_url)
         raw_parts = [parsed.query, parsed.fragment]
         if not parsed.query and not parsed.fragment:
@@ -857,7 +1874,7 @@ class ValorantShopPlugin(Star):
                     add_key(values[0], f"url:{key_name}")
 
         cookie_domains = [
-            "https://xui.ptlogin2.qq.com",
+            self.endpoints["ptlogin"],
             "https://ssl.ptlogin2.qq.com",
             "https://ptlogin4.openmobile.qq.com",
             "https://openmobile.qq.com",
@@ -903,7 +1920,7 @@ class ValorantShopPlugin(Star):
                 )
                 if response.status != 200:
                     return ""
-                auth_url = self._extract_auth_url_from_callback_body(body)
+                auth_url = extract_auth_url_from_callback_body(body)
                 if auth_url:
                     logger.info(f"[HTTP登录] m_get_redirect_url成功提取auth: {auth_url[:220]}")
                 else:
@@ -916,6 +1933,57 @@ class ValorantShopPlugin(Star):
             return ""
 
 
+    async def _resolve_login_data_by_redirect_keys(
+        self,
+        session: aiohttp.ClientSession,
+        login_data: Dict[str, Any],
+        key_candidates: list,
+    ) -> Dict[str, Any]:
+        """并发尝试 keystr 候选，取第一个补齐 openid/access_token 的结果。
+
+        同时在途的请求数受 REDIRECT_KEY_FANOUT 限制；历史上命中次数多的来源优先发起。
+        """
+        wins = self._redirect_key_source_wins
+        ordered = sorted(key_candidates, key=lambda item: -wins.get(item[1], 0))
+        semaphore = asyncio.Semaphore(self.REDIRECT_KEY_FANOUT)
+
+        async def try_candidate(idx: int, keystr: str, source: str):
+            async with semaphore:
+                logger.info(
+                    f"[HTTP登录] 尝试m_get_redirect_url keystr#{idx}: "
+                    f"source={source}, len={len(keystr)}, prefix={keystr[:24]}"
+                )
+                auth_url = await self._fetch_auth_url_by_redirect_key(session, keystr)
+            if not auth_url:
+                return source, None
+            return source, extract_login_data_from_success_url(auth_url)
+
+        tasks = [
+            asyncio.create_task(try_candidate(idx, keystr, source))
+            for idx, (keystr, source) in enumerate(ordered, start=1)
+        ]
+        merged = login_data
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                source, auth_data = await next_done
+                if not auth_data:
+                    continue
+                merged = self._merge_login_data(merged, auth_data)
+                if merged.get("openid") and merged.get("access_token"):
+                    wins[source] = wins.get(source, 0) + 1
+                    logger.info(
+                        f"[HTTP登录] m_get_redirect_url成功补齐token, source={source}, "
+                        f"累计命中={wins[source]}"
+                    )
+                    break
+        finally:
+            # 已拿到结果或全部失败，取消其余在途请求
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return merged
+
     async def _resolve_login_success_url(
         self,
         session: aiohttp.ClientSession,
@@ -923,7 +1991,7 @@ class ValorantShopPlugin(Star):
         referer_url: str = "",
     ) -> str:
         """对 check_sig 做单次解析，尝试拿到下一跳 URL。"""
-        current_url = (success_url or "").replace("\\/", "/").replace("\\x26", "&").strip()
+        current_url = normalize_escaped_url(success_url)
         if not current_url:
             return ""
         if "check_sig" not in current_url:
@@ -957,7 +2025,7 @@ class ValorantShopPlugin(Star):
                     logger.info(f"[HTTP登录] check_sig下一跳URL: {next_url[:220]}")
                     return next_url
 
-                body_url = self._extract_url_from_body(body)
+                body_url = extract_url_from_body(body)
                 if body_url:
                     logger.info(f"[HTTP登录] check_sig正文提取URL: {body_url[:220]}")
                     return body_url
@@ -969,28 +2037,19 @@ class ValorantShopPlugin(Star):
             )
         return current_url
 
-    def _extract_url_from_body(self, body: str) -> str:
-        """从响应正文中提取跳转 URL。"""
-        text = (body or "").replace("\\/", "/").replace("\\x26", "&")
-        patterns = [
-            r"ptuiCB\('[^']*','[^']*','([^']+)'",
-            r"ptui_auth_CB\('[^']*','[^']*','([^']+)'",
-            r"location\.href\s*=\s*['\"]([^'\"]+)['\"]",
-            r"location\.replace\(\s*['\"]([^'\"]+)['\"]\s*\)",
-            r"window\.location\s*=\s*['\"]([^'\"]+)['\"]",
-            r"(auth://tauth\.qq\.com/[^\s\"'<>]+)",
-            r"(https?://imgcache\.qq\.com/[^\s\"'<>]+)",
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
-        return ""
-
-    async def generate_qr_code_http(self) -> Optional[Dict[str, Any]]:
-        """通过纯 HTTP 协议生成登录二维码。"""
-        logger.info("[HTTP登录] 开始生成二维码")
+    def _get_xlogin_headers(self) -> Dict[str, str]:
+        """xlogin 页面请求头。"""
+        return {
+            "User-Agent": "Mozilla/5.0 (Linux; Android 12; 23117RK66C Build/V417IR; wv) AppleWebKit/537.36 (KHTML, like Gecko) Version/4.0 Chrome/101.0.4951.61 Mobile Safari/537.36",
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+            "Accept-Language": "zh-CN,zh;q=0.9",
+            "Referer": "https://openmobile.qq.com/",
+            "X-Requested-With": "com.tencent.apps.valorant",
+            "Cookie": "accountType=5; clientType=9",
+        }
 
+    async def _prepare_xlogin_context(self) -> Optional[Dict[str, Any]]:
+        """访问 xlogin 初始化会话，返回可用于 ptqrshow 的登录上下文。"""
         session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=20))
         callback_url = self._get_login_callback_url()
         u1_url = self._get_login_u1_url(callback_url)
@@ -998,30 +2057,19 @@ class ValorantShopPlugin(Star):
         logger.info(
             f"[HTTP登录] 使用回调参数: s_url={callback_url}, u1={u1_url}"
         )
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Linux; Android 12; 23117RK66C Build/V417IR; wv) AppleWebKit/537.36 (KHTML, like Gecko) Version/4.0 Chrome/101.0.4951.61 Mobile Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-            "Accept-Language": "zh-CN,zh;q=0.9",
-            "Referer": "https://openmobile.qq.com/",
-            "X-Requested-With": "com.tencent.apps.valorant",
-            "Cookie": "accountType=5; clientType=9",
-        }
 
         try:
-            # 第一步：访问 xlogin，初始化会话并获取 login_sig
-            async with session.get(login_url, headers=headers) as response:
+            # 访问 xlogin，初始化会话并获取 login_sig
+            async with session.get(login_url, headers=self._get_xlogin_headers()) as response:
                 response.raise_for_status()
                 login_page = await response.text(errors="ignore")
                 logger.info(
                     f"[HTTP登录] xlogin status={response.status}, len={len(login_page)}"
                 )
 
-            login_sig = ""
-            login_sig_match = re.search(r"g_login_sig=encodeURIComponent\(\"([^\"]+)\"\)", login_page)
-            if login_sig_match:
-                login_sig = login_sig_match.group(1)
+            login_sig = extract_login_sig(login_page)
             if not login_sig:
-                login_sig = self._get_cookie_value(session, "https://xui.ptlogin2.qq.com", "pt_login_sig")
+                login_sig = self._get_cookie_value(session, self.endpoints["ptlogin"], "pt_login_sig")
             if not login_sig:
                 login_sig = self._get_cookie_value(session, "https://ssl.ptlogin2.qq.com", "pt_login_sig")
             logger.info(
@@ -1029,22 +2077,236 @@ class ValorantShopPlugin(Star):
                 f"prefix={login_sig[:12] if login_sig else ''}"
             )
 
-
             # 从 xlogin 链路中提取轮询关键参数
             parsed_login_url = urllib.parse.urlparse(login_url)
             login_query_map = urllib.parse.parse_qs(parsed_login_url.query, keep_blank_values=True)
             login_s_url = login_query_map.get("s_url", [callback_url])[0] or callback_url
-            login_u1 = u1_url
-            if login_s_url != login_u1:
-                logger.info(f"[HTTP登录] 检测到 s_url 与 u1 不一致: s_url={login_s_url}, u1={login_u1}")
-            pt_uistyle = login_query_map.get("style", ["35"])[0] or "35"
-            ptlang = login_query_map.get("ptlang", ["2052"])[0] or "2052"
-            jsver = self._extract_jsver_from_login_page(login_page)
+            if login_s_url != u1_url:
+                logger.info(f"[HTTP登录] 检测到 s_url 与 u1 不一致: s_url={login_s_url}, u1={u1_url}")
+
+            return {
+                "session": session,
+                "login_sig": login_sig,
+                "login_url": login_url,
+                "u1_url": u1_url,
+                "callback_url": callback_url,
+                "jsver": extract_jsver(login_page),
+                "pt_uistyle": login_query_map.get("style", ["35"])[0] or "35",
+                "ptlang": login_query_map.get("ptlang", ["2052"])[0] or "2052",
+                "created_at": time.time(),
+            }
+
+        except Exception as e:
+            logger.warning(
+                f"[HTTP登录] 初始化xlogin失败: type={type(e).__name__}, repr={repr(e)}"
+            )
+            await session.close()
+            return None
+
+    def _get_slow_request_threshold(self) -> float:
+        """读取慢请求阈值（秒），配置项单位为毫秒。"""
+        try:
+            return max(0, int(self._get_config_value("slow_request_threshold_ms", 5000) or 0)) / 1000
+        except (TypeError, ValueError):
+            return 5.0
+
+    def _get_slow_trace_keep(self) -> int:
+        """读取保留的慢请求条数。"""
+        try:
+            return max(1, int(self._get_config_value("slow_trace_keep", 20) or 20))
+        except (TypeError, ValueError):
+            return 20
+
+    def _get_shop_cache_max_entries(self) -> int:
+        """读取当日商店缓存的最大用户数。"""
+        try:
+            return max(1, int(self._get_config_value("shop_cache_max_entries", 200) or 200))
+        except (TypeError, ValueError):
+            return 200
+
+    def _get_card_cache_max_entries(self) -> int:
+        """读取商品卡片缓存的最大卡片数。"""
+        try:
+            return max(1, int(self._get_config_value("card_cache_max_entries", 64) or 64))
+        except (TypeError, ValueError):
+            return 64
+
+    def _get_board_page_size(self) -> int:
+        """读取商店看板每页成员数（上限 12，限制单张图片的内存占用）。"""
+        try:
+            return min(12, max(1, int(self._get_config_value("board_page_size", 6) or 6)))
+        except (TypeError, ValueError):
+            return 6
+
+    def _get_prefetch_active_days(self) -> int:
+        """读取预取时视为近期活跃的天数。"""
+        try:
+            return max(0, int(self._get_config_value("prefetch_active_days", 3) or 0))
+        except (TypeError, ValueError):
+            return 3
+
+    def _get_credential_check_interval_hours(self) -> int:
+        """读取凭证巡检间隔（小时），0 表示关闭。"""
+        try:
+            return max(0, int(self._get_config_value("credential_check_interval_hours", 6) or 0))
+        except (TypeError, ValueError):
+            return 6
+
+    def _get_credential_check_batch_size(self) -> int:
+        """读取每批巡检的用户数。"""
+        try:
+            return max(1, int(self._get_config_value("credential_check_batch_size", 20) or 20))
+        except (TypeError, ValueError):
+            return 20
+
+    def _get_notify_rate_limits(self) -> Tuple[Dict[str, float], float]:
+        """解析 notify_rate_limits，返回 (平台 -> 每秒条数, 默认速率)。"""
+        rates: Dict[str, float] = {}
+        default_rate = 1.0
+        raw_rates = str(self._get_config_value("notify_rate_limits", "default=1") or "")
+        for part in raw_rates.replace("，", ",").split(","):
+            if "=" not in part:
+                continue
+            name, _, value = part.partition("=")
+            try:
+                rate = float(value.strip())
+            except ValueError:
+                logger.warning(f"notify_rate_limits 配置项无效: {part.strip()}")
+                continue
+            if rate <= 0:
+                continue
+            if name.strip().lower() == "default":
+                default_rate = rate
+            else:
+                rates[name.strip()] = rate
+        return rates, default_rate
+
+    def _get_notify_max_retries(self) -> int:
+        """读取通知发送失败后的重试次数。"""
+        try:
+            return max(0, int(self._get_config_value("notify_max_retries", 3)))
+        except (TypeError, ValueError):
+            return 3
+
+    def _get_shop_history_days(self) -> int:
+        """读取商店历史保留天数，0 表示不归档。"""
+        try:
+            return max(0, int(self._get_config_value("shop_history_days", 180)))
+        except (TypeError, ValueError):
+            return 180
+
+    def _get_daily_shards(self) -> int:
+        """读取每日监控的分片数（多实例分担时的最小单位）。"""
+        try:
+            return max(1, int(self._get_config_value("daily_shards", 8) or 8))
+        except (TypeError, ValueError):
+            return 8
+
+    def _get_lease_ttl_seconds(self) -> int:
+        """读取任务租约有效期（秒），持有者崩溃后其他实例需等待这么久才能接管。"""
+        try:
+            return max(10, int(self._get_config_value("lease_ttl_seconds", 120) or 120))
+        except (TypeError, ValueError):
+            return 120
+
+    def _get_qr_prewarm_pool_size(self) -> int:
+        """读取二维码预热池大小，0 表示关闭预热。"""
+        try:
+            return max(0, int(self._get_config_value("qr_prewarm_pool_size", 0) or 0))
+        except (TypeError, ValueError):
+            return 0
+
+    def _get_qr_prewarm_ttl(self) -> int:
+        """读取预热上下文的有效期（秒）。"""
+        try:
+            return max(30, int(self._get_config_value("qr_prewarm_ttl", 120) or 120))
+        except (TypeError, ValueError):
+            return 120
+
+    def _is_xlogin_context_fresh(self, ctx: Dict[str, Any]) -> bool:
+        """判断预热上下文是否仍可使用。"""
+        session = ctx.get("session")
+        if session is None or session.closed:
+            return False
+        # 回调地址配置变更后，旧上下文不再适用
+        if ctx.get("callback_url") != self._get_login_callback_url():
+            return False
+        return time.time() - ctx.get("created_at", 0) < self._get_qr_prewarm_ttl()
+
+    async def _close_xlogin_context(self, ctx: Dict[str, Any]):
+        """关闭登录上下文持有的会话。"""
+        session = ctx.get("session")
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def _acquire_xlogin_context(self) -> Optional[Dict[str, Any]]:
+        """优先从预热池取出可用上下文，池为空时现场初始化。"""
+        while self._xlogin_pool:
+            ctx = self._xlogin_pool.pop()
+            if self._is_xlogin_context_fresh(ctx):
+                logger.info(f"[HTTP登录] 使用预热的xlogin上下文，剩余 {len(self._xlogin_pool)} 个")
+                return ctx
+            await self._close_xlogin_context(ctx)
+        return await self._prepare_xlogin_context()
+
+    async def _refill_xlogin_pool(self):
+        """淘汰过期上下文并补足预热池。"""
+        # 先从池中移除过期上下文再逐个关闭：关闭期间可能有登录从池中取走上下文，
+        # 不能在 await 之后用之前的快照覆盖池，否则已取走的上下文会被放回并重复使用
+        fresh, stale = [], []
+        for ctx in self._xlogin_pool:
+            (fresh if self._is_xlogin_context_fresh(ctx) else stale).append(ctx)
+        self._xlogin_pool[:] = fresh
+        for ctx in stale:
+            await self._close_xlogin_context(ctx)
+
+        pool_size = self._get_qr_prewarm_pool_size()
+        while len(self._xlogin_pool) > pool_size:
+            await self._close_xlogin_context(self._xlogin_pool.pop(0))
+        while len(self._xlogin_pool) < pool_size:
+            ctx = await self._prepare_xlogin_context()
+            if not ctx:
+                break
+            # 新上下文放在队首，取用时优先拿最新的
+            self._xlogin_pool.insert(0, ctx)
+
+    async def _xlogin_prewarm_loop(self):
+        """后台维护 xlogin 预热池。"""
+        logger.info(f"[HTTP登录] 二维码预热已启动，池大小: {self._get_qr_prewarm_pool_size()}")
+        try:
+            while True:
+                try:
+                    await self._refill_xlogin_pool()
+                except Exception as e:
+                    logger.warning(f"[HTTP登录] 预热池刷新失败: {e}")
+                # 在过期前刷新，保证取出的上下文仍有余量
+                await asyncio.sleep(max(10, self._get_qr_prewarm_ttl() // 3))
+        except asyncio.CancelledError:
+            pooled = list(self._xlogin_pool)
+            self._xlogin_pool.clear()
+            for ctx in pooled:
+                await self._close_xlogin_context(ctx)
+            raise
+
+    @timed("qr_generate_seconds")
+    async def generate_qr_code_http(self) -> Optional[Dict[str, Any]]:
+        """通过纯 HTTP 协议生成登录二维码。"""
+        logger.info("[HTTP登录] 开始生成二维码")
+
+        ctx = await self._acquire_xlogin_context()
+        if not ctx:
+            return None
+        session: aiohttp.ClientSession = ctx["session"]
+        login_url = ctx["login_url"]
+        login_u1 = ctx["u1_url"]
+
+        try:
+            # pt_openlogin_data 带有 auth_time，取用时再生成
             pt_openlogin_data = self._build_pt_openlogin_data(login_url, session)
             aegis_uid = self._build_aegis_uid(session)
             logger.info(
-                f"[HTTP登录] 轮询参数: u1={login_u1}, ptlang={ptlang}, "
-                f"pt_uistyle={pt_uistyle}, jsver={jsver}, "
+                f"[HTTP登录] 轮询参数: u1={login_u1}, ptlang={ctx['ptlang']}, "
+                f"pt_uistyle={ctx['pt_uistyle']}, jsver={ctx['jsver']}, "
                 f"pt_openlogin_data_len={len(pt_openlogin_data)}, aegis_uid={aegis_uid or '无'}"
             )
 
@@ -1059,12 +2321,12 @@ class ValorantShopPlugin(Star):
                 "pt_3rd_aid": self.PTQR_THIRD_AID,
             }
             qr_headers = {
-                "User-Agent": headers["User-Agent"],
+                "User-Agent": self._get_xlogin_headers()["User-Agent"],
                 "Referer": login_url,
                 "Accept": "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8",
                 "X-Requested-With": "com.tencent.apps.valorant",
             }
-            logger.info(f"[HTTP登录] ptqrshow params={qr_params}")
+            logger.debug("[HTTP登录] ptqrshow params=%s", qr_params)
             async with session.get(self.PTQR_SHOW_URL, params=qr_params, headers=qr_headers) as response:
                 response.raise_for_status()
                 qr_image_bytes = await response.read()
@@ -1075,32 +2337,27 @@ class ValorantShopPlugin(Star):
             if not qr_image_bytes:
                 raise RuntimeError("二维码内容为空")
 
-            qrsig = self._get_cookie_value(session, "https://xui.ptlogin2.qq.com", "qrsig")
+            qrsig = self._get_cookie_value(session, self.endpoints["ptlogin"], "qrsig")
             if not qrsig:
                 qrsig = self._get_cookie_value(session, "https://ssl.ptlogin2.qq.com", "qrsig")
             if not qrsig:
                 raise RuntimeError("未获取到qrsig")
             logger.info(f"[HTTP登录] qrsig前12位={qrsig[:12]}")
 
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"qr_code_http_{timestamp}.png"
-            with open(filename, "wb") as f:
-                f.write(qr_image_bytes)
-
             logger.info("[HTTP登录] 二维码生成成功")
             return {
                 "session": session,
-                "filename": filename,
+                "qr_image": qr_image_bytes,
                 "ptqrtoken": self._calc_ptqrtoken(qrsig),
-                "login_sig": login_sig,
+                "login_sig": ctx["login_sig"],
                 "login_url": login_url,
                 "u1_url": login_u1,
-                "callback_url": callback_url,
+                "callback_url": ctx["callback_url"],
                 "pt_openlogin_data": pt_openlogin_data,
                 "aegis_uid": aegis_uid,
-                "jsver": jsver,
-                "pt_uistyle": pt_uistyle,
-                "ptlang": ptlang,
+                "jsver": ctx["jsver"],
+                "pt_uistyle": ctx["pt_uistyle"],
+                "ptlang": ctx["ptlang"],
             }
 
         except Exception as e:
@@ -1111,6 +2368,7 @@ class ValorantShopPlugin(Star):
             return None
 
 
+    @timed("qq_login_wait_seconds")
     async def wait_for_http_login_result(
         self,
         session: aiohttp.ClientSession,
@@ -1146,6 +2404,12 @@ class ValorantShopPlugin(Star):
 
         start_time = time.time()
         poll_index = 0
+
+        async def sleep_before_next_poll(interval: float):
+            remaining = timeout - (time.time() - start_time)
+            if remaining > 0:
+                await asyncio.sleep(min(interval, remaining))
+
         while time.time() - start_time < timeout:
             poll_index += 1
             try:
@@ -1173,31 +2437,33 @@ class ValorantShopPlugin(Star):
                 async with session.get(self.PTQR_LOGIN_URL, params=params, headers=poll_headers) as response:
                     response.raise_for_status()
                     text = await response.text(errors="ignore")
-                    logger.info(
-                        f"[HTTP登录] 轮询#{poll_index} status={response.status}, text={text[:160]}"
+                    self._log(
+                        "login", logging.DEBUG,
+                        "[HTTP登录] 轮询#%d status=%s, text=%s", poll_index, response.status, text[:160],
                     )
 
-                callback = self._parse_ptui_callback(text)
+                callback = parse_ptui_callback(text)
                 if not callback:
                     logger.warning(f"[HTTP登录] 无法解析ptui回调, text={text[:160]}")
-                    await asyncio.sleep(2)
+                    await sleep_before_next_poll(self.PTQR_POLL_INTERVAL_ERROR)
                     continue
 
                 code = callback["code"]
                 message = callback["message"]
                 redirect_url = callback.get("redirect_url", "")
-                logger.info(
-                    f"[HTTP登录] 轮询#{poll_index} code={code}, message={message}, "
-                    f"redirect_url={redirect_url[:220]}"
+                self._log(
+                    "login", logging.INFO,
+                    "[HTTP登录] 轮询#%d code=%s, message=%s, redirect_url=%s",
+                    poll_index, code, message, redirect_url[:220],
                 )
 
                 if code == "0":
                     success_url = redirect_url
                     logger.info(f"[HTTP登录] 登录成功回调URL: {success_url[:220]}")
                     cookie_names = [c.key for c in session.cookie_jar]
-                    logger.info(f"[HTTP登录] 登录成功Cookie键: {sorted(set(cookie_names))}")
+                    logger.debug("[HTTP登录] 登录成功Cookie键: %s", sorted(set(cookie_names)))
 
-                    login_data = self._extract_login_data_from_success_url(success_url)
+                    login_data = extract_login_data_from_success_url(success_url)
                     if not (login_data.get("openid") and login_data.get("access_token")):
                         resolved_url = await self._resolve_login_success_url(
                             session=session,
@@ -1206,7 +2472,7 @@ class ValorantShopPlugin(Star):
                         )
                         if resolved_url and resolved_url != success_url:
                             logger.info(f"[HTTP登录] check_sig解析结果URL: {resolved_url[:220]}")
-                            resolved_data = self._extract_login_data_from_success_url(resolved_url)
+                            resolved_data = extract_login_data_from_success_url(resolved_url)
                             login_data = self._merge_login_data(login_data, resolved_data)
 
                         candidate_url = resolved_url if resolved_url else success_url
@@ -1220,21 +2486,12 @@ class ValorantShopPlugin(Star):
                             f"[HTTP登录] 当前缺少openid/access_token，"
                             f"keystr候选数={len(key_candidates)}, 来源预览={source_preview}"
                         )
-                        for idx, (keystr, source) in enumerate(key_candidates, start=1):
-                            logger.info(
-                                f"[HTTP登录] 尝试m_get_redirect_url keystr#{idx}: "
-                                f"source={source}, len={len(keystr)}, prefix={keystr[:24]}"
+                        if key_candidates:
+                            login_data = await self._resolve_login_data_by_redirect_keys(
+                                session=session,
+                                login_data=login_data,
+                                key_candidates=key_candidates,
                             )
-                            auth_url = await self._fetch_auth_url_by_redirect_key(session, keystr)
-                            if not auth_url:
-                                continue
-                            auth_data = self._extract_login_data_from_success_url(auth_url)
-                            login_data = self._merge_login_data(login_data, auth_data)
-                            if login_data.get("openid") and login_data.get("access_token"):
-                                logger.info(
-                                    f"[HTTP登录] m_get_redirect_url成功补齐token, source={source}"
-                                )
-                                break
 
                     if login_data.get("openid") and login_data.get("access_token"):
                         logger.info("[HTTP登录] HTTP登录成功，已拿到openid/access_token")
@@ -1250,18 +2507,23 @@ class ValorantShopPlugin(Star):
                     logger.warning(f"[HTTP登录] 二维码已失效: {message}")
                     return None
 
-                if code in ("66", "67"):
-                    await asyncio.sleep(2)
+                if code == "67":
+                    # 已扫码待确认，用户点击确认通常只需数秒，加快轮询
+                    await sleep_before_next_poll(self.PTQR_POLL_INTERVAL_SCANNED)
+                    continue
+
+                if code == "66":
+                    await sleep_before_next_poll(self.PTQR_POLL_INTERVAL_WAITING)
                     continue
 
                 logger.warning(f"[HTTP登录] 登录状态异常: code={code}, message={message}")
-                await asyncio.sleep(2)
+                await sleep_before_next_poll(self.PTQR_POLL_INTERVAL_ERROR)
 
             except Exception as e:
                 logger.warning(
                     f"[HTTP登录] 轮询异常: type={type(e).__name__}, repr={repr(e)}, poll={poll_index}"
                 )
-                await asyncio.sleep(2)
+                await sleep_before_next_poll(self.PTQR_POLL_INTERVAL_ERROR)
 
         logger.warning("[HTTP登录] 轮询超时")
         return None
@@ -1279,13 +2541,12 @@ class ValorantShopPlugin(Star):
             return None
         
         # 鏋勯€犺姹傛暟鎹?
-        login_url = "https://app.mval.qq.com/go/auth/login_by_qq?source_game_zone=agame&game_zone=agame"
+        login_url = self.MVAL_QQ_LOGIN_URL
         
         headers = {
             "Cookie": "clientType=9; openid=null; access_token=null;",
             "User-Agent": "mval/2.4.0.10053 Channel/10068 Manufacturer/Redmi  Mozilla/5.0 (Linux; Android 12; 23117RK66C Build/V417IR; wv) AppleWebKit/537.36 (KHTML, like Gecko) Version/4.0 Chrome/101.0.4951.61 Mobile Safari/537.36",
             "Content-Type": "application/json",
-            "Host": "app.mval.qq.com",
             "Connection": "Keep-Alive",
             "Accept-Encoding": "gzip"
         }
@@ -1350,23 +2611,20 @@ class ValorantShopPlugin(Star):
             logger.error(f"获取最终Cookie时出错: {e}")
             return None
 
-    async def download_image(self, url: str, user_id: str, filename: str) -> Optional[str]:
-        """??"""
+    @timed("image_download_seconds")
+    async def download_image(self, url: str) -> Optional[bytes]:
+        """下载图片并返回原始字节。"""
         try:
-            filepath = self._build_safe_temp_file_path(user_id, filename)
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    response.raise_for_status()
-                    content = await response.read()
-                    with open(filepath, 'wb') as file:
-                        file.write(content)
-                    return str(filepath)
-        except ValueError as e:
-            logger.error(f"构建临时文件路径失败: {e}")
-            return None
+            session = await self._get_http_session()
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                response.raise_for_status()
+                return await response.read()
         except aiohttp.ClientError as e:
             logger.error(f"下载图片失败: {e}")
             return None
+        except asyncio.TimeoutError:
+            logger.error(f"下载图片超时: {url}")
+            return None
 
     def _build_store_api_headers(self, user_config: Dict[str, Any]) -> Dict[str, str]:
         """构造商店接口请求头。"""
@@ -1415,7 +2673,7 @@ class ValorantShopPlugin(Star):
             return None, "商店接口返回格式异常，请稍后重试"
 
         if not response_data["data"]:
-            logger.info("API返回数据为空")
+            self._log("store", logging.INFO, "API返回数据为空")
             return [], None
 
         data = response_data["data"]
@@ -1428,12 +2686,13 @@ class ValorantShopPlugin(Star):
 
         goods_list = data.get("list", [])
         if not goods_list:
-            logger.info("今日商店没有商品")
+            self._log("store", logging.INFO, "今日商店没有商品")
             return [], None
 
-        logger.info(f"获取到 {len(goods_list)} 个商品")
+        self._log("store", logging.INFO, "获取到 %d 个商品", len(goods_list))
         return goods_list, None
 
+    @timed("store_api_seconds", is_ok=lambda result: result[0] is not None)
     async def _request_store_api(
         self,
         user_id: str,
@@ -1442,10 +2701,11 @@ class ValorantShopPlugin(Star):
         timeout: int = 15,
     ) -> Tuple[Optional[Dict[str, Any]], Optional[str], bool]:
         """请求商店接口，并统一返回可用性结果。"""
-        logger.info(
-            f"开始请求商店接口，user_id: {user_id}, userId: {user_config.get('userId', '未知')}"
+        self._log(
+            "store", logging.INFO,
+            "开始请求商店接口，user_id: %s, userId: %s", user_id, user_config.get('userId', '未知'),
         )
-        url = "https://app.mval.qq.com/go/mlol_store/agame/user_store"
+        url = self.STORE_API_URL
 
         if not all(k in user_config for k in ["userId", "tid"]):
             err_msg = "配置不完整，需要包含 userId 和 tid"
@@ -1458,8 +2718,8 @@ class ValorantShopPlugin(Star):
             timestamp = int(time.time())
             data = {"_t": timestamp}
             try:
-                logger.info(
-                    f"发送API请求到 {url} (尝试 {attempt + 1}/{max_retries}), 时间戳: {timestamp}"
+                logger.debug(
+                    "发送API请求到 %s (尝试 %d/%d), 时间戳: %d", url, attempt + 1, max_retries, timestamp
                 )
                 async with aiohttp.ClientSession() as session:
                     async with session.post(
@@ -1470,7 +2730,9 @@ class ValorantShopPlugin(Star):
                     ) as response:
                         response.raise_for_status()
                         response_data = await response.json()
-                        logger.info(f"API响应: {json.dumps(response_data, indent=2, ensure_ascii=False)}")
+                        # 完整响应体只在 DEBUG 下序列化，避免每次请求的 json.dumps 开销
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("API响应: %s", json.dumps(response_data, ensure_ascii=False))
 
                         result_code = response_data.get("result")
                         if result_code != 0:
@@ -1500,213 +2762,560 @@ class ValorantShopPlugin(Star):
 
     async def get_shop_items_raw(self, user_id: str, user_config: Dict[str, Any]) -> Optional[list]:
         """??"""
-        response_data, err_msg, auth_invalid = await self._request_store_api(user_id, user_config)
-        if not response_data:
+        goods_list, err_msg, auth_invalid = await self._fetch_goods_list(user_id, user_config)
+        if goods_list is None:
             if auth_invalid:
                 logger.warning(f"用户 {user_id} 登录凭证已失效: {err_msg}")
             elif err_msg:
                 logger.error(f"获取商店原始数据失败: {err_msg}")
             return None
-
-        goods_list, parse_err_msg = self._extract_shop_goods_list(response_data)
-        if parse_err_msg:
-            logger.error(f"解析商店原始数据失败: {parse_err_msg}")
-            return None
         return goods_list or None
 
-    async def get_shop_data(
+    def _current_shop_day(self) -> str:
+        """返回当前商店所属的日期（上游按北京时间 SHOP_ROTATION_TIME 轮换）。"""
+        now = datetime.now(ZoneInfo(self.SHOP_TIMEZONE))
+        hour, minute = self.SHOP_ROTATION_TIME
+        if (now.hour, now.minute) < (hour, minute):
+            now -= timedelta(days=1)
+        return now.strftime("%Y-%m-%d")
+
+    async def _fetch_goods_list(
         self,
         user_id: str,
         user_config: Dict[str, Any],
-        keep_file: bool = False,
-        goods_list: Optional[list] = None,
-    ) -> Tuple[Optional[str], Optional[str]]:
-        """??"""
+        max_retries: int = 3,
+        timeout: int = 15,
+    ) -> Tuple[Optional[list], Optional[str], bool]:
+        """获取当日商品列表，返回 (商品列表, 错误信息, 凭证是否失效)。
+
+        优先读取当日缓存；同一 userId 已有请求在进行时直接等待其结果，不重复请求上游。
+        """
+        cache_key = str(user_config.get("userId", ""))
+        day = self._current_shop_day()
+        cached = self._goods_cache.get(cache_key, day)
+        if cached is not None:
+            self.metrics.inc("shop_cache_requests_total", cache="goods", result="hit")
+            return cached, None, False
+        self.metrics.inc("shop_cache_requests_total", cache="goods", result="miss")
+
+        inflight = self._goods_inflight.get(cache_key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._goods_inflight[cache_key] = future
+        result: Tuple[Optional[list], Optional[str], bool] = (None, "请求商店接口失败，请稍后重试", False)
+        try:
+            response_data, err_msg, auth_invalid = await self._request_store_api(
+                user_id,
+                user_config,
+                max_retries=max_retries,
+                timeout=timeout,
+            )
+            if not response_data:
+                result = (None, err_msg, auth_invalid)
+                if auth_invalid:
+                    await self._mark_credential_expired(user_id)
+            else:
+                goods_list, parse_err_msg = self._extract_shop_goods_list(response_data)
+                if parse_err_msg:
+                    result = (None, parse_err_msg, False)
+                else:
+                    # 空商店可能是上游尚未完成轮换，不缓存
+                    if goods_list:
+                        self._goods_cache.put(cache_key, day, goods_list)
+                        self._archive_shop_history(cache_key, day, goods_list)
+                    result = (goods_list or [], None, False)
+            return result
+        finally:
+            # 被取消时也要唤醒等待者，避免它们一起被取消
+            if not future.done():
+                future.set_result(result)
+            self._goods_inflight.pop(cache_key, None)
+
+    def _archive_shop_history(self, game_user_id: str, shop_day: str, goods_list: list):
+        """收录到商品目录，并在后台把商品列表写入历史归档，不阻塞当前请求。"""
+        for goods in goods_list:
+            self.catalog.add(str(goods.get('goods_name') or ''), goods.get('goods_id'))
+        if not game_user_id or self._get_shop_history_days() <= 0:
+            return
+        task = asyncio.create_task(self._write_shop_history(game_user_id, shop_day, goods_list))
+        self._history_tasks.add(task)
+        task.add_done_callback(self._history_tasks.discard)
+
+    async def _write_shop_history(self, game_user_id: str, shop_day: str, goods_list: list):
+        rows = []
+        for slot, goods in enumerate(goods_list):
+            name = str(goods.get('goods_name') or '').strip()
+            if not name:
+                continue
+            try:
+                price = int(float(goods.get('rmb_price')))
+            except (TypeError, ValueError):
+                price = None
+            rows.append((slot, str(goods.get('goods_id') or '') or None, name, price))
+        if not rows:
+            return
+        try:
+            db = self.context.get_db()
+            async with db.get_db() as session:
+                session: AsyncSession
+                async with session.begin():
+                    name_ids = await self._resolve_goods_name_ids(session, [row[2] for row in rows])
+                    for slot, goods_id, name, price in rows:
+                        await session.execute(
+                            text("""
+                                INSERT OR IGNORE INTO valo_shop_history
+                                (game_user_id, shop_day, slot, goods_id, name_id, price)
+                                VALUES (:game_user_id, :shop_day, :slot, :goods_id, :name_id, :price)
+                            """),
+                            {
+                                "game_user_id": game_user_id,
+                                "shop_day": shop_day,
+                                "slot": slot,
+                                "goods_id": goods_id,
+                                "name_id": name_ids[name],
+                                "price": price,
+                            }
+                        )
+            # 事务提交后再缓存，避免缓存到回滚掉的 id
+            self._goods_name_ids.update(name_ids)
+        except Exception as e:
+            logger.warning(f"写入商店历史失败: {e}")
+
+    async def _resolve_goods_name_ids(self, session: AsyncSession, names: list) -> Dict[str, int]:
+        """返回商品名在字典表中的 id，不存在时插入。"""
+        name_ids = {name: self._goods_name_ids[name] for name in names if name in self._goods_name_ids}
+        missing = [name for name in dict.fromkeys(names) if name not in name_ids]
+        if missing:
+            for name in missing:
+                await session.execute(
+                    text("INSERT OR IGNORE INTO valo_goods_names (name) VALUES (:name)"),
+                    {"name": name}
+                )
+            result = await session.execute(
+                text("SELECT id, name FROM valo_goods_names WHERE name IN :names").bindparams(
+                    bindparam("names", expanding=True)
+                ),
+                {"names": missing}
+            )
+            for name_id, name in result.fetchall():
+                name_ids[name] = name_id
+        return name_ids
+
+    async def _prune_shop_history(self):
+        """删除超过 shop_history_days 天的历史记录。"""
+        keep_days = self._get_shop_history_days()
+        if keep_days <= 0:
+            return
+        cutoff = (datetime.now(ZoneInfo(self.SHOP_TIMEZONE)) - timedelta(days=keep_days)).strftime("%Y-%m-%d")
+        try:
+            db = self.context.get_db()
+            async with db.get_db() as session:
+                session: AsyncSession
+                async with session.begin():
+                    await session.execute(
+                        text("DELETE FROM valo_shop_history WHERE shop_day < :cutoff"),
+                        {"cutoff": cutoff}
+                    )
+        except Exception as e:
+            logger.warning(f"清理商店历史失败: {e}")
+
+    async def _find_goods_name_ids(self, query: str) -> Dict[int, str]:
+        """按监控词的匹配规则在商品名字典中查找，返回 {id: 商品名}。"""
+        matcher = WatchMatcher([(query, None)])
+        db = self.context.get_db()
+        async with db.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(text("SELECT id, name FROM valo_goods_names"))
+            return {name_id: name for name_id, name in result.fetchall() if matcher.match(name)}
+
+    async def get_shop_history(self, game_user_id: str, days: int = 7) -> Dict[str, list]:
+        """返回最近 days 天的商店，{商店日: [(商品名, 价格)]}，按日期倒序。"""
+        since = (datetime.now(ZoneInfo(self.SHOP_TIMEZONE)) - timedelta(days=days)).strftime("%Y-%m-%d")
+        db = self.context.get_db()
+        async with db.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(
+                text("""
+                    SELECT h.shop_day, n.name, h.price FROM valo_shop_history h
+                    JOIN valo_goods_names n ON n.id = h.name_id
+                    WHERE h.game_user_id = :game_user_id AND h.shop_day >= :since
+                    ORDER BY h.shop_day DESC, h.slot
+                """),
+                {"game_user_id": game_user_id, "since": since}
+            )
+            history: Dict[str, list] = {}
+            for shop_day, name, price in result.fetchall():
+                history.setdefault(shop_day, []).append((name, price))
+            return history
+
+    async def get_goods_history_stats(self, game_user_id: str, name_ids: list, days: int = 90) -> Dict[str, Any]:
+        """某些商品在本账号最近一次出现的日期，以及 days 天内本账号与全部账号的出现次数。"""
+        since = (datetime.now(ZoneInfo(self.SHOP_TIMEZONE)) - timedelta(days=days)).strftime("%Y-%m-%d")
+        params = {"game_user_id": game_user_id, "name_ids": name_ids, "since": since}
+        db = self.context.get_db()
+        async with db.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(
+                text("""
+                    SELECT h.shop_day, n.name, h.price FROM valo_shop_history h
+                    JOIN valo_goods_names n ON n.id = h.name_id
+                    WHERE h.name_id IN :name_ids AND h.game_user_id = :game_user_id
+                    ORDER BY h.shop_day DESC LIMIT 1
+                """).bindparams(bindparam("name_ids", expanding=True)),
+                params
+            )
+            last_seen = result.fetchone()
+            result = await session.execute(
+                text("""
+                    SELECT COUNT(DISTINCT shop_day) FROM valo_shop_history
+                    WHERE name_id IN :name_ids AND game_user_id = :game_user_id AND shop_day >= :since
+                """).bindparams(bindparam("name_ids", expanding=True)),
+                params
+            )
+            own_days = result.scalar() or 0
+            result = await session.execute(
+                text("""
+                    SELECT COUNT(*), COUNT(DISTINCT game_user_id) FROM valo_shop_history
+                    WHERE name_id IN :name_ids AND shop_day >= :since
+                """).bindparams(bindparam("name_ids", expanding=True)),
+                params
+            )
+            total, accounts = result.fetchone() or (0, 0)
+        return {
+            "last_seen": last_seen,
+            "own_days": own_days,
+            "total": total or 0,
+            "accounts": accounts or 0,
+        }
+
+    async def _render_shop_image_cached(
+        self,
+        user_id: str,
+        user_config: Dict[str, Any],
+        goods_list: list,
+        trace: Optional[RequestTrace] = None,
+    ) -> Optional[bytes]:
+        """渲染商店图片并写入当日缓存。"""
+        image_bytes = await self.get_shop_data(user_id, user_config, goods_list=goods_list, trace=trace)
+        if image_bytes:
+            self._image_cache.put(str(user_config.get("userId", "")), self._current_shop_day(), image_bytes)
+        return image_bytes
+
+    def _get_cached_shop_image(self, user_config: Dict[str, Any]) -> Optional[bytes]:
+        """读取当日已渲染的商店图片。"""
+        image_bytes = self._image_cache.get(str(user_config.get("userId", "")), self._current_shop_day())
+        self.metrics.inc(
+            "shop_cache_requests_total", cache="image", result="hit" if image_bytes is not None else "miss"
+        )
+        return image_bytes
+
+    async def _touch_user_activity(self, user_id: str):
+        """记录用户最近一次查询商店的时间，预取任务据此挑选活跃用户。"""
+        try:
+            db = self.context.get_db()
+            async with db.get_db() as session:
+                session: AsyncSession
+                async with session.begin():
+                    await session.execute(
+                        text("UPDATE valo_users SET last_active_at = CURRENT_TIMESTAMP WHERE user_id = :user_id"),
+                        {"user_id": user_id}
+                    )
+        except Exception as e:
+            logger.warning(f"更新用户活跃时间失败: {e}")
+
+    async def _set_credential_status(self, user_id: str, status: str):
+        """记录凭证检查结果；恢复为 ok 时清除已通知标记。"""
+        db = self.context.get_db()
+        async with db.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                await session.execute(
+                    text("""
+                        UPDATE valo_users
+                        SET credential_status = :status,
+                            credential_checked_at = CURRENT_TIMESTAMP,
+                            expired_notified = CASE WHEN :status = 'ok' THEN 0 ELSE expired_notified END
+                        WHERE user_id = :user_id
+                    """),
+                    {"user_id": user_id, "status": status}
+                )
+
+    async def _mark_credential_expired(self, user_id: str):
+        """标记凭证已过期，并在首次发现时提醒用户重新绑定。"""
+        try:
+            db = self.context.get_db()
+            async with db.get_db() as session:
+                session: AsyncSession
+                async with session.begin():
+                    # 只有把 expired_notified 从 0 改为 1 的那次调用负责发送提醒
+                    result = await session.execute(
+                        text("""
+                            UPDATE valo_users
+                            SET credential_status = 'expired',
+                                credential_checked_at = CURRENT_TIMESTAMP,
+                                expired_notified = 1
+                            WHERE user_id = :user_id AND COALESCE(expired_notified, 0) = 0
+                        """),
+                        {"user_id": user_id}
+                    )
+                    should_notify = int(result.rowcount or 0) > 0
+                    if not should_notify:
+                        await session.execute(
+                            text("""
+                                UPDATE valo_users
+                                SET credential_status = 'expired', credential_checked_at = CURRENT_TIMESTAMP
+                                WHERE user_id = :user_id
+                            """),
+                            {"user_id": user_id}
+                        )
+        except Exception as e:
+            logger.warning(f"标记用户 {user_id} 凭证过期失败: {e}")
+            return
+
+        if not should_notify:
+            return
+        try:
+            from astrbot.api.event import MessageChain
 
+            bot_id = self._get_config_value('bot_id', 'default')
+            message_chain = MessageChain().message(
+                "您绑定的无畏契约账号登录凭证已过期，自动监控已暂停。\n请使用 /瓦 重新绑定后恢复。"
+            )
+            await self.context.send_message(f"{bot_id}:FriendMessage:{user_id}", message_chain)
+            logger.info(f"已提醒用户 {user_id} 重新绑定")
+        except Exception as e:
+            logger.error(f"发送凭证过期提醒失败: {e}")
+
+    async def revalidate_credentials(self):
+        """后台巡检一批最久未检查的凭证；多实例时每个巡检周期只由抢到租约的实例执行。"""
+        period = max(1, self._get_credential_check_interval_hours()) * 3600
+        async with self.leases.hold(f"credential:{int(time.time() // period)}") as lease:
+            if not lease.acquired:
+                logger.info("凭证巡检：本周期已由其他实例执行，跳过")
+                return
+            await self._revalidate_credential_batch()
 
+    async def _revalidate_credential_batch(self):
+        """巡检一批最久未检查的凭证，标记过期用户并提醒重新绑定。"""
+        batch_size = self._get_credential_check_batch_size()
+        try:
+            db = self.context.get_db()
+            async with db.get_db() as session:
+                session: AsyncSession
+                result = await session.execute(
+                    text("""
+                        SELECT user_id, userId, tid FROM valo_users
+                        WHERE COALESCE(credential_status, 'ok') != 'expired'
+                        ORDER BY credential_checked_at IS NOT NULL, credential_checked_at
+                        LIMIT :limit
+                    """),
+                    {"limit": batch_size}
+                )
+                rows = result.fetchall()
+        except Exception as e:
+            logger.error(f"凭证巡检读取用户失败: {e}")
+            return
 
+        if not rows:
+            return
 
+        expired = 0
+        for row in rows:
+            user_id = row[0]
+            user_config = {"userId": row[1], "tid": row[2]}
+            try:
+                response_data, err_msg, auth_invalid = await self._request_store_api(
+                    user_id,
+                    user_config,
+                    max_retries=1,
+                    timeout=10,
+                )
+                if response_data:
+                    self.metrics.inc("credential_checks_total", result="ok")
+                    await self._set_credential_status(user_id, "ok")
+                    # 顺带写入当日商品缓存，后续查询与监控无需再请求
+                    goods_list, _ = self._extract_shop_goods_list(response_data)
+                    if goods_list:
+                        self._goods_cache.put(str(row[1]), self._current_shop_day(), goods_list)
+                        self._archive_shop_history(str(row[1]), self._current_shop_day(), goods_list)
+                elif auth_invalid:
+                    self.metrics.inc("credential_checks_total", result="expired")
+                    expired += 1
+                    await self._mark_credential_expired(user_id)
+                else:
+                    # 网络或上游错误不改变状态，下一轮再查
+                    self.metrics.inc("credential_checks_total", result="error")
+                    self._log("store", logging.INFO, "凭证巡检用户 %s 请求失败: %s", user_id, err_msg)
+            except Exception as e:
+                logger.warning(f"凭证巡检用户 {user_id} 失败: {e}")
+            await asyncio.sleep(self.CREDENTIAL_CHECK_PAUSE)
 
+        logger.info(f"凭证巡检完成：检查 {len(rows)} 个，新发现过期 {expired} 个")
 
+    @timed("prefetch_seconds", is_ok=lambda _: True)
+    async def prefetch_shops(self):
+        """商店轮换后预取开启监控与近期活跃用户的商店并渲染，写入当日缓存。
 
+        逐个用户串行执行并在用户之间让出，优先级低于交互请求；同一游戏账号只预取一次。
+        """
+        active_days = self._get_prefetch_active_days()
+        try:
+            db = self.context.get_db()
+            async with db.get_db() as session:
+                session: AsyncSession
+                result = await session.execute(
+                    text("""
+                        SELECT user_id, userId, tid, nickname FROM valo_users
+                        WHERE (auto_check = 1 OR last_active_at >= datetime('now', :window))
+                          AND COALESCE(credential_status, 'ok') != 'expired'
+                        ORDER BY auto_check DESC, last_active_at DESC
+                    """),
+                    {"window": f"-{active_days} days"}
+                )
+                rows = result.fetchall()
+        except Exception as e:
+            logger.error(f"商店预取任务读取用户失败: {e}")
+            return
 
+        if not rows:
+            logger.info("商店预取：没有需要预取的用户")
+            return
 
+        logger.info(f"商店预取开始，候选用户数: {len(rows)}")
+        seen_accounts = set()
+        warmed = 0
+        for row in rows:
+            user_id, game_user_id = row[0], row[1]
+            if game_user_id in seen_accounts:
+                continue
+            seen_accounts.add(game_user_id)
+            user_config = {"userId": game_user_id, "tid": row[2], "nickname": row[3]}
+            try:
+                if self._image_cache.get(str(game_user_id), self._current_shop_day()) is None:
+                    goods_list, err_msg, _ = await self._fetch_goods_list(user_id, user_config)
+                    if goods_list:
+                        if await self._render_shop_image_cached(user_id, user_config, goods_list):
+                            warmed += 1
+                    else:
+                        self._log("store", logging.INFO, "商店预取跳过用户 %s: %s", user_id, err_msg or "商店为空")
+            except Exception as e:
+                logger.warning(f"商店预取用户 {user_id} 失败: {e}")
+            await asyncio.sleep(self.PREFETCH_INTERVAL)
 
+        logger.info(f"商店预取完成：账号数 {len(seen_accounts)}，新渲染 {warmed}")
 
-        logger.info(f"开始获取商店数据，user_id: {user_id}, userId: {user_config.get('userId', '未知')}")
-        try:
-            user_temp_dir = self._get_safe_temp_user_dir(user_id)
-            user_temp_dir.mkdir(parents=True, exist_ok=True)
-        except ValueError as e:
-            logger.error(f"构建用户临时目录失败: {e}")
-            return None, None
+    @timed("shop_render_seconds")
+    async def get_shop_data(
+        self,
+        user_id: str,
+        user_config: Dict[str, Any],
+        goods_list: Optional[list] = None,
+        trace: Optional[RequestTrace] = None,
+    ) -> Optional[bytes]:
+        """生成每日商店图片，全程在内存中完成，返回 JPEG 字节。"""
+        self._log(
+            "render", logging.INFO,
+            "开始获取商店数据，user_id: %s, userId: %s", user_id, user_config.get('userId', '未知'),
+        )
         
         # 调用 get_shop_items_raw 获取原始商品数据
         if goods_list is None:
-            goods_list = await self.get_shop_items_raw(user_id, user_config)
+            with span(trace, "store_api"):
+                goods_list = await self.get_shop_items_raw(user_id, user_config)
         
         if not goods_list:
-            return None, None
+            return None
                 
         # 处理商品图片
         processed_images = []
+        font = load_font(self.font_path)
         
         for i, goods in enumerate(goods_list):
-            logger.info(f"处理商品 {i+1}/{len(goods_list)}: {goods['goods_name']}")
-            
-            # 下载背景图和商品图
-            bg_img_url = goods.get('bg_image')
-            goods_img_url = goods.get('goods_pic')
-            
-            if not bg_img_url or not goods_img_url:
-                logger.error("商品缺少图片URL")
-                continue
-                
-            bg_img_path = await self.download_image(bg_img_url, user_id, 'bg.jpg')
-            goods_img_path = await self.download_image(goods_img_url, user_id, 'goods.jpg')
-            
-            if not bg_img_path or not goods_img_path:
-                logger.error("图片下载失败，跳过该商品")
-                continue
-                
-            # 处理图片
-            try:
-                # 打开图片，使用 PILImage 而不是 astrbot 的 Image 组件
-                img1 = PILImage.open(bg_img_path)
-                img2 = PILImage.open(goods_img_path)
-                
-                # 调整商品图尺寸
-                height = 180
-                width = int((img2.width * height) / img2.height)
-                img2_resized = img2.resize((width, height))
-                
-                # 计算居中粘贴位置
-                x = (img1.width - img2_resized.width) // 2
-                y = (img1.height - img2_resized.height) // 2
-                
-                # 创建新图像，使用 PILImage 而不是 astrbot 的 Image 组件
-                new_img = PILImage.new('RGB', img1.size)
-                new_img.paste(img1, (0, 0))
-                
-                # 粘贴商品图（支持透明通道）
-                if img2_resized.mode in ('RGBA', 'LA'):
-                    new_img.paste(img2_resized, (x, y), mask=img2_resized)
-                else:
-                    new_img.paste(img2_resized, (x, y))
-                
-                # 绘制文字
-                draw = ImageDraw.Draw(new_img)
-                
-                # 加载字体
-                try:
-                    font = ImageFont.truetype(self.font_path, 36)
-                except IOError:
-                    logger.warning("字体加载失败，改用默认字体")
-                    font = ImageFont.load_default()
-                
-                # 商品名称
-                text = goods['goods_name']
-                text_bbox = draw.textbbox((0, 0), text, font=font)
-                text_width = text_bbox[2] - text_bbox[0]
-                text_position = (36, new_img.height - 50)
-                text_color = (255, 255, 255)  # 白色
-                draw.text(text_position, text, fill=text_color, font=font)
-                
-                # 商品价格
-                price = goods.get('rmb_price', '0')
-                price_bbox = draw.textbbox((0, 0), price, font=font)
-                price_width = price_bbox[2] - price_bbox[0]
-                text_position = (new_img.width - price_width - 36, new_img.height - 50)
-                draw.text(text_position, price, fill=text_color, font=font)
-                
-                # 保存处理后的图片
-                goods_file_stem = re.sub(
-                    r"[^0-9A-Za-z_-]",
-                    "_",
-                    str(goods.get("goods_id", f"goods_{i + 1}")),
-                ).strip("_")
-                if not goods_file_stem:
-                    goods_file_stem = f"goods_{i + 1}"
-                processed_image_path = self._build_safe_temp_file_path(user_id, f"{goods_file_stem}.jpg")
-                new_img.save(processed_image_path)
-                processed_images.append(str(processed_image_path))
-                logger.info(f"商品 {goods['goods_name']} 处理完成")
-                
-            except Exception as e:
-                logger.error(f"图片处理失败: {e}")
-            finally:
-                # 清理临时文件
-                for path in [bg_img_path, goods_img_path]:
-                    if path and os.path.exists(path):
-                        os.remove(path)
+            logger.debug("处理商品 %d/%d: %s", i + 1, len(goods_list), goods['goods_name'])
+            card = await self._render_card(goods, font, trace=trace)
+            if card is not None:
+                processed_images.append(card)
         
         if not processed_images:
             logger.error("没有商品图片处理成功")
-            return None, None
+            return None
             
-        logger.info(f"成功处理 {len(processed_images)} 张图片")
+        logger.debug("成功处理 %d 张图片，开始合并", len(processed_images))
         
         # 合并所有处理后的图片
-        logger.info("开始合并图片")
-        images = [PILImage.open(img_path) for img_path in processed_images]
-        
-        # 计算合并后图片尺寸
-        max_width = max(img.width for img in images)
-        total_height = sum(img.height for img in images) + (len(images) - 1) * 20  # 20px 间距
-        
-        # 创建合并后的图片
-        merged_image = PILImage.new('RGB', (max_width, total_height), color='white')
-        
-        # 将所有图片垂直拼接
-        y_offset = 0
-        for img in images:
-            merged_image.paste(img, (0, y_offset))
-            y_offset += img.height + 20
-        
-        # 保存合并后的图片
-        merged_image_path = self._build_safe_temp_file_path(user_id, "merged.jpg")
-        merged_image.save(merged_image_path)
-        logger.info(f"合并图片保存到: {merged_image_path}")
-        
-        # 如果需要保留文件（Kook平台），直接返回文件路径
-        if keep_file:
-            logger.info("Kook平台模式，返回本地图片路径")
-            return None, str(merged_image_path)
-        
-        # 转换为base64
-        with open(merged_image_path, 'rb') as f:
-            image_bytes = f.read()
-            base64_data = base64.b64encode(image_bytes).decode('utf-8')
-            logger.info(f"图片转换为base64，原始大小: {len(image_bytes)} 字节, base64长度: {len(base64_data)}")
-        
-        # 清理临时目录
-        if user_temp_dir.exists():
-            shutil.rmtree(user_temp_dir)
-            logger.info(f"清理临时目录: {user_temp_dir}")
-            
-        logger.info("商店图片生成完成")
-        return base64_data, None
+        with span(trace, "merge"):
+            merged_image = merge_cards(processed_images)
+
+        # 编码为 JPEG 字节，不落盘
+        with span(trace, "encode"):
+            image_bytes = encode_jpeg(merged_image)
+        self._log("render", logging.INFO, "商店图片生成完成，大小: %d 字节", len(image_bytes))
+        return image_bytes
+
+    async def _render_card(self, goods: Dict[str, Any], font, trace: Optional[RequestTrace] = None):
+        """生成单个商品卡片，按 (背景图, 商品图, 名称, 价格) 缓存到当日结束；失败返回 None。"""
+        bg_img_url = goods.get('bg_image')
+        goods_img_url = goods.get('goods_pic')
+        if not bg_img_url or not goods_img_url:
+            logger.error("商品缺少图片URL")
+            return None
+
+        price = goods.get('rmb_price', '0')
+        cache_key = (bg_img_url, goods_img_url, goods['goods_name'], str(price))
+        day = self._current_shop_day()
+        card = self._card_cache.get(cache_key, day)
+        self.metrics.inc("shop_cache_requests_total", cache="card", result="hit" if card is not None else "miss")
+        if card is not None:
+            return card
+
+        with span(trace, "download"):
+            bg_img_bytes = await self.download_image(bg_img_url)
+            goods_img_bytes = await self.download_image(goods_img_url)
+
+        if not bg_img_bytes or not goods_img_bytes:
+            logger.error("图片下载失败，跳过该商品")
+            return None
+
+        compose_started = time.perf_counter()
+        try:
+            card = render_goods_card(bg_img_bytes, goods_img_bytes, goods['goods_name'], price, font)
+        except Exception as e:
+            logger.error(f"图片处理失败: {e}")
+            return None
+        finally:
+            if trace is not None:
+                trace.add("compose", time.perf_counter() - compose_started)
+        # 卡片只会被读取（粘贴、缩放都会生成新图），可在多个商店图片间共享
+        self._card_cache.put(cache_key, day, card)
+        logger.debug("商品 %s 处理完成", goods['goods_name'])
+        return card
 
     async def get_user_config(self, user_id: str) -> Optional[Dict[str, Any]]:
         """??"""
-        logger.info(f"查询用户配置，user_id: {user_id}")
+        logger.debug("查询用户配置，user_id: %s", user_id)
         db = self.context.get_db()
         async with db.get_db() as session:
             session: AsyncSession
             result = await session.execute(
-                text("SELECT userId, tid, nickname, auto_check FROM valo_users WHERE user_id = :user_id"),
+                text("""
+                    SELECT userId, tid, nickname, auto_check, credential_status, notify_time, notify_tz
+                    FROM valo_users WHERE user_id = :user_id
+                """),
                 {"user_id": user_id}
             )
             row = result.fetchone()
             if row:
-                logger.info(
-                    f"找到用户配置: userId={row[0]}, tid={row[1][:20]}..., auto_check={row[3]}"
-                )
+                logger.debug("找到用户配置: userId=%s, auto_check=%s", row[0], row[3])
                 return {
                     'userId': row[0],
                     'tid': row[1],
                     'nickname': row[2],
-                    'auto_check': row[3] if row[3] is not None else 0
+                    'auto_check': row[3] if row[3] is not None else 0,
+                    'credential_status': row[4] or 'ok',
+                    'notify_time': row[5],
+                    'notify_tz': row[6],
                 }
             else:
                 logger.warning(f"未找到用户 {user_id} 的配置")
@@ -1720,10 +3329,19 @@ class ValorantShopPlugin(Star):
             session: AsyncSession
             async with session.begin():
                 await session.execute(
+                    # 重新绑定时保留监控开关等设置，只更新凭证并重置凭证状态
                     text("""
-                        INSERT OR REPLACE INTO valo_users
+                        INSERT INTO valo_users
                         (user_id, userId, tid, nickname, updated_at)
                         VALUES (:user_id, :userId, :tid, :nickname, CURRENT_TIMESTAMP)
+                        ON CONFLICT(user_id) DO UPDATE SET
+                            userId = excluded.userId,
+                            tid = excluded.tid,
+                            nickname = excluded.nickname,
+                            updated_at = CURRENT_TIMESTAMP,
+                            credential_status = 'ok',
+                            credential_checked_at = NULL,
+                            expired_notified = 0
                     """),
                     {"user_id": user_id, "userId": userId, "tid": tid, "nickname": nickname}
                 )
@@ -1741,7 +3359,8 @@ class ValorantShopPlugin(Star):
                     {"user_id": user_id}
                 )
                 deleted = int(result.rowcount or 0)
-                return deleted > 0
+        self._unschedule_user(user_id)
+        return deleted > 0
 
     async def get_at_id(self, event: AstrMessageEvent) -> Optional[str]:
         """获取消息中被 @ 的用户ID（排除机器人自身）。"""
@@ -1757,86 +3376,99 @@ class ValorantShopPlugin(Star):
     @filter.command("每日商店")
     async def daily_shop_command(self, event: AstrMessageEvent):
         """查询每日商店，支持 @其他用户。"""
+        trace = RequestTrace("每日商店", sender=event.get_sender_id())
+        try:
+            async for result in self._daily_shop_flow(event, trace):
+                yield result
+        finally:
+            self._record_request_trace(trace)
+
+    def _record_request_trace(self, trace: RequestTrace):
+        """请求结束后检查耗时，超过阈值时输出分阶段明细并保留到慢请求列表。"""
+        if self.slow_traces.record(trace, self._get_slow_request_threshold()):
+            logger.warning(f"慢请求: {trace.format()}")
+        else:
+            logger.debug("请求耗时: %s", trace.format())
+
+    async def _daily_shop_flow(self, event: AstrMessageEvent, trace: RequestTrace):
+        """每日商店查询流程，各阶段耗时记录到 trace。"""
         target_user_id = await self.get_at_id(event)
         if target_user_id:
             logger.info(f"检测到@用户，目标用户ID: {target_user_id}")
 
-        if target_user_id:
-            user_id = target_user_id
+        user_id = target_user_id or event.get_sender_id()
+        trace.attrs["user"] = user_id
+        with span(trace, "db_lookup"):
             user_config = await self.get_user_config(user_id)
+            if user_config:
+                await self._touch_user_activity(user_id)
+
+        if target_user_id:
             if not user_config:
                 yield event.plain_result(f"用户 {target_user_id} 未绑定账号")
                 return
         else:
-            user_id = event.get_sender_id()
-            user_config = await self.get_user_config(user_id)
             if not user_config:
                 yield event.plain_result("您尚未绑定无畏契约账号，请先使用 /瓦 进行绑定")
                 return
 
         logger.info(f"开始为用户 {user_id} 获取商店信息")
         is_kook = self._is_kook_platform(event)
-        logger.info(f"当前平台: {'Kook' if is_kook else '其他'}")
-
-        # 先检测凭证是否可用，避免过期配置继续漏到图片生成链路。
-        response_data, err_msg, auth_invalid = await self._request_store_api(
-            user_id,
-            user_config,
-            max_retries=1,
-            timeout=10,
-        )
-        if not response_data:
-            if auth_invalid:
-                if target_user_id:
-                    yield event.plain_result(
-                        f"用户 {target_user_id} 的登录凭证已过期，请对方重新使用 /瓦 绑定后再试"
-                    )
-                else:
-                    yield event.plain_result("当前登录凭证已过期，请使用 /瓦 重新绑定后再试")
-            else:
-                if target_user_id:
-                    yield event.plain_result(
-                        f"获取用户 {target_user_id} 的商店信息失败: {err_msg or '请稍后重试'}"
-                    )
+        logger.debug("当前平台: %s", 'Kook' if is_kook else '其他')
+
+        # 当日已渲染过（预取或他人查询）时直接发送
+        image_bytes = self._get_cached_shop_image(user_config)
+        if image_bytes is not None:
+            trace.attrs["cache"] = "hit"
+        else:
+            # 先检测凭证是否可用，避免过期配置继续漏到图片生成链路。
+            with span(trace, "store_api"):
+                goods_list, err_msg, auth_invalid = await self._fetch_goods_list(
+                    user_id,
+                    user_config,
+                    max_retries=1,
+                    timeout=10,
+                )
+            if goods_list is None:
+                if auth_invalid:
+                    if target_user_id:
+                        yield event.plain_result(
+                            f"用户 {target_user_id} 的登录凭证已过期，请对方重新使用 /瓦 绑定后再试"
+                        )
+                    else:
+                        yield event.plain_result("当前登录凭证已过期，请使用 /瓦 重新绑定后再试")
                 else:
-                    yield event.plain_result(f"获取商店信息失败: {err_msg or '请稍后重试'}")
-            return
+                    if target_user_id:
+                        yield event.plain_result(
+                            f"获取用户 {target_user_id} 的商店信息失败: {err_msg or '请稍后重试'}"
+                        )
+                    else:
+                        yield event.plain_result(f"获取商店信息失败: {err_msg or '请稍后重试'}")
+                return
 
-        goods_list, parse_err_msg = self._extract_shop_goods_list(response_data)
-        if parse_err_msg:
-            if target_user_id:
-                yield event.plain_result(f"获取用户 {target_user_id} 的商店信息失败: {parse_err_msg}")
-            else:
-                yield event.plain_result(f"获取商店信息失败: {parse_err_msg}")
-            return
+            if user_config.get('credential_status') == 'expired':
+                # 之前判定为过期但本次请求成功，恢复状态
+                await self._set_credential_status(user_id, "ok")
 
-        if not goods_list:
-            if target_user_id:
-                yield event.plain_result(f"用户 {target_user_id} 今日商店暂无可用数据")
-            else:
-                yield event.plain_result("今日商店暂无可用数据，请稍后再试")
-            return
+            if not goods_list:
+                if target_user_id:
+                    yield event.plain_result(f"用户 {target_user_id} 今日商店暂无可用数据")
+                else:
+                    yield event.plain_result("今日商店暂无可用数据，请稍后再试")
+                return
 
-        shop_data, image_path = await self.get_shop_data(
-            user_id,
-            user_config,
-            keep_file=is_kook,
-            goods_list=goods_list,
-        )
+            image_bytes = await self._render_shop_image_cached(
+                user_id,
+                user_config,
+                goods_list,
+                trace=trace,
+            )
 
-        if shop_data or image_path:
+        if image_bytes:
             try:
-                if is_kook and image_path:
-                    logger.info(f"Kook平台：开始上传并发送图片 {image_path}")
-                    success, error_msg = await self._send_image_for_kook(event, image_path)
-
-                    try:
-                        temp_dir = self._get_safe_temp_user_dir(user_id)
-                    except ValueError:
-                        temp_dir = None
-                    if temp_dir and temp_dir.exists():
-                        shutil.rmtree(temp_dir)
-                        logger.info(f"清理临时目录: {temp_dir}")
+                if is_kook:
+                    logger.info(f"Kook平台：开始上传并发送图片，大小: {len(image_bytes)} 字节")
+                    success, error_msg = await self._send_image_for_kook(event, image_bytes, "shop.jpg", trace=trace)
 
                     if not success:
                         logger.error(f"Kook平台图片发送失败: {error_msg}")
@@ -1845,9 +3477,9 @@ class ValorantShopPlugin(Star):
                         else:
                             yield event.plain_result(f"获取商店信息失败: {error_msg}")
                 else:
-                    import base64
-                    image_data = base64.b64decode(shop_data)
-                    yield event.chain_result([Image.fromBytes(image_data)])
+                    # 生成器在 yield 处挂起直到框架发送完成，因此这里的耗时即发送耗时
+                    with span(trace, "send"):
+                        yield event.chain_result([Image.fromBytes(image_bytes)])
             except Exception as e:
                 logger.error(f"图片消息创建失败: {e}")
                 import traceback
@@ -1883,7 +3515,7 @@ class ValorantShopPlugin(Star):
 
     @filter.command("商店监控")
     async def watchlist_command(self, event: AstrMessageEvent):
-        """商店监控子命令：添加、删除、列表、查询、开启、关闭。"""
+        """商店监控子命令：添加、删除、列表、查询、开启、关闭、时间。"""
         user_id = event.get_sender_id()
         message = event.get_message_str()
         parts = message.split(maxsplit=2)
@@ -1891,19 +3523,25 @@ class ValorantShopPlugin(Star):
         if len(parts) < 2:
             user_config = await self.get_user_config(user_id)
             auto_check_status = "已开启" if user_config and user_config.get('auto_check') == 1 else "已关闭"
+            notify_time, notify_tz = self._describe_user_schedule(user_config)
 
             help_text = (
                 "商店监控功能\n\n"
                 "可用子命令：\n"
-                "/商店监控 添加 \"皮肤 武器\" - 添加监控项\n"
+                "/商店监控 添加 \"皮肤 武器\" [强制] - 添加监控项\n"
                 "/商店监控 删除 \"皮肤 武器\" - 删除监控项\n"
                 "/商店监控 列表 - 查看监控列表\n"
                 "/商店监控 查询 - 立即执行一次监控查询\n"
                 "/商店监控 开启 - 启用自动查询\n"
-                "/商店监控 关闭 - 停用自动查询\n\n"
+                "/商店监控 关闭 - 停用自动查询\n"
+                "/商店监控 时间 HH:MM [时区] - 设置个人监控时间，\"默认\" 恢复全局设置\n"
+                "/商店监控 状态 [prom] - 查看运行指标（管理员）\n"
+                "/商店监控 慢请求 - 查看最近的慢请求明细（管理员）\n"
+                "/商店监控 热度 [名称] - 查看监控人数（管理员）\n"
+                "/商店监控 重载 - 立即应用修改后的监控时间与时区（管理员）\n\n"
                 f"当前自动查询状态：{auto_check_status}\n"
-                f"监控时间：{self._get_config_value('monitor_time', '08:01')}\n"
-                f"时区：{self._get_config_value('timezone', 'Asia/Shanghai')}"
+                f"监控时间：{notify_time}\n"
+                f"时区：{notify_tz}"
             )
             yield event.plain_result(help_text)
             return
@@ -1911,16 +3549,44 @@ class ValorantShopPlugin(Star):
         sub_command = parts[1].strip()
 
         if sub_command == "添加" and len(parts) >= 3:
-            item_name = parts[2].strip().strip('"')
+            item_text = parts[2].strip()
+            # 末尾的 "强制" 表示不做纠错提示，按原文添加
+            text_head, _, text_tail = item_text.rpartition(" ")
+            force = bool(text_head.strip()) and text_tail == "强制"
+            if force:
+                item_text = text_head
+            item_name = item_text.strip().strip('"')
             if not item_name:
                 yield event.plain_result("请提供商品名称，例如：/商店监控 添加 \"侦察力量 幻象\"")
                 return
 
-            success = await self.add_watch_item(user_id, item_name)
-            if success:
-                yield event.plain_result(f"已添加监控项 \"{item_name}\"")
+            canonical, matched = self._canonical_watch_target(item_name)
+            if canonical:
+                item_name, goods_id = canonical
             else:
+                goods_id = None
+
+            if not goods_id and not matched and not force and len(self.catalog):
+                # 无法匹配任何已记录商品时先给出相近名称，确认后才保存，避免错别字进入监控列表
+                suggestions = [name for name, _, score in self.catalog.suggest(item_name, limit=3) if score < 1.0]
+                if suggestions:
+                    lines = "\n".join(f"  - /商店监控 添加 \"{name}\"" for name in suggestions)
+                    yield event.plain_result(
+                        f"已记录的商品中没有与 \"{item_name}\" 匹配的，你是否想找：\n{lines}\n"
+                        f"确认按原文添加请使用：/商店监控 添加 \"{item_name}\" 强制"
+                    )
+                    return
+
+            success = await self.add_watch_item(user_id, item_name, goods_id)
+            if not success:
                 yield event.plain_result(f"监控项 \"{item_name}\" 已存在")
+                return
+            reply = f"已添加监控项 \"{item_name}\""
+            if goods_id:
+                reply += "（已关联商品，按商品 ID 精确匹配）"
+            elif matched:
+                reply += f"（关键词，当前已记录的商品中可匹配 {matched} 个）"
+            yield event.plain_result(reply)
 
         elif sub_command == "删除" and len(parts) >= 3:
             item_name = parts[2].strip().strip('"')
@@ -1939,36 +3605,199 @@ class ValorantShopPlugin(Star):
             if not watchlist:
                 yield event.plain_result("您的监控列表为空\n使用 /商店监控 添加 \"商品名称\" 来添加监控项")
             else:
-                items_text = "\n".join([f"  - {item['item_name']}" for item in watchlist])
+                items_text = "\n".join([
+                    f"  - {item['item_name']}" + ("" if item.get('goods_id') else "（关键词）")
+                    for item in watchlist
+                ])
                 yield event.plain_result(f"您的监控列表（{len(watchlist)}项）：\n{items_text}")
 
         elif sub_command == "查询":
             yield event.plain_result("正在执行监控查询，请稍候...")
             try:
-                unified_msg_origin = event.unified_msg_origin
-                await self.check_user_watchlist(user_id, unified_msg_origin)
-                yield event.plain_result("监控查询完成")
+                # 结果直接回复，不进入按平台限速的通知队列
+                yield event.plain_result(await self.check_user_watchlist(user_id))
             except Exception as e:
                 logger.error(f"手动监控查询失败: {e}")
                 yield event.plain_result("监控查询失败，请稍后重试")
 
         elif sub_command == "开启":
             await self.update_auto_check(user_id, 1)
+            notify_time, notify_tz = self._describe_user_schedule(await self.get_user_config(user_id))
             yield event.plain_result(
                 f"已开启自动查询\n"
-                f"每天 {self._get_config_value('monitor_time', '08:01')} "
-                f"({self._get_config_value('timezone', 'Asia/Shanghai')}) 执行\n"
+                f"每天 {notify_time} ({notify_tz}) 执行\n"
                 "监控到上架后会自动通知你"
             )
 
+        elif sub_command == "时间":
+            user_config = await self.get_user_config(user_id)
+            if not user_config:
+                yield event.plain_result("请先使用 /瓦 绑定账号")
+                return
+            args = parts[2].split() if len(parts) >= 3 else []
+            if not args:
+                notify_time, notify_tz = self._describe_user_schedule(user_config)
+                yield event.plain_result(
+                    f"当前监控时间：{notify_time} ({notify_tz})\n"
+                    "设置：/商店监控 时间 HH:MM [时区，如 Asia/Tokyo]\n"
+                    "恢复全局设置：/商店监控 时间 默认"
+                )
+                return
+            if args[0] in {"默认", "default"}:
+                await self.set_user_notify_schedule(user_id, None, None)
+                notify_time, notify_tz = self._describe_user_schedule(await self.get_user_config(user_id))
+                yield event.plain_result(f"已恢复全局监控时间：{notify_time} ({notify_tz})")
+                return
+            hhmm = parse_hhmm(args[0])
+            if hhmm is None:
+                yield event.plain_result("时间格式应为 HH:MM，例如：/商店监控 时间 21:30")
+                return
+            notify_tz = args[1] if len(args) >= 2 else user_config.get('notify_tz')
+            if notify_tz:
+                try:
+                    ZoneInfo(notify_tz)
+                except Exception:
+                    yield event.plain_result(f"无效的时区：{notify_tz}，请使用 IANA 时区名，例如 Asia/Shanghai")
+                    return
+            notify_time = f"{hhmm[0]:02d}:{hhmm[1]:02d}"
+            if not await self.set_user_notify_schedule(user_id, notify_time, notify_tz):
+                yield event.plain_result("设置失败，请稍后重试")
+                return
+            notify_time, notify_tz = self._describe_user_schedule(await self.get_user_config(user_id))
+            tip = "" if user_config.get('auto_check') == 1 else "\n自动查询未开启，请使用 /商店监控 开启"
+            yield event.plain_result(f"个人监控时间已设置为每天 {notify_time} ({notify_tz}){tip}")
+
         elif sub_command == "关闭":
             await self.update_auto_check(user_id, 0)
             yield event.plain_result("已关闭自动查询")
 
+        elif sub_command == "状态":
+            if not event.is_admin():
+                yield event.plain_result("该命令仅限管理员使用")
+                return
+            export_format = parts[2].strip().lower() if len(parts) >= 3 else ""
+            if export_format in {"prom", "prometheus"}:
+                yield event.plain_result(self.metrics.render_prometheus())
+            else:
+                summary = self.metrics.summary() or "暂无数据"
+                last_run = self._last_daily_summary or "尚未运行"
+                yield event.plain_result(f"商店插件运行指标：\n{summary}\n\n最近一次每日监控：{last_run}")
+
+        elif sub_command == "慢请求":
+            if not event.is_admin():
+                yield event.plain_result("该命令仅限管理员使用")
+                return
+            traces = self.slow_traces.recent()
+            if not traces:
+                yield event.plain_result("暂无慢请求记录")
+            else:
+                lines = "\n".join(trace.format() for trace in traces)
+                yield event.plain_result(f"最近 {len(traces)} 条慢请求：\n{lines}")
+
+        elif sub_command == "重载":
+            if not event.is_admin():
+                yield event.plain_result("该命令仅限管理员使用")
+                return
+            yield event.plain_result(await self.reload_schedule_config())
+
+        elif sub_command == "热度":
+            if not event.is_admin():
+                yield event.plain_result("该命令仅限管理员使用")
+                return
+            item_name = parts[2].strip().strip('"') if len(parts) >= 3 else ""
+            if item_name:
+                count = self.get_watch_term_popularity(item_name)
+                yield event.plain_result(f"监控 \"{item_name}\" 的用户数：{count}")
+            else:
+                ranking = sorted(self._watch_index.items(), key=lambda kv: len(kv[1]), reverse=True)[:10]
+                if not ranking:
+                    yield event.plain_result("暂无监控项")
+                else:
+                    lines = "\n".join(
+                        f"  {idx}. {self._watch_index_names.get(key, key)}：{len(users)} 人"
+                        for idx, (key, users) in enumerate(ranking, 1)
+                    )
+                    yield event.plain_result(f"监控人数最多的商品：\n{lines}")
+
         else:
             yield event.plain_result("未知子命令，请使用 /商店监控 查看帮助")
 
 
+    def _get_max_concurrent_logins(self) -> int:
+        """读取全局并发登录上限。"""
+        try:
+            return max(1, int(self._get_config_value("max_concurrent_logins", 20) or 20))
+        except (TypeError, ValueError):
+            return 20
+
+    def get_active_login_count(self) -> int:
+        """当前活跃的登录会话数量。"""
+        self._sweep_login_sessions()
+        return len(self.login_sessions)
+
+    def _sweep_login_sessions(self):
+        """清理已结束或超时残留的登录会话。"""
+        now = time.time()
+        for user_id, entry in list(self.login_sessions.items()):
+            task = entry.get("task")
+            expired = now - entry["started_at"] > self.LOGIN_SESSION_MAX_AGE
+            if expired:
+                logger.warning(f"[登录会话] 用户 {user_id} 的 {entry['mode']} 登录超时，自动清理")
+                if task and not task.done():
+                    task.cancel()
+                self.login_sessions.pop(user_id, None)
+            elif task and task.done():
+                self.login_sessions.pop(user_id, None)
+
+    def _cancel_login_session(self, user_id: str) -> bool:
+        """取消用户正在进行的登录会话。"""
+        entry = self.login_sessions.pop(user_id, None)
+        if not entry:
+            return False
+        task = entry.get("task")
+        if task and not task.done():
+            task.cancel()
+        logger.info(f"[登录会话] 已取消用户 {user_id} 的 {entry['mode']} 登录")
+        return True
+
+    def _begin_login_session(self, user_id: str, mode: str) -> Tuple[Optional[str], Optional[str]]:
+        """登记新的登录会话，返回 (token, 错误提示)。
+
+        每个用户只保留一个活跃登录，新的登录会取消旧的。
+        """
+        self._sweep_login_sessions()
+        self._cancel_login_session(user_id)
+
+        max_logins = self._get_max_concurrent_logins()
+        if len(self.login_sessions) >= max_logins:
+            logger.warning(f"[登录会话] 并发登录已达上限 {max_logins}，拒绝用户 {user_id}")
+            return None, "当前登录人数较多，请稍后再试"
+
+        token = f"{mode}-{time.time_ns()}"
+        self.login_sessions[user_id] = {
+            "mode": mode,
+            "token": token,
+            "task": None,
+            "started_at": time.time(),
+        }
+        logger.info(f"[登录会话] 用户 {user_id} 开始 {mode} 登录，当前活跃会话数: {len(self.login_sessions)}")
+        return token, None
+
+    def _attach_login_task(self, user_id: str, token: str, task: asyncio.Task):
+        """将等待登录结果的任务挂到会话上，便于统一取消。"""
+        entry = self.login_sessions.get(user_id)
+        if entry and entry["token"] == token:
+            entry["task"] = task
+        else:
+            # 会话已被取消或替换，任务不再需要
+            task.cancel()
+
+    def _end_login_session(self, user_id: str, token: str):
+        """结束登录会话；只移除属于本次登录的登记。"""
+        entry = self.login_sessions.get(user_id)
+        if entry and entry["token"] == token:
+            self.login_sessions.pop(user_id, None)
+
     async def _qq_bind_flow(self, event: AstrMessageEvent, user_id: str, check_existing: bool = True):
         """QQ 二维码绑定流程。"""
         if check_existing:
@@ -1988,8 +3817,14 @@ class ValorantShopPlugin(Star):
             else:
                 logger.info(f"[HTTP登录] 用户 {user_id} 未绑定，开始绑定流程")
 
+        login_token, limit_msg = self._begin_login_session(user_id, "qq")
+        if not login_token:
+            yield event.plain_result(limit_msg)
+            return
+
         yield event.plain_result("正在生成QQ登录二维码，请稍候...")
 
+        poll_task: Optional[asyncio.Task] = None
         try:
             http_ctx = await self.generate_qr_code_http()
             if not http_ctx:
@@ -1997,13 +3832,13 @@ class ValorantShopPlugin(Star):
                 return
 
             http_session: aiohttp.ClientSession = http_ctx["session"]
-            qr_filename = http_ctx["filename"]
+            qr_image_data: bytes = http_ctx["qr_image"]
             try:
                 is_kook = self._is_kook_platform(event)
                 logger.info(f"[HTTP登录] 二维码发送平台: {'Kook' if is_kook else 'Other'}")
 
                 if is_kook:
-                    success, error_msg = await self._send_image_for_kook(event, qr_filename)
+                    success, error_msg = await self._send_image_for_kook(event, qr_image_data, "qrcode.png")
                     if success:
                         yield event.plain_result("请在30秒内扫码登录")
                     else:
@@ -2011,14 +3846,12 @@ class ValorantShopPlugin(Star):
                         yield event.plain_result(f"发送二维码失败: {error_msg}")
                         return
                 else:
-                    with open(qr_filename, 'rb') as f:
-                        qr_image_data = f.read()
                     yield event.chain_result([
                         Image.fromBytes(qr_image_data),
                         Plain("请在30秒内扫码登录"),
                     ])
 
-                login_data = await self.wait_for_http_login_result(
+                poll_task = asyncio.create_task(self.wait_for_http_login_result(
                     session=http_session,
                     ptqrtoken=http_ctx["ptqrtoken"],
                     login_sig=http_ctx.get("login_sig", ""),
@@ -2030,7 +3863,16 @@ class ValorantShopPlugin(Star):
                     pt_uistyle=http_ctx.get("pt_uistyle", "35"),
                     ptlang=http_ctx.get("ptlang", "2052"),
                     timeout=30,
-                )
+                ))
+                self._attach_login_task(user_id, login_token, poll_task)
+                # 用 wait 而不是直接 await，会话被 /瓦 清除 取消时不会把异常抛进生成器
+                await asyncio.wait({poll_task})
+                if poll_task.cancelled():
+                    logger.info(f"[HTTP登录] 用户 {user_id} 的登录已被取消")
+                    yield event.plain_result("本次QQ登录已取消")
+                    return
+
+                login_data = poll_task.result()
                 if not login_data:
                     yield event.plain_result("登录失败或超时，请重试")
                     return
@@ -2052,15 +3894,231 @@ class ValorantShopPlugin(Star):
                     f"现在可以使用 /每日商店"
                 )
             finally:
+                if poll_task and not poll_task.done():
+                    poll_task.cancel()
                 await http_session.close()
                 logger.info("[HTTP登录] HTTP会话已关闭")
-                if os.path.exists(qr_filename):
-                    os.remove(qr_filename)
-                    logger.info(f"[HTTP登录] 清理二维码文件: {qr_filename}")
 
         except Exception as e:
             logger.error(f"[HTTP登录] 绑定流程异常: type={type(e).__name__}, repr={repr(e)}")
             yield event.plain_result("登录过程出错，请稍后重试")
+        finally:
+            self._end_login_session(user_id, login_token)
+
+    @filter.command("商店历史")
+    async def shop_history_command(self, event: AstrMessageEvent):
+        """查询商店历史：/商店历史 查看最近 7 天，/商店历史 名称 查看某商品的出现记录。"""
+        user_id = event.get_sender_id()
+        user_config = await self.get_user_config(user_id)
+        if not user_config:
+            yield event.plain_result("请先使用 /瓦 绑定账号")
+            return
+        game_user_id = str(user_config.get("userId", ""))
+
+        parts = event.get_message_str().split(maxsplit=1)
+        query = parts[1].strip().strip('"') if len(parts) >= 2 else ""
+        try:
+            if not query:
+                history = await self.get_shop_history(game_user_id, days=7)
+                if not history:
+                    yield event.plain_result("暂无商店历史，查询过 /每日商店 或开启监控后会自动记录")
+                    return
+                lines = []
+                for shop_day, items in history.items():
+                    lines.append(shop_day)
+                    lines.extend(f"  - {name} ({price if price is not None else '?'})" for name, price in items)
+                yield event.plain_result("最近 7 天的商店：\n" + "\n".join(lines))
+                return
+
+            name_ids = await self._find_goods_name_ids(query)
+            if not name_ids:
+                yield event.plain_result(f"历史记录中没有与 \"{query}\" 匹配的商品")
+                return
+            stats = await self.get_goods_history_stats(game_user_id, list(name_ids), days=90)
+            names = "、".join(sorted(name_ids.values())[:5]) + ("等" if len(name_ids) > 5 else "")
+            if stats["last_seen"]:
+                shop_day, name, price = stats["last_seen"]
+                last_text = f"{shop_day}（{name}，{price if price is not None else '?'}）"
+            else:
+                last_text = "你的商店中尚未出现过"
+            yield event.plain_result(
+                f"\"{query}\" 的商店历史\n"
+                f"匹配商品：{names}\n"
+                f"你的商店最近一次出现：{last_text}\n"
+                f"近 90 天在你的商店出现：{stats['own_days']} 天\n"
+                f"近 90 天全部已记录账号中出现：{stats['total']} 次（{stats['accounts']} 个账号）"
+            )
+        except Exception as e:
+            logger.error(f"查询商店历史失败: {e}")
+            yield event.plain_result("查询商店历史失败，请稍后重试")
+
+    def _board_group_key(self, event: AstrMessageEvent) -> Optional[str]:
+        """群聊时返回群会话 ID 作为看板标识，私聊返回 None。"""
+        try:
+            if not event.get_group_id():
+                return None
+        except Exception:
+            return None
+        return event.unified_msg_origin
+
+    async def _set_board_member(self, group_key: str, user_id: str, joined: bool) -> bool:
+        """加入或退出看板，返回成员关系是否发生变化。"""
+        db = self.context.get_db()
+        async with db.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                if joined:
+                    result = await session.execute(
+                        text("INSERT OR IGNORE INTO valo_board_members (group_id, user_id) VALUES (:group_id, :user_id)"),
+                        {"group_id": group_key, "user_id": user_id},
+                    )
+                else:
+                    result = await session.execute(
+                        text("DELETE FROM valo_board_members WHERE group_id = :group_id AND user_id = :user_id"),
+                        {"group_id": group_key, "user_id": user_id},
+                    )
+                return int(result.rowcount or 0) > 0
+
+    async def _get_board_members(self, group_key: str) -> List[Dict[str, Any]]:
+        """按加入顺序返回看板成员及其绑定信息；已解绑的成员 userId 为 None。"""
+        db = self.context.get_db()
+        async with db.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(
+                text("""
+                    SELECT m.user_id, u.userId, u.tid, u.nickname, u.credential_status
+                    FROM valo_board_members m
+                    LEFT JOIN valo_users u ON u.user_id = m.user_id
+                    WHERE m.group_id = :group_id
+                    ORDER BY m.joined_at, m.user_id
+                """),
+                {"group_id": group_key},
+            )
+            return [
+                {
+                    "user_id": row[0],
+                    "userId": row[1],
+                    "tid": row[2],
+                    "nickname": row[3],
+                    "credential_status": row[4] or "ok",
+                }
+                for row in result.fetchall()
+            ]
+
+    @timed("board_render_seconds", is_ok=lambda result: result[0] is not None)
+    async def _render_shop_board(self, members: List[Dict[str, Any]]) -> Tuple[Optional[bytes], List[str]]:
+        """并发拉取并渲染一页成员的商店，拼成网格图片，返回 (JPEG 字节, 失败说明列表)。
+
+        同时处理的成员数受 BOARD_CONCURRENCY 限制；商品列表与卡片复用当日缓存。
+        """
+        font = load_font(self.font_path)
+        title_font = load_font(self.font_path, BOARD_TITLE_FONT_SIZE)
+        semaphore = asyncio.Semaphore(self.BOARD_CONCURRENCY)
+
+        async def render_member(member: Dict[str, Any]):
+            name = member.get("nickname") or member["user_id"]
+            if not member.get("userId"):
+                return None, f"{name}（未绑定）"
+            if member.get("credential_status") == "expired":
+                return None, f"{name}（凭证已过期）"
+            async with semaphore:
+                goods_list, err_msg, auth_invalid = await self._fetch_goods_list(
+                    member["user_id"], member, max_retries=1, timeout=10,
+                )
+                if not goods_list:
+                    if auth_invalid:
+                        return None, f"{name}（凭证已过期）"
+                    return None, f"{name}（{err_msg or '暂无商店数据'}）"
+                cards = [card for card in [await self._render_card(goods, font) for goods in goods_list] if card]
+                if not cards:
+                    return None, f"{name}（图片生成失败）"
+                return render_member_panel(cards, name, title_font), None
+
+        results = await asyncio.gather(*(render_member(member) for member in members), return_exceptions=True)
+        panels, failed = [], []
+        for member, result in zip(members, results):
+            if isinstance(result, Exception):
+                logger.error(f"看板成员 {member['user_id']} 渲染失败: {result}")
+                failed.append(f"{member.get('nickname') or member['user_id']}（生成失败）")
+                continue
+            panel, error = result
+            if panel is not None:
+                panels.append(panel)
+            else:
+                failed.append(error)
+
+        if not panels:
+            return None, failed
+        grid = compose_grid(panels)
+        image_bytes = encode_jpeg(grid)
+        self._log("render", logging.INFO, "商店看板生成完成：%d 人，大小: %d 字节", len(panels), len(image_bytes))
+        return image_bytes, failed
+
+    @filter.command("商店看板")
+    async def shop_board_command(self, event: AstrMessageEvent):
+        """群商店看板：/商店看板 [页码]、/商店看板 加入、/商店看板 退出。"""
+        group_key = self._board_group_key(event)
+        if not group_key:
+            yield event.plain_result("商店看板仅支持在群聊中使用")
+            return
+        user_id = event.get_sender_id()
+        parts = event.get_message_str().split(maxsplit=1)
+        arg = parts[1].strip() if len(parts) >= 2 else ""
+
+        try:
+            if arg == "加入":
+                if not await self.get_user_config(user_id):
+                    yield event.plain_result("请先使用 /瓦 绑定账号后再加入看板")
+                    return
+                if await self._set_board_member(group_key, user_id, joined=True):
+                    yield event.plain_result("已加入本群商店看板")
+                else:
+                    yield event.plain_result("你已在本群商店看板中")
+                return
+            if arg == "退出":
+                if await self._set_board_member(group_key, user_id, joined=False):
+                    yield event.plain_result("已退出本群商店看板")
+                else:
+                    yield event.plain_result("你不在本群商店看板中")
+                return
+            if arg and not arg.isdigit():
+                yield event.plain_result("用法：/商店看板 [页码] | 加入 | 退出")
+                return
+
+            members = await self._get_board_members(group_key)
+            if not members:
+                yield event.plain_result("本群商店看板暂无成员，已绑定账号的用户可使用 /商店看板 加入")
+                return
+            page_size = self._get_board_page_size()
+            total_pages = (len(members) + page_size - 1) // page_size
+            page = min(max(1, int(arg or 1)), total_pages)
+            page_members = members[(page - 1) * page_size:page * page_size]
+
+            yield event.plain_result(f"正在生成商店看板（第 {page}/{total_pages} 页，{len(page_members)} 人）...")
+            image_bytes, failed = await self._render_shop_board(page_members)
+        except Exception as e:
+            logger.error(f"商店看板处理失败: {e}")
+            yield event.plain_result("商店看板生成失败，请稍后重试")
+            return
+
+        notes = []
+        if failed:
+            notes.append("未能显示：" + "、".join(failed))
+        if page < total_pages:
+            notes.append(f"共 {total_pages} 页，查看下一页：/商店看板 {page + 1}")
+
+        if image_bytes:
+            if self._is_kook_platform(event):
+                success, error_msg = await self._send_image_for_kook(event, image_bytes, "board.jpg")
+                if not success:
+                    logger.error(f"Kook平台看板图片发送失败: {error_msg}")
+                    notes.insert(0, f"看板图片发送失败: {error_msg}")
+            else:
+                yield event.chain_result([Image.fromBytes(image_bytes)])
+        else:
+            notes.insert(0, "本页成员的商店均获取失败")
+        if notes:
+            yield event.plain_result("\n".join(notes))
 
     @filter.command("\u74e6")
     async def bind_wallet_command(self, event: AstrMessageEvent):
@@ -2077,10 +4135,7 @@ class ValorantShopPlugin(Star):
 
         clear_aliases = {"清除", "清空", "解绑", "clear", "reset", "remove", "delete"}
         if raw_arg and (raw_arg in clear_aliases or raw_arg_lower in clear_aliases):
-            for task in self.wechat_login_tasks.get(user_id, []):
-                if not task.done():
-                    task.cancel()
-            self.wechat_login_tasks.pop(user_id, None)
+            self._cancel_login_session(user_id)
 
             cleared = await self.clear_user_config(user_id)
             if cleared:
@@ -2135,7 +4190,7 @@ class ValorantShopPlugin(Star):
         if not user_id:
             user_id = str(event.message_obj.sender.user_id)
         
-        url = "https://open.weixin.qq.com/connect/sdk/qrconnect?f=json"
+        url = f"{self.WECHAT_QRCONNECT_URL}?f=json"
         
         # 动态生成参数。签名是对特定参数进行 SHA1 散列
         import time
@@ -2145,15 +4200,17 @@ class ValorantShopPlugin(Star):
         timestamp = str(int(time.time()))
         noncestr = ''.join(random.choices(string.ascii_letters + string.digits, k=6))
 
-        # 如果之前因为报错产生了旧的 task，也先清理一下，保持逻辑干净
-        for task in self.wechat_login_tasks.get(user_id, []):
-            if not task.done():
-                task.cancel()
+        # 登记登录会话，同一用户旧的登录（含 QQ）会被取消
+        login_token, limit_msg = self._begin_login_session(user_id, "wx")
+        if not login_token:
+            yield event.plain_result(limit_msg)
+            return
 
+        wechat_task: Optional[asyncio.Task] = None
         try:
             async with aiohttp.ClientSession() as session:
                 # 1. 向 app.mval.qq.com 请求 get_sdk_ticket 获取 sdk_ticket
-                ticket_url = "https://app.mval.qq.com/go/auth/get_sdk_ticket"
+                ticket_url = self.MVAL_SDK_TICKET_URL
                 ticket_payload = {
                     "clienttype": 9,
                     "config_params": {"client_dev_name": "22041216C", "lang_type": 0},
@@ -2229,10 +4286,14 @@ class ValorantShopPlugin(Star):
 
             # 生成新的 task 等待微信登录
             wechat_task = asyncio.create_task(self._val_wechat_login_task(user_id, uuid))
-            self.wechat_login_tasks.setdefault(user_id, []).append(wechat_task)
+            self._attach_login_task(user_id, login_token, wechat_task)
 
-            # 等待登录结果
-            result = await wechat_task
+            # 等待登录结果；被取消（/瓦 清除 或重新登录）时静默结束
+            await asyncio.wait({wechat_task})
+            if wechat_task.cancelled():
+                logger.info(f"用户 {user_id} 的微信登录已被取消")
+                return
+            result = wechat_task.result()
 
             if result and result.get("userId") and result.get("tid"):
                 # 登录成功，保存用户配置
@@ -2246,11 +4307,13 @@ class ValorantShopPlugin(Star):
             else:
                 yield event.plain_result("登录失败或已过期，请重新使用 /瓦 wx 获取二维码")
 
-        except asyncio.CancelledError:
-            pass
         except Exception as e:
             logger.error(f"微信登录异常: {e}")
             yield event.plain_result("登录过程中发生错误，请重试")
+        finally:
+            if wechat_task and not wechat_task.done():
+                wechat_task.cancel()
+            self._end_login_session(user_id, login_token)
 
     async def _val_wechat_login_task(self, user_id: str, uuid: str) -> Optional[Dict]:
         """微信登录任务，轮询获取登录结果。"""
@@ -2263,38 +4326,44 @@ class ValorantShopPlugin(Star):
                     "Accept": "*/*"
                 }
 
-                # 1. 轮询检查是否扫码
+                # 1. 长轮询检查是否扫码：服务端会挂起请求直到状态变化或超时，
+                #    因此不在客户端额外 sleep，状态一变化就立即发起下一次长轮询
                 wx_code = None
                 last_code = None
-                for _ in range(30):
-                    await asyncio.sleep(2)
-                    
-                    poll_url = f"https://long.open.weixin.qq.com/connect/l/qrconnect?f=json&uuid={uuid}"
+                deadline = time.monotonic() + self.WECHAT_LOGIN_TIMEOUT
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        logger.info("微信扫码等待超时")
+                        return None
+
+                    poll_url = f"{self.WECHAT_LONG_POLL_URL}?f=json&uuid={uuid}"
                     if last_code is not None:
                         poll_url += f"&last={last_code}"
                     
+                    poll_started = time.monotonic()
+                    poll_timeout = aiohttp.ClientTimeout(
+                        total=min(self.WECHAT_LONG_POLL_REQUEST_TIMEOUT, remaining)
+                    )
                     # 抓包显示轮询使用的是 GET 而不是 POST，且数据放在 query params
-                    async with session.get(poll_url, headers=headers) as resp:
+                    try:
+                        resp = await session.get(poll_url, headers=headers, timeout=poll_timeout)
+                    except asyncio.TimeoutError:
+                        # 单次长轮询被挂起到超时，直接进入下一轮
+                        continue
+                    async with resp:
                         try:
                             if resp.status == 200:
                                 resp_text = await resp.text()
-                                try:
-                                    result = await resp.json(content_type=None)
-                                except:
-                                    import json
-                                    # 微信长轮询可能会返回 "window.wx_errcode=408;" 格式，需要解析
-                                    if "window.wx_errcode" in resp_text:
-                                        import re
-                                        errcode_match = re.search(r"wx_errcode=(\d+)", resp_text)
-                                        code_match = re.search(r"wx_code='([^']+)'", resp_text)
-                                        result = {
-                                            "wx_errcode": int(errcode_match.group(1)) if errcode_match else 408,
-                                            "wx_code": code_match.group(1) if code_match else ""
-                                        }
-                                    else:
-                                        result = json.loads(resp_text)
-                                    
+                                # 微信长轮询可能返回 JSON，也可能返回 "window.wx_errcode=408;" 格式
+                                result = parse_wx_poll_body(resp_text)
+
                                 wx_errcode = result.get("wx_errcode")
+                                if wx_errcode == last_code:
+                                    # 服务端未挂起而是立即返回了相同状态，补足最小间隔避免空转
+                                    elapsed = time.monotonic() - poll_started
+                                    if elapsed < self.WECHAT_LONG_POLL_MIN_INTERVAL:
+                                        await asyncio.sleep(self.WECHAT_LONG_POLL_MIN_INTERVAL - elapsed)
                                 last_code = wx_errcode
                                 
                                 if wx_errcode in [0, 405] and result.get("wx_code"):
@@ -2313,6 +4382,11 @@ class ValorantShopPlugin(Star):
                                 else:
                                     logger.info(f"扫码异常状态: {wx_errcode}")
                                     return None
+                            else:
+                                logger.warning(f"微信长轮询HTTP状态异常: {resp.status}")
+                                await asyncio.sleep(self.WECHAT_LONG_POLL_MIN_INTERVAL)
+                        except asyncio.TimeoutError:
+                            continue
                         except Exception as e:
                             logger.error(f"解析微信扫码状态失败: {e}")
                             return None
@@ -2322,7 +4396,7 @@ class ValorantShopPlugin(Star):
                     
                 # aiohttp session already open at the top of the function
                 # 换取最终凭证 (直接使用 login_by_wechat)
-                login_url = "https://app.mval.qq.com/go/auth/login_by_wechat"
+                login_url = self.MVAL_WECHAT_LOGIN_URL
                 payload = {
                     "clienttype": 9,
                     "config_params": {
@@ -0,0 +1,184 @@
+"""商店监控的多模式匹配。
+
+监控词先做归一化（NFKC 全角转半角、大小写折叠、合并空白），再按空白拆成词元；
+所有词元编译进一个 Aho-Corasick 自动机，商品名只需扫描一遍即可得到命中的词元，
+监控词的全部词元都出现即视为命中，因此 "幻影 侦察力量" 与 "侦察力量 幻影" 等价。
+为兼容旧的匹配规则，商品名整体包含在监控词中（如监控词多写了 "皮肤"）时同样命中；
+这一规则通过监控词（去空白后）的单字与二元组倒排索引查找候选，只需校验少量监控词。
+本模块不依赖 AstrBot，payload 可为任意对象（如 user_id），便于跨用户共用一个匹配器。
+"""
+import unicodedata
+from collections import deque
+from typing import Dict, Generic, Iterable, List, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def normalize(text: str) -> str:
+    """归一化：NFKC（全角转半角）、大小写折叠、连续空白合并为一个空格。"""
+    return " ".join(unicodedata.normalize("NFKC", text or "").casefold().split())
+
+
+def tokenize(text: str) -> Tuple[str, ...]:
+    """归一化后按空白拆分，去重并保持顺序。"""
+    return tuple(dict.fromkeys(normalize(text).split()))
+
+
+def index_key(text: str) -> str:
+    """与词序无关的归一化键，用于倒排索引。"""
+    return " ".join(sorted(tokenize(text)))
+
+
+def compact(text: str) -> str:
+    """归一化并去掉空白，用于子串比较。"""
+    return normalize(text).replace(" ", "")
+
+
+def substring_grams(text: str) -> Set[str]:
+    """子串检索用的键：单字符文本为其本身，否则为全部相邻二元组。
+
+    a 是 b 的子串时，a 的每个键都出现在 b 的键（单字与二元组）中。
+    """
+    if len(text) == 1:
+        return {text}
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class AhoCorasick:
+    """多模式串匹配自动机，find 返回文本中出现过的模式下标集合。"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[int]] = [set()]
+        for idx, pattern in enumerate(patterns):
+            if pattern:
+                self._insert(pattern, idx)
+        self._build_fail_links()
+
+    def _insert(self, pattern: str, idx: int):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            state = nxt
+        self._output[state].add(idx)
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._output[nxt] |= self._output[self._fail[nxt]]
+
+    def find(self, text: str) -> Set[int]:
+        found: Set[int] = set()
+        state = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+
+class _Term(Generic[T]):
+    __slots__ = ("text", "compact", "token_ids", "payload")
+
+    def __init__(self, text: str, compact_text: str, token_ids: frozenset, payload: T):
+        self.text = text
+        self.compact = compact_text
+        self.token_ids = token_ids
+        self.payload = payload
+
+
+class WatchMatcher(Generic[T]):
+    """由一组 (监控词, payload) 编译而成的匹配器，编译后只读。"""
+
+    def __init__(self, terms: Iterable[Tuple[str, T]]):
+        token_index: Dict[str, int] = {}
+        self._terms: List[_Term] = []
+        # 词元下标 -> 含有该词元的监控词下标
+        self._token_terms: List[List[int]] = []
+        # 单字/二元组 -> 去空白后含有它的监控词下标，用于 "商品名包含在监控词中" 的查找
+        self._gram_terms: Dict[str, List[int]] = {}
+        for text, payload in terms:
+            tokens = tokenize(text)
+            if not tokens:
+                continue
+            ids = []
+            for token in tokens:
+                token_id = token_index.get(token)
+                if token_id is None:
+                    token_id = token_index[token] = len(token_index)
+                    self._token_terms.append([])
+                ids.append(token_id)
+            term_id = len(self._terms)
+            self._terms.append(_Term(text, "".join(tokens), frozenset(ids), payload))
+            for token_id in ids:
+                self._token_terms[token_id].append(term_id)
+            term_compact = self._terms[term_id].compact
+            grams = set(term_compact) | substring_grams(term_compact)
+            for gram in grams:
+                self._gram_terms.setdefault(gram, []).append(term_id)
+        self._automaton = AhoCorasick(token_index.keys())
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def match(self, goods_name: str) -> List[Tuple[str, T]]:
+        """返回命中该商品名的 (监控词原文, payload) 列表。"""
+        text = compact(goods_name)
+        if not text or not self._terms:
+            return []
+        found = self._automaton.find(text)
+        matched: List[Tuple[str, T]] = []
+        matched_ids: Set[int] = set()
+        for token_id in found:
+            for term_id in self._token_terms[token_id]:
+                if term_id in matched_ids:
+                    continue
+                term = self._terms[term_id]
+                if term.token_ids <= found:
+                    matched_ids.add(term_id)
+                    matched.append((term.text, term.payload))
+        # 兼容：商品名整体出现在监控词里（监控词比商品名更长）
+        for term_id in self._containing_terms(text):
+            if term_id not in matched_ids:
+                term = self._terms[term_id]
+                matched.append((term.text, term.payload))
+        return matched
+
+    def _containing_terms(self, text: str) -> List[int]:
+        """去空白后比 text 更长且包含 text 的监控词下标。
+
+        只校验 text 的各个键中倒排列表最短的那一个，无需遍历全部监控词。
+        """
+        candidates: Optional[List[int]] = None
+        for gram in substring_grams(text):
+            postings = self._gram_terms.get(gram)
+            if postings is None:
+                return []
+            if candidates is None or len(postings) < len(candidates):
+                candidates = postings
+        terms = self._terms
+        return [
+            term_id for term_id in candidates or ()
+            if len(terms[term_id].compact) > len(text) and text in terms[term_id].compact
+        ]
+
+    def first_match(self, goods_name: str) -> Optional[Tuple[str, T]]:
+        matched = self.match(goods_name)
+        return matched[0] if matched else None
@@ -0,0 +1,231 @@
+"""插件内置的轻量指标：计数器、仪表与延迟直方图。
+
+只在进程内保存数据，通过 /商店监控 状态 查看摘要，或导出为 Prometheus 文本格式。
+不依赖 AstrBot，可在工具脚本中单独使用。
+"""
+import functools
+import math
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+# 延迟直方图默认分桶（秒），覆盖本地渲染到慢速上游请求
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 每个标签组合保留的最近样本数，用于计算分位数
+DEFAULT_SAMPLE_WINDOW = 1024
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key)
+    if extra:
+        items.append(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in items) + "}"
+
+
+def _format_le(bound: float) -> str:
+    return "+Inf" if math.isinf(bound) else repr(float(bound))
+
+
+class _HistogramSeries:
+    __slots__ = ("bucket_counts", "count", "total", "samples")
+
+    def __init__(self, bucket_count: int, window: int):
+        self.bucket_counts = [0] * bucket_count
+        self.count = 0
+        self.total = 0.0
+        self.samples: Deque[float] = deque(maxlen=window)
+
+
+class Histogram:
+    """累计分桶直方图，另保留最近样本用于 p50/p90/p99。"""
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS, window: int = DEFAULT_SAMPLE_WINDOW):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.window = window
+        self._series: Dict[LabelKey, _HistogramSeries] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _HistogramSeries(len(self.buckets), self.window)
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                series.bucket_counts[idx] += 1
+                break
+        series.count += 1
+        series.total += value
+        series.samples.append(value)
+
+    def percentiles(self, key: LabelKey, quantiles=(0.5, 0.9, 0.99)) -> Dict[float, float]:
+        series = self._series.get(key)
+        if not series or not series.samples:
+            return {}
+        ordered = sorted(series.samples)
+        result = {}
+        for q in quantiles:
+            idx = max(0, math.ceil(q * len(ordered)) - 1)
+            result[q] = ordered[idx]
+        return result
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series.bucket_counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_le(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series.total}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series.count}")
+        return lines
+
+    def summary(self) -> List[str]:
+        lines = []
+        for key, series in sorted(self._series.items()):
+            if not series.count:
+                continue
+            pct = self.percentiles(key)
+            label_text = ",".join(f"{k}={v}" for k, v in key)
+            lines.append(
+                f"{self.name}{'[' + label_text + ']' if label_text else ''}: "
+                f"n={series.count} avg={series.total / series.count * 1000:.0f}ms "
+                f"p50={pct.get(0.5, 0) * 1000:.0f}ms p90={pct.get(0.9, 0) * 1000:.0f}ms "
+                f"p99={pct.get(0.99, 0) * 1000:.0f}ms"
+            )
+        return lines
+
+
+class Counter:
+    """单调递增计数器。"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+    def summary(self) -> List[str]:
+        return [
+            f"{self.name}{'[' + ','.join(f'{k}={v}' for k, v in key) + ']' if key else ''}: {value:g}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge:
+    """瞬时值；可设置回调，在导出时读取当前值。"""
+
+    def __init__(self, name: str, help_text: str, callback: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels):
+        self._values[_label_key(labels)] = value
+
+    def _current(self) -> Dict[LabelKey, float]:
+        if self.callback is None:
+            return self._values
+        try:
+            return {(): float(self.callback())}
+        except Exception:
+            return {}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for key, value in sorted(self._current().items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+    def summary(self) -> List[str]:
+        return [f"{self.name}: {value:g}" for _, value in sorted(self._current().items())]
+
+
+class MetricsRegistry:
+    """按名称登记指标，统一导出。"""
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._metrics: Dict[str, Any] = {}
+
+    def _full_name(self, name: str) -> str:
+        return f"{self.prefix}_{name}" if self.prefix else name
+
+    def histogram(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = Histogram(self._full_name(name), help_text, buckets)
+        return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = Counter(self._full_name(name), help_text)
+        return metric
+
+    def gauge(self, name: str, help_text: str, callback: Optional[Callable[[], float]] = None) -> Gauge:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = Gauge(self._full_name(name), help_text, callback)
+        return metric
+
+    def observe(self, name: str, value: float, **labels):
+        self._metrics[name].observe(value, **labels)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        self._metrics[name].inc(amount, **labels)
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].summary())
+        return "\n".join(lines)
+
+
+def timed(metric: str, is_ok: Callable[[Any], bool] = bool):
+    """为异步方法记录耗时，标签 status 为 ok/fail/error。
+
+    被装饰方法所在对象需有 metrics 属性（MetricsRegistry），is_ok 根据返回值判断是否成功。
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            started = time.perf_counter()
+            status = "error"
+            try:
+                result = await func(self, *args, **kwargs)
+                status = "ok" if is_ok(result) else "fail"
+                return result
+            finally:
+                self.metrics.observe(metric, time.perf_counter() - started, status=status)
+        return wrapper
+    return decorator
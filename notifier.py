@@ -0,0 +1,174 @@
+"""监控通知的异步投递：按平台排队限速，失败后退避重试。
+
+通知提交后立即返回，每日监控拉取商店与发送通知互不阻塞。每个平台（会话 ID 中第一段，
+即机器人实例 ID）一个队列和一个 worker，按令牌桶限速；发送失败或抛异常时按指数退避
+重新入队，不阻塞同平台的后续通知，超过重试次数后放弃。
+本模块不依赖 AstrBot，实际发送由构造时传入的 send 协程完成。
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger("astrbot.val_shop")
+
+SendFunc = Callable[[str, str], Awaitable[Any]]
+ResultCallback = Callable[["Notification"], Awaitable[None]]
+
+
+class Notification:
+    """一条待发送的通知；payload 由调用方自定义，在回调中原样返回。"""
+
+    __slots__ = ("session_id", "text", "payload", "attempts")
+
+    def __init__(self, session_id: str, text: str, payload: Any = None):
+        self.session_id = session_id
+        self.text = text
+        self.payload = payload
+        self.attempts = 0
+
+
+class RateLimiter:
+    """令牌桶，rate 为每秒可发送条数，burst 为桶容量。"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = max(rate, 0.001)
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def platform_of(session_id: str) -> str:
+    """会话 ID 形如 "{bot_id}:FriendMessage:{user_id}"，取第一段作为平台。"""
+    head, sep, _ = session_id.partition(":")
+    return head if sep and head else "default"
+
+
+class NotificationDispatcher:
+    """按平台限速的通知队列。"""
+
+    def __init__(
+        self,
+        send: SendFunc,
+        rate_limits: Optional[Dict[str, float]] = None,
+        default_rate: float = 1.0,
+        max_retries: int = 3,
+        base_backoff: float = 2.0,
+        on_delivered: Optional[ResultCallback] = None,
+        on_failed: Optional[ResultCallback] = None,
+    ):
+        self._send = send
+        self.rate_limits = dict(rate_limits or {})
+        self.default_rate = default_rate
+        self.max_retries = max(0, max_retries)
+        self.base_backoff = base_backoff
+        self._on_delivered = on_delivered
+        self._on_failed = on_failed
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._retry_tasks: Set[asyncio.Task] = set()
+        self._delivering = 0
+        self._closed = False
+
+    def pending(self) -> int:
+        """排队、发送中与等待重试的通知数。"""
+        return sum(q.qsize() for q in self._queues.values()) + len(self._retry_tasks) + self._delivering
+
+    def submit(self, notification: Notification):
+        if self._closed:
+            raise RuntimeError("通知队列已关闭")
+        platform = platform_of(notification.session_id)
+        queue = self._queues.get(platform)
+        if queue is None:
+            queue = self._queues[platform] = asyncio.Queue()
+        worker = self._workers.get(platform)
+        if worker is None or worker.done():
+            rate = self.rate_limits.get(platform, self.default_rate)
+            self._workers[platform] = asyncio.create_task(self._worker(platform, queue, RateLimiter(rate)))
+        queue.put_nowait(notification)
+
+    async def _worker(self, platform: str, queue: asyncio.Queue, limiter: RateLimiter):
+        while True:
+            notification = await queue.get()
+            self._delivering += 1
+            try:
+                await limiter.acquire()
+                await self._deliver(notification)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"通知投递异常（平台 {platform}）: {e}")
+            finally:
+                self._delivering -= 1
+                queue.task_done()
+
+    async def _deliver(self, notification: Notification):
+        notification.attempts += 1
+        error = ""
+        try:
+            # AstrBot 的 send_message 找不到平台时返回 False
+            ok = await self._send(notification.session_id, notification.text) is not False
+        except Exception as e:
+            ok = False
+            error = str(e)
+
+        if ok:
+            if self._on_delivered:
+                await self._on_delivered(notification)
+            return
+
+        if notification.attempts <= self.max_retries:
+            delay = self.base_backoff * (2 ** (notification.attempts - 1)) * random.uniform(0.8, 1.2)
+            logger.warning(
+                f"通知发送失败，{delay:.1f}s 后第 {notification.attempts} 次重试: "
+                f"{notification.session_id} {error}"
+            )
+            task = asyncio.create_task(self._resubmit_later(notification, delay))
+            self._retry_tasks.add(task)
+            task.add_done_callback(self._retry_tasks.discard)
+            return
+
+        logger.error(f"通知发送失败，已放弃: {notification.session_id} {error}")
+        if self._on_failed:
+            await self._on_failed(notification)
+
+    async def _resubmit_later(self, notification: Notification, delay: float):
+        await asyncio.sleep(delay)
+        if not self._closed:
+            self.submit(notification)
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """等待队列与重试全部完成，超时返回 False。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    async def close(self, timeout: float = 5.0):
+        """尽量发完剩余通知后停止所有 worker。"""
+        if self._closed:
+            return
+        await self.drain(timeout)
+        self._closed = True
+        tasks = list(self._workers.values()) + list(self._retry_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers.clear()
+        self._retry_tasks.clear()
+        left = sum(q.qsize() for q in self._queues.values())
+        if left:
+            logger.warning(f"通知队列关闭时仍有 {left} 条未发送")
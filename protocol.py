@@ -0,0 +1,242 @@
+"""QQ / 微信扫码登录协议的响应解析。
+
+所有正则在模块加载时预编译；_Callback({...}) 与微信长轮询的 JSON 响应直接切片/
+json.loads，其余情况先用子串判断跳过不可能命中的正则，再回退到完整匹配。
+本模块不依赖 AstrBot，可单独导入做基准测试（见 tools/bench_protocol.py）。
+"""
+import json
+import logging
+import re
+import urllib.parse
+from collections import deque
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("astrbot.val_shop")
+
+DEFAULT_JSVER = "28d22679"
+
+_PTUI_CB_RE = re.compile(r"ptuiCB\('([^']*)','([^']*)','([^']*)','([^']*)','([^']*)'")
+_LOGIN_SIG_RE = re.compile(r"g_login_sig=encodeURIComponent\(\"([^\"]+)\"\)")
+_JSVER_RES = (
+    re.compile(r"/monorepo/([0-9A-Za-z]+)/ptlogin/js/login_10\.js"),
+    re.compile(r"/monorepo/([0-9A-Za-z]+)/ptlogin/js/"),
+    re.compile(r"https://qq-web\.cdn-go\.cn/monorepo/([0-9A-Za-z]+)"),
+)
+_CALLBACK_JSON_RE = re.compile(r"_Callback\s*\(\s*(\{.*?\})\s*\)\s*;?\s*$", re.DOTALL)
+_AUTH_URL_RE = re.compile(r"(auth://tauth\.qq\.com/[^\s\"'<>]+)")
+# 按优先级排列：先匹配到的模式优先，与出现位置无关
+_BODY_URL_RES = (
+    re.compile(r"ptuiCB\('[^']*','[^']*','([^']+)'", re.IGNORECASE),
+    re.compile(r"ptui_auth_CB\('[^']*','[^']*','([^']+)'", re.IGNORECASE),
+    re.compile(r"location\.href\s*=\s*['\"]([^'\"]+)['\"]", re.IGNORECASE),
+    re.compile(r"location\.replace\(\s*['\"]([^'\"]+)['\"]\s*\)", re.IGNORECASE),
+    re.compile(r"window\.location\s*=\s*['\"]([^'\"]+)['\"]", re.IGNORECASE),
+    re.compile(r"(auth://tauth\.qq\.com/[^\s\"'<>]+)", re.IGNORECASE),
+    re.compile(r"(https?://imgcache\.qq\.com/[^\s\"'<>]+)", re.IGNORECASE),
+)
+_WX_ERRCODE_RE = re.compile(r"wx_errcode=(\d+)")
+_WX_CODE_RE = re.compile(r"wx_code='([^']+)'")
+
+# 成功回调 URL 中可能继续嵌套跳转地址的参数名
+_NESTED_URL_KEYS = (
+    "u1",
+    "url",
+    "jump_url",
+    "redirect_uri",
+    "redirect_url",
+    "target_url",
+    "s_url",
+    "f_url",
+    "qtarget",
+    "jump",
+    "ru",
+)
+
+
+def normalize_escaped_url(url: str) -> str:
+    """还原 JS 转义的 URL（\\/ 与 \\x26）。"""
+    url = url or ""
+    if "\\" in url:
+        url = url.replace("\\/", "/").replace("\\x26", "&")
+    return url.strip()
+
+
+def parse_param_str(raw: str) -> Dict[str, str]:
+    """解析 query/fragment 形式的参数串，只保留每个键的第一个值。"""
+    parsed: Dict[str, str] = {}
+    if not raw:
+        return parsed
+    part = raw.replace("#&", "&").lstrip("&")
+    for key, value in urllib.parse.parse_qs(part, keep_blank_values=True).items():
+        if value:
+            parsed[key] = value[0]
+    return parsed
+
+
+def parse_ptui_callback(text: str) -> Optional[Dict[str, str]]:
+    """解析 ptqrlogin 返回的 ptuiCB(...)。"""
+    match = _PTUI_CB_RE.search(text or "")
+    if not match:
+        return None
+    return {
+        "code": match.group(1),
+        "redirect_url": normalize_escaped_url(match.group(3)),
+        "message": match.group(5),
+    }
+
+
+def extract_login_sig(login_page: str) -> str:
+    """从 xlogin HTML 中提取 g_login_sig。"""
+    match = _LOGIN_SIG_RE.search(login_page or "")
+    return match.group(1) if match else ""
+
+
+def extract_jsver(login_page: str) -> str:
+    """从 xlogin HTML 中提取 jsver（monorepo 版本号）。"""
+    text = login_page or ""
+    if "/monorepo/" not in text:
+        return DEFAULT_JSVER
+    for pattern in _JSVER_RES:
+        m = pattern.search(text)
+        if m:
+            return m.group(1)
+    return DEFAULT_JSVER
+
+
+def extract_auth_url_from_callback_body(text: str) -> str:
+    """从 _Callback({...}) 文本里提取 auth:// URL。"""
+    if not text:
+        return ""
+
+    payload_text = ""
+    stripped = text.strip()
+    if stripped.startswith("_Callback"):
+        # 快速路径：整段就是 _Callback({...});
+        left = stripped.find("{")
+        right = stripped.rfind("}")
+        if 0 <= left < right:
+            payload_text = stripped[left:right + 1]
+    else:
+        callback_match = _CALLBACK_JSON_RE.search(text)
+        if callback_match:
+            payload_text = callback_match.group(1)
+
+    if payload_text:
+        try:
+            payload = json.loads(payload_text)
+            callback_url = str(payload.get("url", "") or "").strip()
+            if callback_url.startswith("auth://"):
+                return callback_url
+        except Exception as e:
+            logger.warning(
+                f"[HTTP登录] 解析_Callback JSON失败: type={type(e).__name__}, repr={repr(e)}"
+            )
+
+    if "auth://" not in text:
+        return ""
+    auth_match = _AUTH_URL_RE.search(text)
+    if auth_match:
+        return auth_match.group(1)
+    return ""
+
+
+def extract_url_from_body(body: str) -> str:
+    """从响应正文中提取跳转 URL。"""
+    text = normalize_escaped_url(body)
+    for pattern in _BODY_URL_RES:
+        match = pattern.search(text)
+        if match:
+            return match.group(1).strip()
+    return ""
+
+
+def parse_wx_poll_body(text: str) -> Dict[str, Any]:
+    """解析微信长轮询响应，兼容 JSON 与 window.wx_errcode=...; 两种格式。"""
+    body = (text or "").strip()
+    if body.startswith("{"):
+        return json.loads(body)
+    if "wx_errcode" in body:
+        errcode_match = _WX_ERRCODE_RE.search(body)
+        code_match = _WX_CODE_RE.search(body)
+        return {
+            "wx_errcode": int(errcode_match.group(1)) if errcode_match else 408,
+            "wx_code": code_match.group(1) if code_match else "",
+        }
+    return json.loads(body)
+
+
+def _fully_unquote(value: str, max_rounds: int = 3) -> str:
+    """最多解码 max_rounds 次百分号编码，没有 % 时直接返回。"""
+    decoded = value
+    for _ in range(max_rounds):
+        if "%" not in decoded:
+            break
+        next_decoded = urllib.parse.unquote(decoded)
+        if next_decoded == decoded:
+            break
+        decoded = next_decoded
+    return decoded
+
+
+def _params_from_url(decoded: str) -> Dict[str, str]:
+    parsed_url = urllib.parse.urlparse(decoded)
+    params: Dict[str, str] = {}
+    for raw_part in (parsed_url.query, parsed_url.fragment):
+        params.update(parse_param_str(raw_part))
+    if not params and ("openid=" in decoded or "access_token=" in decoded):
+        params.update(parse_param_str(decoded))
+    return params
+
+
+def extract_login_data_from_success_url(success_url: str) -> Dict[str, Any]:
+    """从登录成功回调 URL（含多层嵌套跳转）中提取 openid/access_token 等参数。"""
+    merged_params: Dict[str, str] = {}
+    queue = deque([normalize_escaped_url(success_url)])
+    visited = set()
+
+    while queue:
+        candidate = queue.popleft()
+        if not candidate or candidate in visited:
+            continue
+        visited.add(candidate)
+
+        decoded = _fully_unquote(candidate)
+        candidate_params = _params_from_url(decoded)
+
+        if candidate_params and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "[HTTP登录] 参数提取：来源=%s，命中键=%s", decoded[:180], sorted(candidate_params.keys())
+            )
+        for key, value in candidate_params.items():
+            if key not in merged_params:
+                merged_params[key] = value
+
+        # 快速路径：已拿到 openid 与 access_token 时不再展开嵌套跳转
+        if merged_params.get("openid") and merged_params.get("access_token"):
+            break
+
+        for nested_key in _NESTED_URL_KEYS:
+            nested_value = candidate_params.get(nested_key, "")
+            if nested_value and nested_value not in visited:
+                logger.debug("[HTTP登录] 发现嵌套跳转参数 %s=%s", nested_key, str(nested_value)[:220])
+                queue.append(normalize_escaped_url(nested_value))
+
+    logger.info(
+        "[HTTP登录] 汇总参数键=%s, openid=%s, access_token=%s",
+        sorted(merged_params.keys()),
+        bool(merged_params.get("openid")),
+        bool(merged_params.get("access_token")),
+    )
+    return {
+        "openid": merged_params.get("openid", ""),
+        "appid": merged_params.get("appid", ""),
+        "access_token": merged_params.get("access_token", ""),
+        "pay_token": merged_params.get("pay_token", ""),
+        "key": merged_params.get("key", ""),
+        "redirect_uri_key": merged_params.get("redirect_uri_key", ""),
+        "expires_in": merged_params.get("expires_in", "7776000"),
+        "pf": merged_params.get("pf", "openmobile_android"),
+        "status_os": merged_params.get("status_os", "12"),
+        "status_machine": merged_params.get("status_machine", ""),
+        "full_params": merged_params,
+    }
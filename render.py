@@ -0,0 +1,129 @@
+"""每日商店图片的渲染：单个商品卡片合成、竖向拼接与 JPEG 编码。
+
+只处理内存中的图片字节，不涉及网络与 AstrBot，可单独导入做基准测试
+（见 tools/bench_render.py）。
+"""
+import io
+import logging
+import math
+from functools import lru_cache
+from typing import Sequence
+
+from PIL import Image as PILImage, ImageDraw, ImageFont
+
+logger = logging.getLogger("astrbot.val_shop")
+
+# 商品图缩放后的高度（像素）
+GOODS_IMAGE_HEIGHT = 180
+# 卡片之间的间距（像素）
+CARD_GAP = 20
+FONT_SIZE = 36
+TEXT_MARGIN = 36
+TEXT_BOTTOM_OFFSET = 50
+TEXT_COLOR = (255, 255, 255)
+
+# 商店看板：每个成员一个面板，缩放到固定宽度后按网格排列
+BOARD_COLUMNS = 3
+BOARD_PANEL_WIDTH = 480
+BOARD_HEADER_HEIGHT = 48
+BOARD_TITLE_FONT_SIZE = 28
+BOARD_BACKGROUND = (24, 26, 33)
+
+
+@lru_cache(maxsize=4)
+def load_font(font_path: str, size: int = FONT_SIZE):
+    """加载字体并缓存，加载失败时回退到 Pillow 默认字体。"""
+    try:
+        return ImageFont.truetype(font_path, size)
+    except IOError:
+        logger.warning("字体加载失败，改用默认字体")
+        return ImageFont.load_default()
+
+
+def render_goods_card(bg_bytes: bytes, goods_bytes: bytes, name: str, price: str, font) -> PILImage.Image:
+    """将商品图居中贴到背景图上，并在底部绘制名称（左）与价格（右）。"""
+    img1 = PILImage.open(io.BytesIO(bg_bytes))
+    img2 = PILImage.open(io.BytesIO(goods_bytes))
+
+    # 调整商品图尺寸
+    height = GOODS_IMAGE_HEIGHT
+    width = int((img2.width * height) / img2.height)
+    img2_resized = img2.resize((width, height))
+
+    # 计算居中粘贴位置
+    x = (img1.width - img2_resized.width) // 2
+    y = (img1.height - img2_resized.height) // 2
+
+    card = PILImage.new('RGB', img1.size)
+    card.paste(img1, (0, 0))
+
+    # 粘贴商品图（支持透明通道）
+    if img2_resized.mode in ('RGBA', 'LA'):
+        card.paste(img2_resized, (x, y), mask=img2_resized)
+    else:
+        card.paste(img2_resized, (x, y))
+
+    draw = ImageDraw.Draw(card)
+    text_y = card.height - TEXT_BOTTOM_OFFSET
+    draw.text((TEXT_MARGIN, text_y), name, fill=TEXT_COLOR, font=font)
+
+    price_bbox = draw.textbbox((0, 0), price, font=font)
+    price_width = price_bbox[2] - price_bbox[0]
+    draw.text((card.width - price_width - TEXT_MARGIN, text_y), price, fill=TEXT_COLOR, font=font)
+    return card
+
+
+def merge_cards(cards: Sequence[PILImage.Image], gap: int = CARD_GAP) -> PILImage.Image:
+    """将卡片按顺序竖向拼接，白色背景，卡片间留 gap 像素。"""
+    max_width = max(card.width for card in cards)
+    total_height = sum(card.height for card in cards) + (len(cards) - 1) * gap
+
+    merged = PILImage.new('RGB', (max_width, total_height), color='white')
+    y_offset = 0
+    for card in cards:
+        merged.paste(card, (0, y_offset))
+        y_offset += card.height + gap
+    return merged
+
+
+def encode_jpeg(image: PILImage.Image) -> bytes:
+    """编码为 JPEG 字节，不落盘。"""
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def render_member_panel(cards: Sequence[PILImage.Image], title: str, font, width: int = BOARD_PANEL_WIDTH) -> PILImage.Image:
+    """看板中单个成员的面板：顶部标题，下方为竖向拼接并缩放到 width 宽的商品卡片。"""
+    stacked = merge_cards(cards)
+    height = max(1, int(stacked.height * width / stacked.width))
+    body = stacked.resize((width, height))
+
+    panel = PILImage.new('RGB', (width, BOARD_HEADER_HEIGHT + height), color=BOARD_BACKGROUND)
+    draw = ImageDraw.Draw(panel)
+    title_bbox = draw.textbbox((0, 0), title, font=font)
+    title_y = (BOARD_HEADER_HEIGHT - (title_bbox[3] - title_bbox[1])) // 2 - title_bbox[1]
+    draw.text((12, title_y), title, fill=TEXT_COLOR, font=font)
+    panel.paste(body, (0, BOARD_HEADER_HEIGHT))
+    return panel
+
+
+def compose_grid(panels: Sequence[PILImage.Image], columns: int = BOARD_COLUMNS, gap: int = CARD_GAP) -> PILImage.Image:
+    """将面板按行排列成网格，每行高度取该行最高的面板。"""
+    columns = max(1, min(columns, len(panels)))
+    rows = math.ceil(len(panels) / columns)
+    cell_width = max(panel.width for panel in panels)
+    row_heights = [
+        max(panel.height for panel in panels[row * columns:(row + 1) * columns])
+        for row in range(rows)
+    ]
+    width = columns * cell_width + (columns + 1) * gap
+    height = sum(row_heights) + (rows + 1) * gap
+
+    grid = PILImage.new('RGB', (width, height), color=BOARD_BACKGROUND)
+    y_offset = gap
+    for row in range(rows):
+        for col, panel in enumerate(panels[row * columns:(row + 1) * columns]):
+            grid.paste(panel, (gap + col * (cell_width + gap), y_offset))
+        y_offset += row_heights[row] + gap
+    return grid
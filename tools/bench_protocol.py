@@ -0,0 +1,81 @@
+"""登录协议解析的微基准测试。
+
+对 tools/fixtures/protocol 下录制格式的响应样本逐个调用 protocol.py 中的解析函数，
+输出每次调用的耗时（微秒），便于比较解析逻辑改动前后的开销。
+
+用法：
+    python tools/bench_protocol.py
+    python tools/bench_protocol.py --number 20000 --json bench_output.txt
+"""
+import argparse
+import json
+import logging
+import platform
+import sys
+import timeit
+from pathlib import Path
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures" / "protocol"
+sys.path.insert(0, str(PLUGIN_DIR))
+
+import protocol  # noqa: E402
+
+# (用例名, 解析函数, 样本文件)
+CASES = [
+    ("ptui_callback/waiting", protocol.parse_ptui_callback, "ptqrlogin_waiting.txt"),
+    ("ptui_callback/scanned", protocol.parse_ptui_callback, "ptqrlogin_scanned.txt"),
+    ("ptui_callback/success", protocol.parse_ptui_callback, "ptqrlogin_success.txt"),
+    ("login_sig/xlogin", protocol.extract_login_sig, "xlogin.html"),
+    ("jsver/xlogin", protocol.extract_jsver, "xlogin.html"),
+    ("auth_url/m_get_redirect_url", protocol.extract_auth_url_from_callback_body, "m_get_redirect_url.txt"),
+    ("body_url/ptqrlogin_success", protocol.extract_url_from_body, "ptqrlogin_success.txt"),
+    ("body_url/check_sig", protocol.extract_url_from_body, "check_sig.html"),
+    ("wx_poll/408", protocol.parse_wx_poll_body, "wx_poll_408.txt"),
+    ("wx_poll/405", protocol.parse_wx_poll_body, "wx_poll_405.txt"),
+    ("wx_poll/json", protocol.parse_wx_poll_body, "wx_poll_json.txt"),
+    ("login_data/encoded", protocol.extract_login_data_from_success_url, "success_url_encoded.txt"),
+    ("login_data/nested", protocol.extract_login_data_from_success_url, "success_url_nested.txt"),
+]
+
+
+def run(number: int, repeat: int) -> list:
+    results = []
+    for name, func, fixture in CASES:
+        sample = (FIXTURE_DIR / fixture).read_text(encoding="utf-8")
+        timings = timeit.repeat(lambda: func(sample), number=number, repeat=repeat)
+        best = min(timings) / number
+        results.append({
+            "case": name,
+            "fixture": fixture,
+            "number": number,
+            "best_us": round(best * 1e6, 3),
+            "mean_us": round(sum(timings) / len(timings) / number * 1e6, 3),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="登录协议解析微基准")
+    parser.add_argument("--number", type=int, default=5000, help="每轮调用次数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复轮数，取最优值")
+    parser.add_argument("--json", dest="json_path", default="", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    # 解析函数内的 INFO 日志不计入解析成本
+    logging.getLogger("astrbot.val_shop").setLevel(logging.WARNING)
+
+    results = run(args.number, args.repeat)
+    for item in results:
+        print(f"{item['case']:<32} best={item['best_us']:>9.3f}us  mean={item['mean_us']:>9.3f}us")
+
+    if args.json_path:
+        payload = {
+            "python": platform.python_version(),
+            "results": results,
+        }
+        Path(args.json_path).write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""商店图片渲染的离线基准测试。
+
+用本地生成的背景图/商品图与合成的商品列表驱动 render.py，不访问网络。对每个商品数量
+分别在独立子进程中运行，统计单卡合成耗时、拼接+编码耗时、整图耗时、峰值 RSS 与输出字节数，
+便于比较 Pillow 升级或布局调整前后的差异。
+
+用法：
+    python tools/bench_render.py
+    python tools/bench_render.py --counts 1,4,8,16 --iterations 10 --json bench_render.json
+"""
+import argparse
+import io
+import json
+import logging
+import multiprocessing
+import platform
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PLUGIN_DIR))
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 合成商品名使用的词表，覆盖中英文混排与较长名称
+_NAME_WORDS = ("侦察力量", "幻影", "暴徒", "冥驹", "离子", "Prime", "Reaver", "Oni", "光炫", "近战武器")
+
+
+def _make_background(width: int, height: int, seed: int) -> bytes:
+    from PIL import Image as PILImage, ImageDraw
+
+    rng = random.Random(seed)
+    image = PILImage.new("RGB", (width, height))
+    draw = ImageDraw.Draw(image)
+    base = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+    # 竖向渐变 + 噪点，避免纯色图被 JPEG 过度压缩
+    for y in range(height):
+        shade = int(80 * y / max(1, height - 1))
+        draw.line([(0, y), (width, y)], fill=tuple(min(255, c + shade) for c in base))
+    for _ in range(width * height // 50):
+        draw.point((rng.randrange(width), rng.randrange(height)), fill=(rng.randrange(256),) * 3)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _make_goods(width: int, height: int, seed: int) -> bytes:
+    from PIL import Image as PILImage, ImageDraw
+
+    rng = random.Random(seed)
+    image = PILImage.new("RGBA", (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    for _ in range(6):
+        x0, y0 = rng.randrange(width // 2), rng.randrange(height // 2)
+        x1, y1 = x0 + rng.randrange(width // 4, width // 2), y0 + rng.randrange(height // 4, height // 2)
+        draw.ellipse([x0, y0, x1, y1], fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256), 220))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def make_goods_list(count: int, seed: int = 0) -> list:
+    """生成与商店接口 goods_list 相同结构的合成数据。"""
+    rng = random.Random(seed)
+    goods_list = []
+    for idx in range(count):
+        name = " ".join(rng.sample(_NAME_WORDS, 2))
+        goods_list.append({
+            "goods_id": str(10000 + idx),
+            "goods_name": name,
+            "rmb_price": str(rng.choice((875, 1275, 1775, 2175, 2675))),
+            "bg_image": f"bench://bg/{idx}",
+            "goods_pic": f"bench://goods/{idx}",
+        })
+    return goods_list
+
+
+def _peak_rss_kb() -> int:
+    if resource is None:
+        return -1
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 返回字节，Linux 返回 KB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    idx = max(0, min(len(ordered) - 1, round(q * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def run_case(options: dict) -> dict:
+    """在子进程中执行单个商品数量的基准，返回统计结果。"""
+    import render
+
+    logging.getLogger("astrbot.val_shop").setLevel(logging.WARNING)
+
+    count = options["count"]
+    goods_list = make_goods_list(count, seed=options["seed"])
+    # 图片在计时前生成并编码为 PNG，与线上“下载得到字节”的输入一致
+    images = {}
+    for idx, goods in enumerate(goods_list):
+        images[goods["bg_image"]] = _make_background(options["bg_width"], options["bg_height"], options["seed"] + idx)
+        images[goods["goods_pic"]] = _make_goods(options["goods_width"], options["goods_height"], options["seed"] + idx)
+
+    font = render.load_font(options["font"])
+    rss_before = _peak_rss_kb()
+
+    card_times, merge_times, total_times = [], [], []
+    output_bytes = 0
+    for _ in range(options["warmup"] + options["iterations"]):
+        started = time.perf_counter()
+        cards = []
+        iteration_card_times = []
+        for goods in goods_list:
+            card_started = time.perf_counter()
+            cards.append(render.render_goods_card(
+                images[goods["bg_image"]],
+                images[goods["goods_pic"]],
+                goods["goods_name"],
+                goods["rmb_price"],
+                font,
+            ))
+            iteration_card_times.append(time.perf_counter() - card_started)
+        merge_started = time.perf_counter()
+        image_bytes = render.encode_jpeg(render.merge_cards(cards))
+        finished = time.perf_counter()
+
+        card_times.extend(iteration_card_times)
+        merge_times.append(finished - merge_started)
+        total_times.append(finished - started)
+        output_bytes = len(image_bytes)
+
+    # 丢弃预热轮次
+    warm_cards = options["warmup"] * count
+    card_times = card_times[warm_cards:]
+    merge_times = merge_times[options["warmup"]:]
+    total_times = total_times[options["warmup"]:]
+
+    return {
+        "items": count,
+        "iterations": options["iterations"],
+        "card_ms": {
+            "mean": _ms(statistics.mean(card_times)),
+            "p50": _ms(_percentile(card_times, 0.5)),
+            "p90": _ms(_percentile(card_times, 0.9)),
+            "max": _ms(max(card_times)),
+        },
+        "merge_encode_ms": {
+            "mean": _ms(statistics.mean(merge_times)),
+            "p50": _ms(_percentile(merge_times, 0.5)),
+            "max": _ms(max(merge_times)),
+        },
+        "total_ms": {
+            "mean": _ms(statistics.mean(total_times)),
+            "p50": _ms(_percentile(total_times, 0.5)),
+            "p90": _ms(_percentile(total_times, 0.9)),
+            "max": _ms(max(total_times)),
+        },
+        "peak_rss_kb": _peak_rss_kb(),
+        "peak_rss_delta_kb": _peak_rss_kb() - rss_before if rss_before >= 0 else -1,
+        "output_bytes": output_bytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="商店图片渲染离线基准")
+    parser.add_argument("--counts", default="1,4,8,16", help="商品数量列表，逗号分隔")
+    parser.add_argument("--iterations", type=int, default=10, help="每个数量的计时轮数")
+    parser.add_argument("--warmup", type=int, default=2, help="预热轮数，不计入统计")
+    parser.add_argument("--bg-size", default="1024x256", help="背景图尺寸，宽x高")
+    parser.add_argument("--goods-size", default="640x360", help="商品图尺寸，宽x高")
+    parser.add_argument("--font", default=str(PLUGIN_DIR / "fontFamily.ttf"), help="字体文件路径")
+    parser.add_argument("--seed", type=int, default=0, help="合成数据的随机种子")
+    parser.add_argument("--json", dest="json_path", default="", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    bg_width, bg_height = (int(v) for v in args.bg_size.lower().split("x"))
+    goods_width, goods_height = (int(v) for v in args.goods_size.lower().split("x"))
+    counts = [int(v) for v in args.counts.split(",") if v.strip()]
+
+    # 每个数量单独起一个子进程，保证峰值 RSS 互不影响
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for count in counts:
+        options = {
+            "count": count,
+            "iterations": max(1, args.iterations),
+            "warmup": max(0, args.warmup),
+            "bg_width": bg_width,
+            "bg_height": bg_height,
+            "goods_width": goods_width,
+            "goods_height": goods_height,
+            "font": args.font,
+            "seed": args.seed,
+        }
+        with ctx.Pool(1) as pool:
+            item = pool.apply(run_case, (options,))
+        results.append(item)
+        print(
+            f"items={item['items']:<3} card p50={item['card_ms']['p50']:>8.2f}ms  "
+            f"merge+encode p50={item['merge_encode_ms']['p50']:>8.2f}ms  "
+            f"total p50={item['total_ms']['p50']:>8.2f}ms p90={item['total_ms']['p90']:>8.2f}ms  "
+            f"rss={item['peak_rss_kb']}KB  out={item['output_bytes']}B"
+        )
+
+    if args.json_path:
+        import PIL
+
+        payload = {
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+            "bg_size": args.bg_size,
+            "goods_size": args.goods_size,
+            "results": results,
+        }
+        Path(args.json_path).write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
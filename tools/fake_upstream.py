@@ -0,0 +1,396 @@
+"""本地模拟上游服务，用于压测与联调，避免直接请求 app.mval.qq.com。
+
+模拟的接口（路径与线上一致，只需替换域名）：
+    POST /go/mlol_store/agame/user_store       商店接口
+    GET  /cdn/bg/{idx}.png, /cdn/goods/{idx}.png 商品背景图/商品图
+    GET  /ssl/ptqrshow, /ssl/ptqrlogin           QQ 扫码登录二维码与状态轮询
+    GET  /connect/sdk/qrconnect                  微信二维码
+    GET  /connect/l/qrconnect                    微信长轮询（服务端挂起直到状态变化）
+    POST /go/auth/get_sdk_ticket, /go/auth/login_by_qq, /go/auth/login_by_wechat
+    POST /api/v3/asset/create, /api/v3/message/create  Kook 上传与发送
+    GET  /__stats                                各接口请求数、注入错误数
+    POST /__reset                                清空统计与登录状态
+
+每个接口可单独注入延迟、抖动与错误率，格式为 名称=延迟ms[:抖动ms[:错误率]]，
+名称见 ROUTE_NAMES，"*" 表示默认值。
+
+用法：
+    python tools/fake_upstream.py --port 8765 --fault store=300:100:0.02 --fault image=30
+"""
+import argparse
+import asyncio
+import base64
+import io
+import random
+import secrets
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from aiohttp import web
+
+ROUTE_NAMES = (
+    "store",
+    "image",
+    "ptqrshow",
+    "ptqrlogin",
+    "wx_qrconnect",
+    "wx_poll",
+    "mval_auth",
+    "kook",
+)
+
+# 合成商品名，覆盖监控常用关键词
+_GOODS_NAMES = (
+    "侦察力量 幻影",
+    "离子 暴徒",
+    "Prime 鬼魅",
+    "Reaver 冥驹",
+    "Oni 幻影",
+    "光炫 近战武器",
+    "掠夺印象 狂徒",
+    "地狱火 判官",
+)
+_PRICES = ("875", "1275", "1775", "2175", "2675")
+
+
+@dataclass
+class Fault:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+
+    @classmethod
+    def parse(cls, raw: str) -> "Fault":
+        parts = [p for p in raw.split(":")]
+        values = [float(p) if p else 0.0 for p in parts] + [0.0] * (3 - len(parts))
+        return cls(latency_ms=values[0], jitter_ms=values[1], error_rate=values[2])
+
+    def delay(self, rng: random.Random) -> float:
+        jitter = rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+
+def parse_faults(specs) -> Dict[str, Fault]:
+    """解析 --fault 参数，返回 {接口名: Fault}。"""
+    faults: Dict[str, Fault] = {}
+    for spec in specs or ():
+        name, _, value = spec.partition("=")
+        name = name.strip()
+        if name != "*" and name not in ROUTE_NAMES:
+            raise ValueError(f"未知接口名: {name}，可选: {', '.join(ROUTE_NAMES)}")
+        faults[name] = Fault.parse(value.strip())
+    return faults
+
+
+def _make_png(width: int, height: int, seed: int, transparent: bool) -> bytes:
+    from PIL import Image as PILImage, ImageDraw
+
+    rng = random.Random(seed)
+    mode, background = ("RGBA", (0, 0, 0, 0)) if transparent else ("RGB", (rng.randrange(256),) * 3)
+    image = PILImage.new(mode, (width, height), background)
+    draw = ImageDraw.Draw(image)
+    for _ in range(5):
+        x0, y0 = rng.randrange(width // 2), rng.randrange(height // 2)
+        x1, y1 = x0 + rng.randrange(width // 4, width // 2), y0 + rng.randrange(height // 4, height // 2)
+        draw.ellipse([x0, y0, x1, y1], fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256), 255))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeUpstream:
+    """模拟上游的 aiohttp 应用，登录状态按时间推进。"""
+
+    def __init__(
+        self,
+        faults: Optional[Dict[str, Fault]] = None,
+        goods_count: int = 4,
+        auth_error_rate: float = 0.0,
+        qq_scan_after: float = 3.0,
+        qq_confirm_after: float = 1.0,
+        wx_scan_after: float = 3.0,
+        wx_confirm_after: float = 1.0,
+        wx_hold: float = 25.0,
+        seed: int = 0,
+    ):
+        self.faults = faults or {}
+        self.goods_count = goods_count
+        self.auth_error_rate = auth_error_rate
+        self.qq_scan_after = qq_scan_after
+        self.qq_confirm_after = qq_confirm_after
+        self.wx_scan_after = wx_scan_after
+        self.wx_confirm_after = wx_confirm_after
+        self.wx_hold = wx_hold
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.requests: Dict[str, int] = defaultdict(int)
+        self.injected_errors: Dict[str, int] = defaultdict(int)
+        # ptqrtoken/uuid -> 首次请求时间
+        self._qq_started: Dict[str, float] = {}
+        self._wx_started: Dict[str, float] = {}
+        self._images: Dict[str, bytes] = {}
+        self._qr_png: Optional[bytes] = None
+
+    def fault_for(self, name: str) -> Fault:
+        return self.faults.get(name) or self.faults.get("*") or Fault()
+
+    def reset(self):
+        self.requests.clear()
+        self.injected_errors.clear()
+        self._qq_started.clear()
+        self._wx_started.clear()
+
+    # ---- 应用装配 ----
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._fault_middleware])
+        app.router.add_post("/go/mlol_store/agame/user_store", self.handle_store, name="store")
+        app.router.add_get("/cdn/{kind:bg|goods}/{idx:\\d+}.png", self.handle_image, name="image")
+        app.router.add_get("/ssl/ptqrshow", self.handle_ptqrshow, name="ptqrshow")
+        app.router.add_get("/ssl/ptqrlogin", self.handle_ptqrlogin, name="ptqrlogin")
+        app.router.add_get("/connect/sdk/qrconnect", self.handle_wx_qrconnect, name="wx_qrconnect")
+        app.router.add_get("/connect/l/qrconnect", self.handle_wx_poll, name="wx_poll")
+        app.router.add_post("/go/auth/get_sdk_ticket", self.handle_sdk_ticket, name="mval_auth")
+        app.router.add_post("/go/auth/login_by_qq", self.handle_login_by_qq)
+        app.router.add_post("/go/auth/login_by_wechat", self.handle_login_by_wechat)
+        app.router.add_post("/api/v3/asset/create", self.handle_kook_asset, name="kook")
+        app.router.add_post("/api/v3/message/create", self.handle_kook_message)
+        app.router.add_get("/__stats", self.handle_stats)
+        app.router.add_post("/__reset", self.handle_reset)
+        return app
+
+    def _route_name(self, request: web.Request) -> str:
+        path = request.path
+        if path.startswith("/go/auth/"):
+            return "mval_auth"
+        if path.startswith("/api/v3/"):
+            return "kook"
+        route = request.match_info.route
+        return route.name or ""
+
+    @web.middleware
+    async def _fault_middleware(self, request: web.Request, handler):
+        name = self._route_name(request)
+        if not name:
+            return await handler(request)
+        self.requests[name] += 1
+        fault = self.fault_for(name)
+        delay = fault.delay(self.rng)
+        if delay:
+            await asyncio.sleep(delay)
+        if fault.error_rate and self.rng.random() < fault.error_rate:
+            self.injected_errors[name] += 1
+            return web.Response(status=502, text="injected upstream error")
+        return await handler(request)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> web.AppRunner:
+        """在当前事件循环中启动，返回 runner；port=0 时自动分配端口（见 bound_url）。"""
+        runner = web.AppRunner(self.build_app(), access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        return runner
+
+    @staticmethod
+    def bound_url(runner: web.AppRunner) -> str:
+        host, port = runner.addresses[0][:2]
+        return f"http://{host}:{port}"
+
+    # ---- 商店与图片 ----
+
+    def _base_url(self, request: web.Request) -> str:
+        return f"{request.scheme}://{request.host}"
+
+    async def handle_store(self, request: web.Request) -> web.Response:
+        if self.auth_error_rate and self.rng.random() < self.auth_error_rate:
+            self.injected_errors["store_auth"] += 1
+            return web.json_response({"result": 1001, "errMsg": "ticket expire"})
+        cookie = request.headers.get("Cookie", "")
+        # 同一 userId 当天商品固定，不同用户之间不同
+        user_key = next((p.split("=", 1)[1] for p in cookie.split("; ") if p.startswith("userId=")), "")
+        rng = random.Random(f"{self.seed}:{user_key}:{time.strftime('%Y-%m-%d')}")
+        base = self._base_url(request)
+        goods = []
+        for slot, name in enumerate(rng.sample(_GOODS_NAMES, min(self.goods_count, len(_GOODS_NAMES)))):
+            idx = _GOODS_NAMES.index(name)
+            goods.append({
+                "goods_id": str(20000 + idx),
+                "goods_name": name,
+                "rmb_price": rng.choice(_PRICES),
+                "bg_image": f"{base}/cdn/bg/{idx}.png",
+                "goods_pic": f"{base}/cdn/goods/{idx}.png",
+                "slot": slot,
+            })
+        return web.json_response({"result": 0, "errMsg": "", "data": [{"list": goods}]})
+
+    async def handle_image(self, request: web.Request) -> web.Response:
+        kind = request.match_info["kind"]
+        idx = int(request.match_info["idx"])
+        key = f"{kind}/{idx}"
+        data = self._images.get(key)
+        if data is None:
+            if kind == "bg":
+                data = _make_png(1024, 256, self.seed + idx, transparent=False)
+            else:
+                data = _make_png(640, 360, self.seed + idx, transparent=True)
+            self._images[key] = data
+        return web.Response(body=data, content_type="image/png")
+
+    # ---- QQ 扫码登录 ----
+
+    def _qr_image(self) -> bytes:
+        if self._qr_png is None:
+            self._qr_png = _make_png(148, 148, self.seed, transparent=False)
+        return self._qr_png
+
+    async def handle_ptqrshow(self, request: web.Request) -> web.Response:
+        response = web.Response(body=self._qr_image(), content_type="image/png")
+        response.set_cookie("qrsig", secrets.token_urlsafe(24), path="/")
+        return response
+
+    async def handle_ptqrlogin(self, request: web.Request) -> web.Response:
+        token = request.query.get("ptqrtoken", "")
+        started = self._qq_started.setdefault(token, time.monotonic())
+        elapsed = time.monotonic() - started
+        if elapsed < self.qq_scan_after:
+            body = "ptuiCB('66','0','','0','二维码未失效。(1234567890)', '')"
+        elif elapsed < self.qq_scan_after + self.qq_confirm_after:
+            body = "ptuiCB('67','0','','0','二维码认证中。(1234567890)', '')"
+        else:
+            self._qq_started.pop(token, None)
+            openid = secrets.token_hex(16).upper()
+            access_token = secrets.token_hex(16).upper()
+            success_url = (
+                f"{self._base_url(request)}/connect/success#openid={openid}"
+                f"&appid=102061775&access_token={access_token}&pay_token=&key=&expires_in=7776000"
+                f"&pf=openmobile_android&status_os=12"
+            )
+            body = f"ptuiCB('0','0','{success_url}','0','登录成功！', 'fake')"
+        return web.Response(text=body, content_type="application/javascript")
+
+    # ---- 微信扫码登录 ----
+
+    async def handle_wx_qrconnect(self, request: web.Request) -> web.Response:
+        uuid = secrets.token_hex(8)
+        qrcode = base64.b64encode(self._qr_image()).decode()
+        return web.json_response({
+            "errcode": 0,
+            "errmsg": "ok",
+            "uuid": uuid,
+            "qrcode": {"qrcodebase64": f"data:image/png;base64,{qrcode}"},
+        })
+
+    def _wx_state(self, uuid: str):
+        started = self._wx_started.setdefault(uuid, time.monotonic())
+        elapsed = time.monotonic() - started
+        if elapsed < self.wx_scan_after:
+            return 408, self.wx_scan_after - elapsed
+        if elapsed < self.wx_scan_after + self.wx_confirm_after:
+            return 404, self.wx_scan_after + self.wx_confirm_after - elapsed
+        return 405, 0.0
+
+    async def handle_wx_poll(self, request: web.Request) -> web.Response:
+        uuid = request.query.get("uuid", "")
+        last = request.query.get("last")
+        code, until_change = self._wx_state(uuid)
+        # 与线上一致：状态未变化时挂起请求，直到变化或 wx_hold 秒后返回当前状态
+        if last is not None and str(code) == last:
+            await asyncio.sleep(min(until_change, self.wx_hold) if until_change else self.wx_hold)
+            code, _ = self._wx_state(uuid)
+        wx_code = ""
+        if code == 405:
+            self._wx_started.pop(uuid, None)
+            wx_code = secrets.token_hex(16)
+        return web.Response(text=f"window.wx_errcode={code};window.wx_code='{wx_code}';")
+
+    # ---- 掌上无畏契约鉴权 ----
+
+    async def handle_sdk_ticket(self, request: web.Request) -> web.Response:
+        return web.json_response({"result": 0, "data": {"ticket": secrets.token_hex(16)}})
+
+    def _fake_login_info(self) -> dict:
+        return {
+            "result": 0,
+            "uin": self.rng.randrange(10**8, 10**9),
+            "user_id": str(self.rng.randrange(10**8, 10**9)),
+            "wt": secrets.token_hex(24),
+            "openid": secrets.token_hex(16).upper(),
+            "access_token": secrets.token_hex(16).upper(),
+        }
+
+    async def handle_login_by_qq(self, request: web.Request) -> web.Response:
+        return web.json_response({"result": 0, "data": {"login_info": self._fake_login_info()}})
+
+    async def handle_login_by_wechat(self, request: web.Request) -> web.Response:
+        return web.json_response({"result": 0, "data": {"login_info": self._fake_login_info()}})
+
+    # ---- Kook ----
+
+    async def handle_kook_asset(self, request: web.Request) -> web.Response:
+        await request.read()
+        return web.json_response({"code": 0, "data": {"url": f"{self._base_url(request)}/cdn/bg/0.png"}})
+
+    async def handle_kook_message(self, request: web.Request) -> web.Response:
+        return web.json_response({"code": 0, "data": {"msg_id": secrets.token_hex(8)}})
+
+    # ---- 统计 ----
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "requests": dict(self.requests),
+            "injected_errors": dict(self.injected_errors),
+            "pending_qq_logins": len(self._qq_started),
+            "pending_wx_logins": len(self._wx_started),
+        })
+
+    async def handle_reset(self, request: web.Request) -> web.Response:
+        self.reset()
+        return web.json_response({"ok": True})
+
+
+def add_upstream_arguments(parser: argparse.ArgumentParser):
+    """模拟上游的公共参数，load_test.py 内嵌启动时复用。"""
+    parser.add_argument(
+        "--fault", action="append", default=[],
+        help="注入延迟/错误：名称=延迟ms[:抖动ms[:错误率]]，名称为 * 或 " + "/".join(ROUTE_NAMES),
+    )
+    parser.add_argument("--goods-count", type=int, default=4, help="每日商店商品数量")
+    parser.add_argument("--auth-error-rate", type=float, default=0.0, help="商店接口返回凭证过期的比例")
+    parser.add_argument("--qq-scan-after", type=float, default=3.0, help="QQ 二维码多少秒后变为已扫码")
+    parser.add_argument("--qq-confirm-after", type=float, default=1.0, help="QQ 已扫码多少秒后确认登录")
+    parser.add_argument("--wx-scan-after", type=float, default=3.0, help="微信二维码多少秒后变为已扫码")
+    parser.add_argument("--wx-confirm-after", type=float, default=1.0, help="微信已扫码多少秒后确认登录")
+    parser.add_argument("--wx-hold", type=float, default=25.0, help="微信长轮询状态不变时的挂起时长（秒）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+
+
+def upstream_from_args(args) -> FakeUpstream:
+    return FakeUpstream(
+        faults=parse_faults(args.fault),
+        goods_count=args.goods_count,
+        auth_error_rate=args.auth_error_rate,
+        qq_scan_after=args.qq_scan_after,
+        qq_confirm_after=args.qq_confirm_after,
+        wx_scan_after=args.wx_scan_after,
+        wx_confirm_after=args.wx_confirm_after,
+        wx_hold=args.wx_hold,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟上游服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_upstream_arguments(parser)
+    args = parser.parse_args()
+
+    upstream = upstream_from_args(args)
+    print(f"模拟上游已启动: http://{args.host}:{args.port}")
+    web.run_app(upstream.build_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
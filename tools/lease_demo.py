@@ -0,0 +1,146 @@
+"""多实例租约演示：多个进程共用一个 SQLite 文件，通过 leases.py 分担分片任务。
+
+每个工作进程与插件的每日监控一样：从各自的起始分片开始抢占租约，抢到就执行（模拟耗时），
+抢不到就等待其他进程完成；可以让某个进程在执行中途直接退出，模拟实例崩溃，
+其未完成的分片会在租约过期后被其他进程接管。结束后汇总每个分片由哪个进程完成，
+所有分片都标记完成时退出码为 0。
+
+需要 sqlalchemy 与 aiosqlite，不依赖 AstrBot。
+
+用法：
+    python tools/lease_demo.py --workers 2 --shards 8
+    python tools/lease_demo.py --workers 3 --shards 12 --crash-worker 0 --crash-after 2 --ttl 6
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PLUGIN_DIR))
+
+
+class DemoDB:
+    """提供与 AstrBot 数据库相同的 get_db() 异步上下文接口。"""
+
+    def __init__(self, path: str):
+        from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{path}", connect_args={"timeout": 30})
+        self._session_cls = AsyncSession
+
+    @asynccontextmanager
+    async def get_db(self):
+        async with self._session_cls(self.engine) as session:
+            yield session
+
+
+async def run_worker(args) -> int:
+    from sqlalchemy import text
+
+    from leases import LeaseManager, shard_of
+
+    db = DemoDB(args.db)
+    leases = LeaseManager(db, ttl=args.ttl, node_id=f"worker-{args.worker}")
+    await leases.ensure_table()
+    async with db.get_db() as session:
+        async with session.begin():
+            await session.execute(text(
+                "CREATE TABLE IF NOT EXISTS demo_log (shard INTEGER, node TEXT, finished_at REAL)"
+            ))
+
+    offset = shard_of(leases.node_id, args.shards)
+    pending = sorted(range(args.shards), key=lambda shard: (shard - offset) % args.shards)
+    processed = 0
+    deadline = time.monotonic() + args.ttl * 20 + args.work_seconds * args.shards
+    while pending:
+        remaining = []
+        for shard in pending:
+            name = f"demo:{shard}"
+            async with leases.hold(name) as lease:
+                if lease.acquired:
+                    print(f"[{leases.node_id}] 领取分片 {shard}", flush=True)
+                    if args.worker == args.crash_worker and processed >= args.crash_after:
+                        await asyncio.sleep(args.work_seconds / 2)
+                        print(f"[{leases.node_id}] 模拟崩溃（持有分片 {shard}）", flush=True)
+                        os._exit(3)
+                    await asyncio.sleep(args.work_seconds)
+                    async with db.get_db() as session:
+                        async with session.begin():
+                            await session.execute(
+                                text("INSERT INTO demo_log (shard, node, finished_at) VALUES (:shard, :node, :now)"),
+                                {"shard": shard, "node": leases.node_id, "now": time.time()},
+                            )
+                    processed += 1
+                elif not await leases.is_done(name):
+                    remaining.append(shard)
+        pending = remaining
+        if pending:
+            if time.monotonic() >= deadline:
+                print(f"[{leases.node_id}] 等待超时，未完成分片: {pending}", flush=True)
+                break
+            await asyncio.sleep(args.ttl / 2)
+
+    await db.engine.dispose()
+    print(f"[{leases.node_id}] 结束，本进程完成 {processed} 个分片", flush=True)
+    return 0
+
+
+def run_demo(args) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db or str(Path(tmp) / "lease_demo.db")
+        started = time.perf_counter()
+        procs = []
+        for i in range(args.workers):
+            cmd = [
+                sys.executable, __file__, "--worker", str(i), "--db", db_path,
+                "--shards", str(args.shards), "--ttl", str(args.ttl),
+                "--work-seconds", str(args.work_seconds),
+                "--crash-worker", str(args.crash_worker), "--crash-after", str(args.crash_after),
+            ]
+            procs.append(subprocess.Popen(cmd))
+        codes = [proc.wait() for proc in procs]
+        wall = time.perf_counter() - started
+
+        conn = sqlite3.connect(db_path)
+        done = dict(conn.execute("SELECT name, owner FROM valo_leases WHERE status = 'done'").fetchall())
+        runs = conn.execute("SELECT shard, node FROM demo_log ORDER BY finished_at").fetchall()
+        conn.close()
+
+    print(f"\n耗时 {wall:.1f}s，进程退出码: {codes}")
+    per_node = {}
+    for shard, node in runs:
+        per_node.setdefault(node, []).append(shard)
+    for node, shards in sorted(per_node.items()):
+        print(f"  {node}: {sorted(shards)}")
+    missing = [shard for shard in range(args.shards) if f"demo:{shard}" not in done]
+    duplicated = sorted({shard for shard, _ in runs if sum(1 for s, _ in runs if s == shard) > 1})
+    print(f"完成分片 {len(done)}/{args.shards}，未完成: {missing or '无'}，重复执行: {duplicated or '无'}")
+    return 0 if not missing else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多实例租约演示")
+    parser.add_argument("--workers", type=int, default=2, help="工作进程数")
+    parser.add_argument("--shards", type=int, default=8, help="分片数")
+    parser.add_argument("--ttl", type=float, default=6.0, help="租约有效期（秒）")
+    parser.add_argument("--work-seconds", type=float, default=1.0, help="每个分片的模拟耗时（秒）")
+    parser.add_argument("--crash-worker", type=int, default=-1, help="中途崩溃的工作进程序号，-1 表示不崩溃")
+    parser.add_argument("--crash-after", type=int, default=1, help="崩溃进程在完成多少个分片后崩溃")
+    parser.add_argument("--db", default="", help="SQLite 文件路径，留空使用临时文件")
+    parser.add_argument("--worker", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        sys.exit(asyncio.run(run_worker(args)))
+    sys.exit(run_demo(args))
+
+
+if __name__ == "__main__":
+    main()
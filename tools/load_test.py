@@ -0,0 +1,332 @@
+"""插件压测驱动：把插件指向本地模拟上游（tools/fake_upstream.py），模拟并发命令与定时任务。
+
+场景：
+    shop      N 个并发的 /每日商店（含商店接口、图片下载、渲染）
+    daily     一次完整的 daily_auto_check（--users 个开启监控的用户）
+    qq-login  N 个并发的 QQ 扫码登录轮询（ptqrshow + wait_for_http_login_result）
+    wx-login  N 个并发的微信长轮询登录（_val_wechat_login_task）
+
+需要在装有 AstrBot（及其 sqlalchemy/aiosqlite 依赖）的环境中运行；数据库使用临时 SQLite 文件，
+消息发送只记录不外发。未指定 --upstream 时在进程内启动模拟上游。
+
+用法：
+    python tools/load_test.py --scenario shop --requests 200 --concurrency 20
+    python tools/load_test.py --scenario daily --users 500 --fault store=200:50:0.01
+    python tools/load_test.py --scenario all --upstream http://127.0.0.1:8765 --json load.json
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+TOOLS_DIR = Path(__file__).resolve().parent
+PLUGIN_DIR = TOOLS_DIR.parent
+sys.path.insert(0, str(TOOLS_DIR))
+sys.path.insert(0, str(PLUGIN_DIR.parent))
+
+from fake_upstream import FakeUpstream, add_upstream_arguments, upstream_from_args  # noqa: E402
+
+SCENARIOS = ("shop", "daily", "qq-login", "wx-login")
+# 监控关键词，与 fake_upstream 的商品名部分重合
+WATCH_ITEMS = ("幻影", "暴徒", "冥驹")
+
+
+class HarnessDB:
+    """提供与 AstrBot 数据库相同的 get_db() 异步上下文接口。"""
+
+    def __init__(self, path: str):
+        from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        self._session_cls = AsyncSession
+
+    @asynccontextmanager
+    async def get_db(self):
+        async with self._session_cls(self.engine) as session:
+            yield session
+
+    async def close(self):
+        await self.engine.dispose()
+
+
+class _PlatformManager:
+    platform_insts: list = []
+
+
+class HarnessContext:
+    """插件用到的 Context 接口子集，send_message 只记录。"""
+
+    def __init__(self, db: HarnessDB):
+        self._db = db
+        self.platform_manager = _PlatformManager()
+        self.sent: List[tuple] = []
+
+    def get_db(self):
+        return self._db
+
+    async def send_message(self, session: str, message_chain) -> bool:
+        self.sent.append((session, message_chain))
+        return True
+
+
+class HarnessEvent:
+    """插件用到的消息事件接口子集。"""
+
+    def __init__(self, sender_id: str, message: str = ""):
+        self.sender_id = sender_id
+        self.message_str = message
+        self.results: List[tuple] = []
+
+    def get_sender_id(self) -> str:
+        return self.sender_id
+
+    def get_self_id(self) -> str:
+        return "bot"
+
+    def get_platform_name(self) -> str:
+        return "aiocqhttp"
+
+    def get_messages(self) -> list:
+        return []
+
+    def is_admin(self) -> bool:
+        return False
+
+    def plain_result(self, text: str):
+        return ("plain", text)
+
+    def chain_result(self, chain: list):
+        return ("chain", chain)
+
+
+def endpoint_overrides(plugin_main, base_url: str) -> Dict[str, str]:
+    """把插件的全部上游地址指向模拟服务（对应 endpoints 配置）。"""
+    return {name: base_url.rstrip("/") for name in plugin_main.DEFAULT_ENDPOINTS}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = max(0, min(len(ordered) - 1, round(q * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def summarize(name: str, latencies: List[float], ok: int, total: int, wall: float, **extra) -> Dict[str, Any]:
+    return {
+        "scenario": name,
+        "total": total,
+        "ok": ok,
+        "failed": total - ok,
+        "wall_seconds": round(wall, 3),
+        "throughput_per_s": round(total / wall, 2) if wall > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 0.5) * 1000, 1),
+            "p90": round(_percentile(latencies, 0.9) * 1000, 1),
+            "p99": round(_percentile(latencies, 0.99) * 1000, 1),
+            "max": round(max(latencies, default=0.0) * 1000, 1),
+        },
+        **extra,
+    }
+
+
+async def run_concurrently(total: int, concurrency: int, job) -> tuple:
+    """以 concurrency 为上限执行 total 次 job(i)，返回 (各次耗时, 成功数, 总墙钟时间)。"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    latencies: List[float] = []
+    ok = 0
+
+    async def one(i: int):
+        nonlocal ok
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                success = await job(i)
+            except Exception as e:
+                logging.getLogger("load_test").warning("任务 %d 异常: %r", i, e)
+                success = False
+            latencies.append(time.perf_counter() - started)
+            if success:
+                ok += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies, ok, time.perf_counter() - started
+
+
+async def seed_users(plugin, count: int, auto_check: bool):
+    for i in range(count):
+        user_id = f"load_{i}"
+        await plugin.save_user_config(user_id, str(100000 + i), f"tid_{i}", f"压测用户{i}")
+        if auto_check:
+            await plugin.add_watch_item(user_id, WATCH_ITEMS[i % len(WATCH_ITEMS)])
+            await plugin.update_auto_check(user_id, 1)
+
+
+async def scenario_shop(plugin, args) -> Dict[str, Any]:
+    async def job(i: int) -> bool:
+        event = HarnessEvent(f"load_{i % args.users}", "/每日商店")
+        results = [item async for item in plugin.daily_shop_command(event)]
+        return any(kind == "chain" for kind, _ in results)
+
+    latencies, ok, wall = await run_concurrently(args.requests, args.concurrency, job)
+    return summarize("shop", latencies, ok, args.requests, wall)
+
+
+async def scenario_daily(plugin, context: HarnessContext, args) -> Dict[str, Any]:
+    sent_before = len(context.sent)
+    started = time.perf_counter()
+    await plugin.daily_auto_check()
+    # 通知经队列异步发送，等队列清空后再统计
+    await plugin.notifier.drain(timeout=args.notify_drain_timeout)
+    wall = time.perf_counter() - started
+    notifications = len(context.sent) - sent_before
+    return summarize(
+        "daily",
+        [wall],
+        1,
+        1,
+        wall,
+        users=args.users,
+        notifications=notifications,
+        users_per_s=round(args.users / wall, 2) if wall > 0 else 0.0,
+    )
+
+
+async def scenario_qq_login(plugin, args) -> Dict[str, Any]:
+    async def job(i: int) -> bool:
+        # 模拟服务在 IP 地址上下发 qrsig，需要 unsafe CookieJar 才能保存
+        async with aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True)) as session:
+            async with session.get(plugin.PTQR_SHOW_URL) as resp:
+                resp.raise_for_status()
+                await resp.read()
+            qrsig = next((c.value for c in session.cookie_jar if c.key == "qrsig"), "")
+            if not qrsig:
+                return False
+            login_data = await plugin.wait_for_http_login_result(
+                session,
+                plugin._calc_ptqrtoken(qrsig),
+                "",
+                plugin.DEFAULT_LOGIN_U1_URL,
+                plugin.PTQR_SHOW_URL,
+                timeout=args.login_timeout,
+            )
+            return bool(login_data and login_data.get("openid"))
+
+    latencies, ok, wall = await run_concurrently(args.requests, args.concurrency, job)
+    return summarize("qq-login", latencies, ok, args.requests, wall)
+
+
+async def scenario_wx_login(plugin, args) -> Dict[str, Any]:
+    async def job(i: int) -> bool:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(plugin.WECHAT_QRCONNECT_URL, params={"f": "json"}) as resp:
+                uuid = (await resp.json(content_type=None)).get("uuid", "")
+        if not uuid:
+            return False
+        result = await plugin._val_wechat_login_task(f"load_wx_{i}", uuid)
+        return bool(result and result.get("tid"))
+
+    latencies, ok, wall = await run_concurrently(args.requests, args.concurrency, job)
+    return summarize("wx-login", latencies, ok, args.requests, wall)
+
+
+async def run(args) -> Dict[str, Any]:
+    plugin_main = importlib.import_module(f"{PLUGIN_DIR.name}.main")
+
+    runner = None
+    upstream: Optional[FakeUpstream] = None
+    base_url = args.upstream
+    if not base_url:
+        upstream = upstream_from_args(args)
+        runner = await upstream.start()
+        base_url = FakeUpstream.bound_url(runner)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = HarnessDB(str(Path(tmp) / "load_test.db"))
+        context = HarnessContext(db)
+        plugin = plugin_main.ValorantShopPlugin(context, {
+            "log_level": args.log_level,
+            "notify_rate_limits": f"default={args.notify_rate}",
+            "endpoints": endpoint_overrides(plugin_main, base_url),
+        })
+        await plugin.initialize()
+
+        scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+        results = []
+        try:
+            await seed_users(plugin, args.users, auto_check="daily" in scenarios)
+            for name in scenarios:
+                if name == "shop":
+                    results.append(await scenario_shop(plugin, args))
+                elif name == "daily":
+                    results.append(await scenario_daily(plugin, context, args))
+                elif name == "qq-login":
+                    results.append(await scenario_qq_login(plugin, args))
+                elif name == "wx-login":
+                    results.append(await scenario_wx_login(plugin, args))
+        finally:
+            metrics_summary = plugin.metrics.summary()
+            await plugin.terminate()
+            await db.close()
+            if runner is not None:
+                await runner.cleanup()
+
+    return {
+        "python": platform.python_version(),
+        "upstream": base_url,
+        "upstream_stats": {
+            "requests": dict(upstream.requests),
+            "injected_errors": dict(upstream.injected_errors),
+        } if upstream else None,
+        "results": results,
+        "plugin_metrics": metrics_summary,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="插件压测驱动")
+    parser.add_argument("--scenario", choices=SCENARIOS + ("all",), default="shop")
+    parser.add_argument("--requests", type=int, default=100, help="shop/登录场景的总请求数")
+    parser.add_argument("--concurrency", type=int, default=10, help="并发数")
+    parser.add_argument("--users", type=int, default=50, help="预置的绑定用户数")
+    parser.add_argument("--login-timeout", type=int, default=30, help="登录场景单次等待上限（秒）")
+    parser.add_argument("--notify-rate", type=float, default=200, help="通知限速（条/秒），对应 notify_rate_limits")
+    parser.add_argument("--notify-drain-timeout", type=float, default=600, help="daily 场景等待通知队列清空的上限（秒）")
+    parser.add_argument("--upstream", default="", help="已启动的模拟上游地址，留空则进程内启动")
+    parser.add_argument("--log-level", default="warning", help="插件日志级别")
+    parser.add_argument("--json", dest="json_path", default="", help="将结果写入 JSON 文件")
+    add_upstream_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    report = asyncio.run(run(args))
+
+    for item in report["results"]:
+        latency = item["latency_ms"]
+        print(
+            f"{item['scenario']:<9} ok={item['ok']}/{item['total']}  wall={item['wall_seconds']:.2f}s  "
+            f"rps={item['throughput_per_s']:.2f}  p50={latency['p50']:.0f}ms p90={latency['p90']:.0f}ms "
+            f"p99={latency['p99']:.0f}ms max={latency['max']:.0f}ms"
+        )
+        if item["scenario"] == "daily":
+            print(f"          users={item['users']} notifications={item['notifications']} users/s={item['users_per_s']}")
+    if report["upstream_stats"]:
+        print(f"上游请求: {report['upstream_stats']['requests']}  注入错误: {report['upstream_stats']['injected_errors']}")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
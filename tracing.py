@@ -0,0 +1,85 @@
+"""单次请求的分阶段耗时追踪与慢请求记录。
+
+用法：
+    trace = RequestTrace("每日商店", user_id=user_id)
+    with span(trace, "store_api"):
+        ...
+    trace.finish()
+
+同名阶段会累加（例如逐个商品的图片下载），格式化时按首次出现的顺序输出。
+"""
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+
+class RequestTrace:
+    """记录一次请求各阶段的耗时。"""
+
+    def __init__(self, name: str, **attrs: Any):
+        self.name = name
+        self.attrs = attrs
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self.total: Optional[float] = None
+        # 阶段名 -> [累计秒数, 次数]
+        self.stages: Dict[str, List[float]] = {}
+
+    def add(self, stage: str, seconds: float):
+        entry = self.stages.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    @contextmanager
+    def span(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def finish(self) -> float:
+        if self.total is None:
+            self.total = time.perf_counter() - self._started
+        return self.total
+
+    def format(self) -> str:
+        total = self.finish()
+        parts = []
+        for stage, (seconds, count) in self.stages.items():
+            suffix = f"x{count}" if count > 1 else ""
+            parts.append(f"{stage}={seconds * 1000:.0f}ms{suffix}")
+        accounted = sum(seconds for seconds, _ in self.stages.values())
+        other = total - accounted
+        if other > 0.001:
+            parts.append(f"other={other * 1000:.0f}ms")
+        attrs = " ".join(f"{k}={v}" for k, v in self.attrs.items())
+        return (
+            f"[{self.started_at.strftime('%m-%d %H:%M:%S')}] {self.name} {attrs} "
+            f"总耗时={total * 1000:.0f}ms | {' '.join(parts)}"
+        ).replace("  ", " ")
+
+
+def span(trace: Optional[RequestTrace], stage: str):
+    """trace 为空时返回空上下文，方便在可选追踪的函数里直接使用。"""
+    if trace is None:
+        return nullcontext()
+    return trace.span(stage)
+
+
+class SlowTraceLog:
+    """保留最近 N 条超过阈值的请求追踪。"""
+
+    def __init__(self, keep: int = 20):
+        self._traces: Deque[RequestTrace] = deque(maxlen=max(1, keep))
+
+    def record(self, trace: RequestTrace, threshold_seconds: float) -> bool:
+        if trace.finish() < threshold_seconds:
+            return False
+        self._traces.append(trace)
+        return True
+
+    def recent(self) -> List[RequestTrace]:
+        return list(reversed(self._traces))
@@ -0,0 +1,101 @@
+"""按用户的每日定时：所有用户共用一个最小堆，由插件中的单个循环驱动。
+
+堆中存放 (下次运行时间戳, 序号, 用户)；修改或取消某个用户的时间时不在堆中查找删除，
+只更新 _entries 中该用户的当前条目，旧条目在出堆时按序号比对丢弃（惰性删除），
+因此添加、修改、取出都是 O(log n)。失效条目过多时整体重建。
+本模块不依赖 AstrBot。
+"""
+import heapq
+import itertools
+from datetime import datetime, time as dt_time, timedelta
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+
+def parse_hhmm(value: str) -> Optional[Tuple[int, int]]:
+    """解析 HH:MM，格式或范围无效时返回 None。"""
+    hour_text, sep, minute_text = str(value or "").strip().partition(":")
+    if not sep:
+        return None
+    try:
+        hour, minute = int(hour_text), int(minute_text)
+    except ValueError:
+        return None
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        return None
+    return hour, minute
+
+
+def next_run(hour: int, minute: int, tz: ZoneInfo, now: Optional[datetime] = None) -> float:
+    """返回 tz 时区下严格晚于 now 的下一个 hour:minute 的时间戳。"""
+    local_now = (now or datetime.now(tz)).astimezone(tz)
+    day = local_now.date()
+    for _ in range(3):
+        candidate = datetime.combine(day, dt_time(hour, minute), tzinfo=tz)
+        if candidate > local_now:
+            return candidate.timestamp()
+        day += timedelta(days=1)
+    return (local_now + timedelta(days=1)).timestamp()
+
+
+class ScheduleHeap:
+    """key -> 下次运行时间的最小堆。"""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, str]] = []
+        self._entries: Dict[str, Tuple[float, int]] = {}
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> Optional[float]:
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def schedule(self, key: str, when: float):
+        """设置（或修改）key 的下次运行时间。"""
+        seq = next(self._seq)
+        self._entries[key] = (when, seq)
+        heapq.heappush(self._heap, (when, seq, key))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._rebuild()
+
+    def remove(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._heap.clear()
+        self._entries.clear()
+
+    def peek_time(self) -> Optional[float]:
+        """最早的运行时间，堆为空时返回 None。"""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """取出所有运行时间不晚于 now 的 (key, 计划时间)（最多 limit 个），取出后需调用方重新 schedule。"""
+        due: List[Tuple[str, float]] = []
+        while self._heap and (limit is None or len(due) < limit):
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            when, _, key = heapq.heappop(self._heap)
+            del self._entries[key]
+            due.append((key, when))
+        return due
+
+    def _drop_stale(self):
+        heap, entries = self._heap, self._entries
+        while heap:
+            when, seq, key = heap[0]
+            if entries.get(key) == (when, seq):
+                return
+            heapq.heappop(heap)
+
+    def _rebuild(self):
+        self._heap = [(when, seq, key) for key, (when, seq) in self._entries.items()]
+        heapq.heapify(self._heap)